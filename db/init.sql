@@ -27,12 +27,26 @@ CREATE TABLE SONGS (
     artist_name varchar(255) NOT NULL,
     release_date date NULL,
     url text UNIQUE NOT NULL,
-    song_feature VECTOR NOT NULL, -- Requires a vector extension like pgvector
+    source_key text NULL, -- Canonical media identity (e.g. youtube:<video id>), set by the ML service
+    song_feature VECTOR(27) NOT NULL, -- Requires a vector extension like pgvector; 27 = feature dimension
     source_platform varchar(50) CHECK (source_platform IN ('spotify', 'apple_music', 'youtube', 'other')),
     added_by integer REFERENCES USERS (id) ON DELETE SET NULL,
     added_at timestamp with time zone DEFAULT NOW()
 );
 
+-- One row per media item, whatever URL form it was submitted with (NULLs allowed)
+CREATE UNIQUE INDEX idx_songs_source_key ON SONGS (source_key);
+
+-- Keyset listing of one user's songs (/songs?added_by=...)
+CREATE INDEX idx_songs_added_by ON SONGS (added_by, id);
+
+-- ANN index for cosine similarity search (the metric used by the ML service)
+CREATE INDEX idx_songs_feature_hnsw_cosine ON SONGS USING hnsw (song_feature vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Bumped by the ML service after every committed change to stored vectors
+-- (e.g. manage.py import-vectors), so in-process indexes know to reload
+CREATE SEQUENCE song_vector_generation;
+
 -- PLAYLISTS Table
 CREATE TABLE PLAYLISTS (
     id serial PRIMARY KEY,
@@ -106,3 +120,53 @@ CREATE TABLE IF NOT EXISTS SONG_FEEDBACK (
 
 -- Index for fast lookup of votes for a specific recommendation
 CREATE INDEX idx_feedback_query_song ON SONG_FEEDBACK (query_song_id, suggested_song_id);
+
+-- Net vote score per recommendation, kept current by a trigger on SONG_FEEDBACK
+-- (vote flips move one vote between the counters), so re-ranking reads one row
+-- per candidate however many users voted. Rebuilt by
+-- `python manage.py rebuild-feedback-scores`.
+CREATE TABLE IF NOT EXISTS SONG_FEEDBACK_SCORES (
+    query_song_id integer NOT NULL REFERENCES SONGS (id) ON DELETE CASCADE,
+    suggested_song_id integer NOT NULL REFERENCES SONGS (id) ON DELETE CASCADE,
+    net_score integer NOT NULL DEFAULT 0,
+    upvotes integer NOT NULL DEFAULT 0,
+    downvotes integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (query_song_id, suggested_song_id)
+);
+
+CREATE OR REPLACE FUNCTION song_feedback_scores_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE song_feedback_scores
+        SET net_score = net_score - OLD.vote,
+            upvotes = upvotes - (OLD.vote = 1)::int,
+            downvotes = downvotes - (OLD.vote = -1)::int
+        WHERE query_song_id = OLD.query_song_id
+          AND suggested_song_id = OLD.suggested_song_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO song_feedback_scores (query_song_id, suggested_song_id, net_score, upvotes, downvotes)
+        VALUES (NEW.query_song_id, NEW.suggested_song_id, NEW.vote, (NEW.vote = 1)::int, (NEW.vote = -1)::int)
+        ON CONFLICT (query_song_id, suggested_song_id) DO UPDATE
+        SET net_score = song_feedback_scores.net_score + EXCLUDED.net_score,
+            upvotes = song_feedback_scores.upvotes + EXCLUDED.upvotes,
+            downvotes = song_feedback_scores.downvotes + EXCLUDED.downvotes;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER song_feedback_scores_sync
+AFTER INSERT OR UPDATE OR DELETE ON SONG_FEEDBACK
+FOR EACH ROW EXECUTE FUNCTION song_feedback_scores_apply();
+
+-- Precomputed cosine neighbour lists (the song itself included), sorted by
+-- distance. Built by `python manage.py build-neighbors` and kept current by
+-- the ML service on every insert; /similar can read a list by primary key.
+CREATE TABLE IF NOT EXISTS SONG_NEIGHBORS (
+    song_id integer PRIMARY KEY REFERENCES SONGS (id) ON DELETE CASCADE,
+    k integer NOT NULL, -- List length the table was built with
+    neighbor_ids integer[] NOT NULL,
+    distances real[] NOT NULL,
+    updated_at timestamp with time zone DEFAULT NOW()
+);
@@ -0,0 +1,287 @@
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+from src.repositories.source_keys import canonical_source_key
+
+AUDIO_DIR = "audio"
+FEATURES_DIR = "features"
+# Eviction trims the cache to this fraction of max_bytes, so it does not
+# rescan the directory on every write once the cache is full
+EVICTION_TARGET = 0.9
+# Samples per block when transcoding downloads into the cache
+TRANSCODE_BLOCK = 1 << 18
+
+
+def cache_key(url: str) -> str:
+    """Content address of a source: SHA-256 of its canonical source key."""
+    return hashlib.sha256(canonical_source_key(url).encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    On-disk cache of downloaded audio (FLAC) and extracted feature vectors
+    (.npy, one namespace per extractor version), so re-analysing a source
+    never has to hit the network again.
+
+        <directory>/audio/ab/<key>-<rate>.flac
+        <directory>/features/<extractor version>/ab/<key>.npy
+
+    Audio is tagged with the rate it was resampled to, or "native" for the
+    source rate: a resampled copy only serves extractors analysing at that
+    rate, so changing extractor never reuses audio it would not download.
+
+    Entries are written atomically (temp file + rename), so several worker
+    processes can share one directory. Reads refresh the file's mtime and
+    eviction removes the least recently used files once the total size
+    exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 5 * 1024**3):
+        """
+        directory: cache root (created if missing)
+        max_bytes: size bound for audio + features together
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._init_state()
+
+    def _init_state(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "audio_hits": 0,
+            "audio_misses": 0,
+            "feature_hits": 0,
+            "feature_misses": 0,
+            "evictions": 0,
+        }
+        self._approx_bytes = sum(size for _, size, _ in self._scan())
+
+    # Worker processes receive the cache pickled: locks and counters are per process
+    def __getstate__(self):
+        return {"directory": self.directory, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    # ============================================
+    # Features
+    # ============================================
+
+    def get_features(self, url: str, versions: List[str]) -> Optional[np.ndarray]:
+        """Cached feature vector for `url` under the first matching version."""
+        for version in versions:
+            path = self._features_path(url, version)
+            try:
+                features = np.load(path)
+            except (FileNotFoundError, ValueError):
+                continue
+            self._touch(path)
+            self._count("feature_hits")
+            return features
+
+        self._count("feature_misses")
+        return None
+
+    def put_features(self, url: str, version: str, features: np.ndarray):
+        path = self._features_path(url, version)
+        with self._atomic_write(path, ".npy") as tmp_path:
+            np.save(tmp_path, np.asarray(features))
+
+    # ============================================
+    # Audio
+    # ============================================
+
+    def get_audio(self, url: str, sr: Optional[int] = None) -> Optional[str]:
+        """
+        Path of a cached FLAC for `url` usable for analysis at `sr` (None =
+        the source rate): the native copy, or one resampled to sr.
+        """
+        for rate in [None, sr] if sr else [None]:
+            path = self._audio_path(url, rate)
+            if os.path.exists(path):
+                self._touch(path)
+                self._count("audio_hits")
+                return path
+
+        self._count("audio_misses")
+        return None
+
+    def put_audio(self, url: str, source_path: str, sr: Optional[int] = None) -> str:
+        """
+        Transcode a decoded download (e.g. WAV) into the cache as mono FLAC,
+        block by block. sr=None keeps the source rate; 16-bit sources stay
+        bit-exact. Returns the cached path.
+        """
+        info = sf.info(source_path)
+        target_sr = sr or info.samplerate
+        native = target_sr == info.samplerate
+        subtype = "PCM_16" if info.subtype == "PCM_16" and native else "PCM_24"
+
+        with self.audio_writer(url, target_sr, subtype, native) as write:
+            resampler = (
+                soxr.ResampleStream(info.samplerate, target_sr, 1, dtype="float32")
+                if target_sr != info.samplerate
+                else None
+            )
+            blocks = sf.blocks(
+                source_path, blocksize=TRANSCODE_BLOCK, dtype="float32", always_2d=True
+            )
+            for block in blocks:
+                samples = block.mean(axis=1)
+                write(resampler.resample_chunk(samples) if resampler else samples)
+            if resampler:
+                write(resampler.resample_chunk(np.zeros(0, np.float32), last=True))
+
+        return self._audio_path(url, None if native else target_sr)
+
+    @contextmanager
+    def audio_writer(
+        self, url: str, sr: int, subtype: str = "PCM_24", native: bool = False
+    ):
+        """
+        Context manager yielding write(samples) for mono float PCM arriving
+        in blocks (e.g. from an ffmpeg pipe). `native` marks samples at the
+        source's own rate. The entry only appears if the block exits
+        without an error.
+        """
+        path = self._audio_path(url, None if native else sr)
+        with self._atomic_write(path, ".flac") as tmp_path:
+            with sf.SoundFile(
+                tmp_path, "w", samplerate=sr, channels=1, format="FLAC", subtype=subtype
+            ) as f:
+                yield lambda samples: f.write(np.clip(samples, -1.0, 1.0))
+
+    # ============================================
+    # Housekeeping
+    # ============================================
+
+    def stats(self) -> Dict:
+        """
+        Disk usage (shared by all processes using the directory) and this
+        process's hit/miss/eviction counters.
+        """
+        entries = {AUDIO_DIR: 0, FEATURES_DIR: 0}
+        sizes = {AUDIO_DIR: 0, FEATURES_DIR: 0}
+        for path, size, _ in self._scan():
+            kind = os.path.relpath(path, self.directory).split(os.sep, 1)[0]
+            entries[kind] += 1
+            sizes[kind] += size
+
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "directory": self.directory,
+            "max_bytes": self.max_bytes,
+            "bytes": sizes[AUDIO_DIR] + sizes[FEATURES_DIR],
+            "audio_entries": entries[AUDIO_DIR],
+            "audio_bytes": sizes[AUDIO_DIR],
+            "feature_entries": entries[FEATURES_DIR],
+            "feature_bytes": sizes[FEATURES_DIR],
+            **counters,
+        }
+
+    def evict(self) -> int:
+        """Remove least recently used entries down to the eviction target."""
+        files = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * EVICTION_TARGET
+        removed = 0
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Evicted by another process
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._approx_bytes = total
+            self._counters["evictions"] += removed
+        if removed:
+            print(f"🧹 Evicted {removed} analysis cache entries")
+        return removed
+
+    def clear(self) -> int:
+        """Remove every entry. Returns the number of files removed."""
+        files = list(self._scan())
+        for path, _, _ in files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._approx_bytes = 0
+        return len(files)
+
+    # ============================================
+    # Private helpers
+    # ============================================
+
+    def _audio_path(self, url: str, sr: Optional[int] = None) -> str:
+        key = cache_key(url)
+        return os.path.join(
+            self.directory, AUDIO_DIR, key[:2], f"{key}-{sr or 'native'}.flac"
+        )
+
+    def _features_path(self, url: str, version: str) -> str:
+        key = cache_key(url)
+        return os.path.join(
+            self.directory, FEATURES_DIR, version, key[:2], f"{key}.npy"
+        )
+
+    @contextmanager
+    def _atomic_write(self, path: str, suffix: str) -> Iterator[str]:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=f".tmp{suffix}")
+        os.close(fd)
+        try:
+            yield tmp_path
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._approx_bytes += size
+            over = self._approx_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _touch(self, path: str):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _scan(self) -> Iterator[Tuple[str, int, float]]:
+        """(path, size, mtime) of every committed cache file."""
+        for kind in (AUDIO_DIR, FEATURES_DIR):
+            for root, _, names in os.walk(os.path.join(self.directory, kind)):
+                for name in names:
+                    if ".tmp" in name:
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
@@ -0,0 +1,360 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+
+# Shared STFT geometry (librosa's defaults, so features match the legacy path)
+N_FFT = 2048
+HOP_LENGTH = 512
+ANALYSIS_SAMPLE_RATE = 22050
+
+
+def combine_features(
+    tempo: float,
+    centroid_mean: float,
+    mfcc_mean: np.ndarray,
+    chroma_mean: np.ndarray,
+) -> np.ndarray:
+    """
+    The 27-dim vector layout stored in songs.song_feature:
+    [tempo, spectral centroid, 13 x MFCC, 12 x chroma], L2-normalised
+    for cosine similarity.
+    """
+    features = np.concatenate(
+        [
+            np.array([tempo], dtype=np.float64).flatten(),
+            np.array([centroid_mean], dtype=np.float64),
+            np.asarray(mfcc_mean, dtype=np.float64).flatten(),
+            np.asarray(chroma_mean, dtype=np.float64).flatten(),
+        ]
+    )
+    return features / (np.linalg.norm(features) + 1e-8)
+
+
+class FeatureExtractor(ABC):
+    """
+    Turns an audio file into the 27-dim song feature vector.
+
+    `version` identifies the exact algorithm/parameters: vectors from
+    different versions are not directly comparable (and must not share
+    cache entries).
+    """
+
+    version: str = ""
+
+    @abstractmethod
+    def extract(self, audio_path: str) -> np.ndarray:
+        """Feature vector of an audio file."""
+        pass
+
+    @abstractmethod
+    def extract_waveform(self, y: np.ndarray, sr: int) -> np.ndarray:
+        """Feature vector of an already decoded mono waveform."""
+        pass
+
+
+class LibrosaFeatureExtractor(FeatureExtractor):
+    """
+    The original pipeline: decode at the native sample rate and let each
+    librosa feature compute its own STFT.
+    """
+
+    version = "librosa-v1"
+
+    def extract(self, audio_path: str) -> np.ndarray:
+        y, sr = librosa.load(audio_path, sr=None)
+        return self.extract_waveform(y, sr)
+
+    def extract_waveform(self, y: np.ndarray, sr: int) -> np.ndarray:
+        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+        spec_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
+        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+        chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+
+        return combine_features(
+            tempo,
+            np.mean(spec_centroid),
+            np.mean(mfcc, axis=1),
+            np.mean(chroma, axis=1),
+        )
+
+
+class FastFeatureExtractor(FeatureExtractor):
+    """
+    Optimised pipeline with the same 27-dim layout:
+
+    - decodes straight to a fixed analysis sample rate, float32
+    - computes ONE magnitude STFT; the power spectrogram feeds chroma and
+      a single mel spectrogram, which in turn feeds both MFCC and the
+      onset envelope used for tempo
+    - optionally reads at most `max_duration` seconds, as `segments`
+      evenly spaced excerpts, so long tracks are never fully decoded
+    """
+
+    def __init__(
+        self,
+        sr: Optional[int] = ANALYSIS_SAMPLE_RATE,
+        max_duration: Optional[float] = None,
+        segments: int = 1,
+    ):
+        """
+        sr: analysis sample rate (None = native rate)
+        max_duration: seconds of audio analysed per track (None = all)
+        segments: number of excerpts the max_duration budget is split into
+        """
+        self.sr = sr
+        self.max_duration = max_duration
+        self.segments = max(1, segments)
+        self.version = (
+            f"fast-v1-sr{sr or 'native'}-d{max_duration or 'full'}x{self.segments}"
+        )
+
+    def extract(self, audio_path: str) -> np.ndarray:
+        y, sr = self._load(audio_path)
+        return self.extract_waveform(y, sr)
+
+    def extract_waveform(self, y: np.ndarray, sr: int) -> np.ndarray:
+        y = np.asarray(y, dtype=np.float32)
+
+        magnitude = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+        power = magnitude**2
+
+        centroid = librosa.feature.spectral_centroid(
+            S=magnitude, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH
+        )
+        chroma = librosa.feature.chroma_stft(
+            S=power, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH
+        )
+        mel_db = librosa.power_to_db(
+            librosa.feature.melspectrogram(S=power, sr=sr, n_fft=N_FFT)
+        )
+        mfcc = librosa.feature.mfcc(S=mel_db, n_mfcc=13)
+        onset_env = librosa.onset.onset_strength(S=mel_db, sr=sr)
+        tempo, _ = librosa.beat.beat_track(
+            onset_envelope=onset_env, sr=sr, hop_length=HOP_LENGTH
+        )
+
+        return combine_features(
+            tempo,
+            np.mean(centroid),
+            np.mean(mfcc, axis=1),
+            np.mean(chroma, axis=1),
+        )
+
+    def excerpts(self, total: float) -> Optional[List[Tuple[float, float]]]:
+        """
+        (offset, duration) in seconds of the excerpts analysed from a track
+        of `total` seconds, or None when the whole track is analysed.
+        """
+        if self.max_duration is None or total <= self.max_duration:
+            return None
+
+        # A single excerpt comes from the middle, several span the whole track
+        length = self.max_duration / self.segments
+        if self.segments == 1:
+            return [(0.5 * (total - length), length)]
+        step = (total - length) / (self.segments - 1)
+        return [(i * step, length) for i in range(self.segments)]
+
+    def _load(self, audio_path: str):
+        """Decode (excerpts of) the file at the analysis rate as float32."""
+        excerpts = None
+        if self.max_duration is not None:
+            excerpts = self.excerpts(librosa.get_duration(path=audio_path))
+        if excerpts is None:
+            return librosa.load(audio_path, sr=self.sr, dtype=np.float32)
+
+        chunks = []
+        sr = self.sr
+        for offset, length in excerpts:
+            chunk, sr = librosa.load(
+                audio_path,
+                sr=self.sr,
+                offset=offset,
+                duration=length,
+                dtype=np.float32,
+            )
+            chunks.append(chunk)
+        return np.concatenate(chunks), sr
+
+
+class _RunningFeatures:
+    """
+    Accumulators for one streamed track: per-frame feature sums for the
+    means and a running tempogram for tempo. Nothing grows with duration.
+    """
+
+    def __init__(self, sr: int):
+        self.sr = sr
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=N_FFT)
+        self.frames = 0
+        self.centroid_sum = 0.0
+        self.mfcc_sum = np.zeros(13)
+        self.chroma_sum = np.zeros(12)
+        self.tuning: Optional[float] = None
+        self.last_mel_db: Optional[np.ndarray] = None
+        # Online tempo: running sum of the autocorrelation tempogram over
+        # 8 s windows of the onset envelope (librosa's default ac_size).
+        # Zero padding stands in for librosa's centred windows.
+        self.tempo_window = int(
+            librosa.time_to_frames(8.0, sr=sr, hop_length=HOP_LENGTH).item()
+        )
+        self.onset_tail = np.zeros(self.tempo_window // 2, dtype=np.float32)
+        self.tempogram_sum = np.zeros(self.tempo_window)
+        self.tempogram_frames = 0
+
+    def add(self, y: np.ndarray):
+        """Consume whole frames of samples (len(y) = N_FFT + k * HOP_LENGTH)."""
+        magnitude = np.abs(
+            librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH, center=False)
+        )
+        power = magnitude**2
+        if self.tuning is None:
+            # Fixed after the first block so every chroma frame shares a tuning
+            self.tuning = librosa.estimate_tuning(S=power, sr=self.sr, n_fft=N_FFT)
+
+        centroid = librosa.feature.spectral_centroid(
+            S=magnitude, sr=self.sr, n_fft=N_FFT, hop_length=HOP_LENGTH
+        )
+        chroma = librosa.feature.chroma_stft(
+            S=power, sr=self.sr, n_fft=N_FFT, tuning=self.tuning
+        )
+        mel_db = librosa.power_to_db(self.mel_basis @ power)
+        mfcc = librosa.feature.mfcc(S=mel_db, n_mfcc=13)
+
+        self.frames += magnitude.shape[1]
+        self.centroid_sum += float(centroid.sum())
+        self.mfcc_sum += mfcc.sum(axis=1)
+        self.chroma_sum += chroma.sum(axis=1)
+
+        # Onset strength = mean positive mel-dB flux, carried across blocks
+        if self.last_mel_db is not None:
+            mel_db = np.concatenate([self.last_mel_db, mel_db], axis=1)
+        flux = np.maximum(0.0, np.diff(mel_db, axis=1)).mean(axis=0)
+        self.last_mel_db = mel_db[:, -1:]
+        self._add_onsets(flux.astype(np.float32))
+
+    def _add_onsets(self, onsets: np.ndarray):
+        """Fold every complete tempogram window into the running sum."""
+        envelope = np.concatenate([self.onset_tail, onsets])
+        if len(envelope) < self.tempo_window:
+            self.onset_tail = envelope
+            return
+
+        tempogram = librosa.feature.tempogram(
+            onset_envelope=envelope,
+            sr=self.sr,
+            hop_length=HOP_LENGTH,
+            win_length=self.tempo_window,
+            center=False,
+        )
+        self.tempogram_sum += tempogram.sum(axis=1)
+        self.tempogram_frames += tempogram.shape[1]
+        self.onset_tail = envelope[-(self.tempo_window - 1) :]
+
+    def result(self) -> np.ndarray:
+        if self.frames == 0:
+            raise ValueError("Audio is too short to extract features")
+
+        # Trailing padding, at least one full window for very short audio
+        padding = max(self.tempo_window // 2, self.tempo_window - len(self.onset_tail))
+        self._add_onsets(np.zeros(padding, dtype=np.float32))
+        mean_tempogram = self.tempogram_sum / self.tempogram_frames
+        tempo = librosa.feature.tempo(
+            tg=mean_tempogram[:, np.newaxis], sr=self.sr, hop_length=HOP_LENGTH
+        )
+        return combine_features(
+            tempo[0],
+            self.centroid_sum / self.frames,
+            self.mfcc_sum / self.frames,
+            self.chroma_sum / self.frames,
+        )
+
+
+class StreamingFeatureExtractor(FeatureExtractor):
+    """
+    Block-wise pipeline for long audio (mixes, podcasts): decodes a block
+    at a time, keeps running means of centroid / MFCC / chroma and only the
+    onset envelope for tempo, so memory does not grow with the waveform.
+    Same 27-dim layout as the other extractors.
+    """
+
+    def __init__(self, sr: Optional[int] = ANALYSIS_SAMPLE_RATE, block_seconds=10.0):
+        """
+        sr: analysis sample rate (None = native rate, matching the librosa
+            extractor)
+        block_seconds: audio decoded per block
+        """
+        self.sr = sr
+        self.block_seconds = block_seconds
+        self.version = f"stream-v1-sr{sr or 'native'}"
+
+    def extract(self, audio_path: str) -> np.ndarray:
+        info = sf.info(audio_path)
+        blocks = sf.blocks(
+            audio_path,
+            blocksize=int(self.block_seconds * info.samplerate),
+            dtype="float32",
+            always_2d=True,
+        )
+        # Downmix to mono, as librosa.load does
+        return self.extract_stream(
+            (block.mean(axis=1) for block in blocks), info.samplerate
+        )
+
+    def extract_waveform(self, y: np.ndarray, sr: int) -> np.ndarray:
+        block = int(self.block_seconds * sr)
+        return self.extract_stream(
+            (y[start : start + block] for start in range(0, len(y), block)), sr
+        )
+
+    def extract_stream(self, chunks: Iterable[np.ndarray], sr: int) -> np.ndarray:
+        """Feature vector of mono float32 chunks arriving at sample rate `sr`."""
+        target_sr = self.sr or sr
+        resampler = (
+            soxr.ResampleStream(sr, target_sr, 1, dtype="float32")
+            if target_sr != sr
+            else None
+        )
+        running = _RunningFeatures(target_sr)
+        pending = np.zeros(0, dtype=np.float32)
+
+        def consume(samples: np.ndarray, last: bool = False) -> np.ndarray:
+            if resampler:
+                samples = resampler.resample_chunk(samples, last=last)
+            samples = np.concatenate([pending, samples.astype(np.float32)])
+            if last and len(samples) > 0:
+                # Zero-pad the tail to whole frames
+                frames = max(1, -(-(len(samples) - N_FFT) // HOP_LENGTH) + 1)
+                size = N_FFT + (frames - 1) * HOP_LENGTH
+                samples = np.pad(samples, (0, max(0, size - len(samples))))
+            if len(samples) < N_FFT:
+                return samples
+            frames = 1 + (len(samples) - N_FFT) // HOP_LENGTH
+            running.add(samples[: N_FFT + (frames - 1) * HOP_LENGTH])
+            return samples[frames * HOP_LENGTH :]
+
+        for chunk in chunks:
+            pending = consume(np.asarray(chunk, dtype=np.float32))
+        consume(np.zeros(0, dtype=np.float32), last=True)
+
+        return running.result()
+
+
+FEATURE_EXTRACTORS: Dict[str, type] = {
+    "librosa": LibrosaFeatureExtractor,
+    "fast": FastFeatureExtractor,
+    "streaming": StreamingFeatureExtractor,
+}
+
+
+def create_feature_extractor(name: str = "librosa", **options) -> FeatureExtractor:
+    """Build a feature extractor by name ("librosa", "fast" or "streaming")."""
+    if name not in FEATURE_EXTRACTORS:
+        raise ValueError(
+            f"Unknown feature extractor '{name}', expected one of {sorted(FEATURE_EXTRACTORS)}"
+        )
+    return FEATURE_EXTRACTORS[name](**options)
@@ -0,0 +1,88 @@
+from abc import ABC, abstractmethod
+from typing import Dict
+
+import numpy as np
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, selected with argpartition.
+    Equal scores keep their input order, exactly like a stable descending
+    sort of the whole array would.
+    """
+    n = scores.shape[0]
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]  # k-th highest
+    above = np.flatnonzero(scores > threshold)
+    tied = np.flatnonzero(scores == threshold)[: k - above.size]
+    chosen = np.sort(np.concatenate([above, tied]))
+    return chosen[np.argsort(-scores[chosen], kind="stable")]
+
+
+class Reranker(ABC):
+    """
+    Scores /similar candidates from their distances and feedback sums.
+    Works on whole arrays so the cost per candidate stays in NumPy.
+    """
+
+    name = "abstract"
+
+    @abstractmethod
+    def scores(self, distances: np.ndarray, feedback: np.ndarray) -> np.ndarray:
+        """0-10 score per candidate (higher is better)."""
+        pass
+
+
+class FeedbackPenaltyReranker(Reranker):
+    """
+    The original scoring: 10 * (1 - distance * distance_scale), minus a
+    penalty of up to 10 for net downvotes (10 * tanh(|votes| * sensitivity)),
+    floored at 0. Net upvotes never raise the score.
+    """
+
+    name = "feedback_penalty"
+
+    def __init__(self, sensitivity: float = 0.1, distance_scale: float = 100.0):
+        """
+        sensitivity: how fast the downvote penalty climbs (smaller = more
+            downvotes needed for a large penalty)
+        distance_scale: cosine distances are tiny for these features, so
+            they are stretched before being turned into a 0-10 score
+        """
+        self.sensitivity = sensitivity
+        self.distance_scale = distance_scale
+
+    def scores(self, distances: np.ndarray, feedback: np.ndarray) -> np.ndarray:
+        base = 10.0 * (1.0 - distances * self.distance_scale)
+        penalty = np.where(
+            feedback < 0, 10.0 * np.tanh(np.abs(feedback) * self.sensitivity), 0.0
+        )
+        return np.maximum(base - penalty, 0.0)
+
+
+class DistanceReranker(FeedbackPenaltyReranker):
+    """Similarity only: the base score of FeedbackPenaltyReranker, votes ignored."""
+
+    name = "distance"
+
+    def scores(self, distances: np.ndarray, feedback: np.ndarray) -> np.ndarray:
+        return super().scores(distances, np.zeros_like(feedback))
+
+
+RERANKERS: Dict[str, type] = {
+    "feedback_penalty": FeedbackPenaltyReranker,
+    "distance": DistanceReranker,
+}
+
+
+def create_reranker(name: str = "feedback_penalty", **options) -> Reranker:
+    """Build a re-ranker by name ("feedback_penalty" or "distance")."""
+    if name not in RERANKERS:
+        raise ValueError(
+            f"Unknown reranker '{name}', expected one of {sorted(RERANKERS)}"
+        )
+    return RERANKERS[name](**options)
@@ -0,0 +1,225 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Bumped on every insert: a new song can enter any neighbour list
+GENERATION_KEY = "similar:generation"
+SIMILAR_CACHE_BACKENDS = ("memory", "redis")
+
+
+def _song_version_key(song_id: int) -> str:
+    return f"similar:song:{song_id}"
+
+
+class SimilarCacheBackend(ABC):
+    """
+    Key-value store behind SimilarResultCache: cached result lists with a
+    TTL plus integer counters (the invalidation versions).
+    """
+
+    # True if calls never block on I/O (safe to call on the event loop)
+    local = True
+    name = "abstract"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Cached value, or None if missing or expired."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: List[Dict], ttl: float):
+        pass
+
+    @abstractmethod
+    def counters(self, names: List[str]) -> List[int]:
+        """Current values of the named counters (0 if never incremented)."""
+        pass
+
+    @abstractmethod
+    def incr(self, name: str) -> int:
+        pass
+
+    def evictions(self) -> int:
+        """Entries dropped for size or age (where the backend can tell)."""
+        return 0
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class MemorySimilarCacheBackend(SimilarCacheBackend):
+    """
+    Per-process LRU with per-entry expiry. Counters live outside the LRU so
+    invalidation versions are never evicted.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self, max_entries: int = 10_000, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: List[Dict], ttl: float):
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def counters(self, names: List[str]) -> List[int]:
+        with self._lock:
+            return [self._counters.get(name, 0) for name in names]
+
+    def incr(self, name: str) -> int:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def evictions(self) -> int:
+        return self._evictions
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+
+class RedisSimilarCacheBackend(SimilarCacheBackend):
+    """
+    Shared cache for multi-worker deployments. `client` needs the redis-py
+    subset get / set(px=) / mget / incr, so a local fake can stand in for it.
+    Expired entries and memory pressure are handled by Redis itself.
+    """
+
+    local = False
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "jetswitch:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **options) -> "RedisSimilarCacheBackend":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "The redis similar cache backend needs the redis package (pip install redis)"
+            ) from e
+        return cls(redis.Redis.from_url(url), **options)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: List[Dict], ttl: float):
+        self.client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    def counters(self, names: List[str]) -> List[int]:
+        values = self.client.mget([self.prefix + name for name in names])
+        return [int(value or 0) for value in values]
+
+    def incr(self, name: str) -> int:
+        return int(self.client.incr(self.prefix + name))
+
+
+class SimilarResultCache:
+    """
+    Read-through cache of /similar results keyed by (song_id, limit,
+    exclude_self).
+
+    Invalidation never deletes: each key embeds the global generation and
+    the query song's version, and invalidating bumps the counter so old
+    entries become unreachable (and age out by TTL/LRU). Because the key is
+    taken before the results are computed, a computation that races with an
+    invalidation stores its stale result under the old, unreachable key.
+    """
+
+    def __init__(self, backend: SimilarCacheBackend, ttl: float = 300.0):
+        self.backend = backend
+        self.ttl = ttl
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+
+    def lookup(
+        self, song_id: int, limit: int, exclude_self: bool
+    ) -> Tuple[str, Optional[List[Dict]]]:
+        """(key to store the computed result under, cached result or None)."""
+        generation, version = self.backend.counters(
+            [GENERATION_KEY, _song_version_key(song_id)]
+        )
+        key = f"similar:{generation}:{song_id}.{version}:{limit}:{int(exclude_self)}"
+        value = self.backend.get(key)
+        self._count("misses" if value is None else "hits")
+        return key, value
+
+    def store(self, key: str, results: List[Dict]):
+        self.backend.set(key, results, self.ttl)
+
+    def invalidate_song(self, song_id: int):
+        """Drop every cached result for one query song (e.g. new feedback)."""
+        self.backend.incr(_song_version_key(song_id))
+        self._count("invalidations")
+
+    def invalidate_all(self):
+        """Drop every cached result (e.g. a song was inserted)."""
+        self.backend.incr(GENERATION_KEY)
+        self._count("invalidations")
+
+    def stats(self) -> Dict:
+        """This process's hit/miss counters and the backend's evictions."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            "backend": self.backend.name,
+            "ttl_seconds": self.ttl,
+            "entries": self.backend.size(),
+            "evictions": self.backend.evictions(),
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            **stats,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def create_similar_cache(
+    backend: str,
+    ttl: float = 300.0,
+    max_entries: int = 10_000,
+    redis_url: Optional[str] = None,
+) -> SimilarResultCache:
+    """Build a cache from configuration names (see SIMILAR_CACHE_BACKENDS)."""
+    if backend == "memory":
+        return SimilarResultCache(MemorySimilarCacheBackend(max_entries), ttl=ttl)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("The redis similar cache backend needs a Redis URL")
+        return SimilarResultCache(RedisSimilarCacheBackend.from_url(redis_url), ttl=ttl)
+    raise ValueError(
+        f"Unknown similar cache backend '{backend}'. "
+        f"Available: {', '.join(SIMILAR_CACHE_BACKENDS)}"
+    )
@@ -1,11 +1,65 @@
+import io
 import os
+import time
+import subprocess
+from contextlib import ExitStack, contextmanager
+import soundfile as sf
+import soxr
+import asyncio
+import itertools
 import yt_dlp
-import librosa
 import tempfile
 import numpy as np
-from typing import Optional, Tuple, Dict
-from src.repositories.vector_repository import VectorRepository
-from src.models import SongData, SongResult, SimilarSongResult
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import AsyncIterator, Callable, Iterator, Optional, Tuple, Dict, List
+from src.repositories.vector_repository import VectorRepository, song_fields
+from src.repositories.async_vector_repository import AsyncVectorRepository
+from src.repositories.source_keys import canonical_source_key
+from src.jobs.analysis_queue import run_extraction_task
+from src.extractors.analysis_cache import AnalysisCache
+from src.extractors.similar_cache import SimilarResultCache
+from src.extractors.reranking import FeedbackPenaltyReranker, Reranker, top_k
+from src.extractors.features import (
+    ANALYSIS_SAMPLE_RATE,
+    FeatureExtractor,
+    LibrosaFeatureExtractor,
+    StreamingFeatureExtractor,
+)
+from src.models import (
+    SongData,
+    SongResult,
+    ExtractionMode,
+    SimilarSongResult,
+    JobStatus,
+    BatchAnalyzeResult,
+    BatchItemResult,
+    BatchItemStatus,
+    SimilarBatchItem,
+    SimilarBatchResult,
+)
+
+
+DOWNLOAD_MODES = ("file", "pipe")
+# Where find_similar_by_id gets its candidates: a live vector search, or the
+# precomputed song_neighbors lists (live search for songs without one)
+SIMILAR_SOURCES = ("live", "neighbors")
+# Bytes of float32 PCM read from ffmpeg per streaming block (~5 s at 22.05 kHz)
+PIPE_BLOCK_BYTES = 4 * 110_250
+# Adaptive /similar over-fetch (min_score): default time budget for widening
+# the candidate pool, and a hard cap on the candidates it may read
+ADAPTIVE_BUDGET_MS = 50.0
+ADAPTIVE_MAX_CANDIDATES = 1000
+# Rows pulled per worker-thread hop when streaming songs from a sync repository
+STREAM_CHUNK_SIZE = 500
+# Batch extractions submitted at once when the executor sets no bound, so
+# finished ones are stored while the rest of the batch is still queued
+BATCH_MAX_IN_FLIGHT = 8
 
 
 class MusicAnalysisService:
@@ -14,8 +68,50 @@ class MusicAnalysisService:
     The repository is used internally; FastAPI should never access it directly.
     """
 
-    def __init__(self, repository: VectorRepository):
+    def __init__(
+        self,
+        repository: VectorRepository,
+        async_repository: Optional[AsyncVectorRepository] = None,
+        job_queue=None,
+        feature_extractor: Optional[FeatureExtractor] = None,
+        streaming_extractor: Optional[FeatureExtractor] = None,
+        streaming_threshold_seconds: Optional[float] = None,
+        download_mode: str = "file",
+        analysis_cache: Optional[AnalysisCache] = None,
+        similar_cache: Optional[SimilarResultCache] = None,
+        similar_source: str = "live",
+        reranker: Optional[Reranker] = None,
+    ):
         self.repository = repository  # Private – used only within this service
+        # Optional event-loop native repository for the *_async read paths.
+        # Without it, the async methods run the sync ones in a worker thread.
+        self.async_repository = async_repository
+        # Optional AnalysisJobQueue running analyze_and_store in a worker pool
+        self.job_queue = job_queue
+        # Audio -> 27-dim vector; defaults to the original librosa pipeline
+        self.feature_extractor = feature_extractor or LibrosaFeatureExtractor()
+        # Bounded-memory extractor for long audio; ExtractionMode.AUTO uses it
+        # for tracks longer than streaming_threshold_seconds (None = never)
+        self.streaming_extractor = streaming_extractor or StreamingFeatureExtractor(
+            sr=getattr(self.feature_extractor, "sr", None)
+        )
+        self.streaming_threshold_seconds = streaming_threshold_seconds
+        # "file": yt_dlp downloads and transcodes to WAV, then extraction runs.
+        # "pipe": ffmpeg decodes the remote stream to PCM on stdout and the
+        # streaming extractor consumes it as it arrives (no disk, no WAV pass)
+        if download_mode not in DOWNLOAD_MODES:
+            raise ValueError(f"download_mode must be one of {DOWNLOAD_MODES}")
+        self.download_mode = download_mode
+        # Optional on-disk cache of downloaded audio and extracted features
+        self.analysis_cache = analysis_cache
+        # Optional read-through cache of find_similar_by_id results
+        self.similar_cache = similar_cache
+        if similar_source not in SIMILAR_SOURCES:
+            raise ValueError(f"similar_source must be one of {SIMILAR_SOURCES}")
+        self.similar_source = similar_source
+        # Scores candidates for every /similar read; the default reproduces
+        # the original distance score with a downvote penalty
+        self.reranker = reranker or FeedbackPenaltyReranker()
 
     def analyze_and_store(self, song_data: SongData) -> Tuple[SongResult, bool]:
         """
@@ -37,136 +133,322 @@ class MusicAnalysisService:
             return SongResult(**existing_song), False
         # --- END: OPTIMIZATION ---
 
-        audio_path = None
-        try:
-            # Step 2: Download and extract features (only if it's a new song)
-            print(f"⬇️ Downloading audio for: {song_data.title}")
-            audio_path = self._download_audio(song_data.url)
+        # Step 2: Download and extract features (only if it's a new song)
+        print(f"⬇️ Downloading audio for: {song_data.title}")
+        features = self.extract_from_url(song_data.url, song_data.extraction_mode)
+        print("✅ Analyzed song features")
+
+        # Step 3: Store in repository
+        song_dict, is_new = self.repository.store_features(
+            title=song_data.title,
+            artist_name=song_data.artist_name,
+            url=song_data.url,
+            song_feature=features,
+            source_platform=song_data.source_platform,
+            added_by=song_data.added_by,
+            release_date=song_data.release_date,
+        )
+
+        if is_new:
+            print("💾 Stored new song in repository")
+            self._invalidate_similar()
+        else:
+            # This should rarely happen now, but good as a safety check
+            print("🔄 Song already exists in repository (race condition)")
+
+        return SongResult(**song_dict), is_new
+
+    def extract_from_url(
+        self, url: str, mode: ExtractionMode = ExtractionMode.AUTO
+    ) -> np.ndarray:
+        """
+        Download a URL's audio and return its feature vector (no storage).
+        With an analysis cache, cached features or audio avoid the download.
+        """
+        cache = self.analysis_cache
+        if cache:
+            features = cache.get_features(url, self._feature_versions(mode))
+            if features is not None:
+                print("💾 Using cached features")
+                return features
+
+            cached_audio = cache.get_audio(url, self._audio_rate())
+            if cached_audio:
+                print("💾 Extracting features from cached audio...")
+                return self._extract_and_cache(url, cached_audio, mode)
+
+        if self.download_mode == "pipe" and mode != ExtractionMode.FULL:
+            print("🔬 Extracting features from the audio stream...")
+            features = self._extract_from_pipe(url, mode)
+            if cache:
+                extractor = self._capped_extractor(mode) or self.streaming_extractor
+                cache.put_features(url, extractor.version, features)
+            return features
+
+        # The whole download directory goes away, not just the WAV
+        with tempfile.TemporaryDirectory(prefix="jetswitch-") as tempdir:
+            audio_path = self._download_audio(url, tempdir)
+            if cache:
+                audio_path = cache.put_audio(url, audio_path, sr=self._audio_rate())
             print("🔬 Extracting features...")
-            features = self._extract_features(audio_path)
-            print("✅ Analyzed song features")
-
-            # Step 3: Store in repository
-            song_dict, is_new = self.repository.store_features(
-                title=song_data.title,
-                artist_name=song_data.artist_name,
-                url=song_data.url,
-                song_feature=features,
-                source_platform=song_data.source_platform,
-                added_by=song_data.added_by,
-                release_date=song_data.release_date,
-            )
+            if cache:
+                return self._extract_and_cache(url, audio_path, mode)
+            return self._extract_features(audio_path, mode)
 
-            if is_new:
-                print("💾 Stored new song in repository")
+    def analyze_batch(
+        self,
+        songs: List[SongData],
+        executor: Optional[Executor] = None,
+        extract_task: Optional[Callable[[str, ExtractionMode], np.ndarray]] = None,
+        insert_batch_size: int = 50,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        max_in_flight: Optional[int] = None,
+    ) -> BatchAnalyzeResult:
+        """
+        Analyze and store many songs.
+
+        - Existing URLs are found with one bulk lookup and never downloaded.
+        - Downloads/extractions run in parallel on `executor` (a process pool
+          for CPU-bound extraction; then `extract_task` must be a picklable
+          module-level function such as jobs.analysis_queue.run_extraction_task).
+        - At most `max_in_flight` extractions are submitted at once (default:
+          the executor's max_in_flight, else BATCH_MAX_IN_FLIGHT); the next
+          one is submitted as each finished one is consumed.
+        - Results are inserted `insert_batch_size` rows at a time.
+        - One failing song is reported and does not abort the batch.
+
+        on_progress(done, total) is called after each extraction finishes.
+        """
+        started = time.monotonic()
+        items: List[Optional[BatchItemResult]] = [None] * len(songs)
+
+        # Step 1: Collapse sources repeated within the batch (any URL form)
+        first_index: Dict[str, int] = {}
+        duplicates: List[Tuple[int, int]] = []
+        for i, song in enumerate(songs):
+            key = canonical_source_key(song.url)
+            if key in first_index:
+                duplicates.append((i, first_index[key]))
             else:
-                # This should rarely happen now, but good as a safety check
-                print("🔄 Song already exists in repository (race condition)")
+                first_index[key] = i
+
+        # Step 2: One bulk existence check instead of a query per song
+        existing = self.repository.get_songs_by_urls(
+            [songs[i].url for i in first_index.values()]
+        )
+        pending = []
+        for i in first_index.values():
+            url = songs[i].url
+            if url in existing:
+                items[i] = BatchItemResult(
+                    url=url,
+                    status=BatchItemStatus.EXISTS,
+                    song=SongResult(**existing[url]),
+                )
+            else:
+                pending.append(i)
+
+        print(
+            f"📦 Batch of {len(songs)}: {len(existing)} existing, {len(pending)} to analyze"
+        )
+
+        # Step 3: Extract in parallel, store in chunks as results arrive
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=1)
+        task = extract_task or self.extract_from_url
+        max_in_flight = (
+            max_in_flight
+            or getattr(executor, "max_in_flight", None)
+            or BATCH_MAX_IN_FLIGHT
+        )
+
+        try:
+            queued = iter(pending)
+            in_flight: Dict[Future, int] = {}
+
+            def submit(count: int):
+                for i in itertools.islice(queued, count):
+                    url, mode = songs[i].url, songs[i].extraction_mode
+                    in_flight[executor.submit(task, url, mode)] = i
+
+            submit(max_in_flight)
+            ready: List[Tuple[int, np.ndarray]] = []
+            done = 0
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                future = next(iter(finished))
+                i = in_flight.pop(future)
+                done += 1
+                try:
+                    result = future.result()
+                    if isinstance(result, dict):
+                        # Stored meanwhile by an in-flight analysis job
+                        # (see AnalysisJobQueue.submit_extraction)
+                        items[i] = BatchItemResult(
+                            url=songs[i].url,
+                            status=BatchItemStatus.EXISTS,
+                            song=SongResult(**result),
+                        )
+                    else:
+                        ready.append((i, result))
+                except Exception as e:
+                    print(f"❌ Failed to analyze {songs[i].url}: {e}")
+                    items[i] = BatchItemResult(
+                        url=songs[i].url, status=BatchItemStatus.FAILED, error=str(e)
+                    )
 
-            return SongResult(**song_dict), is_new
+                if len(ready) >= insert_batch_size:
+                    self._store_batch(songs, ready, items)
+                    ready = []
+                if on_progress:
+                    on_progress(done, len(pending))
+                submit(1)
 
+            if ready:
+                self._store_batch(songs, ready, items)
         finally:
-            if audio_path and os.path.exists(audio_path):
-                os.remove(audio_path)
+            if own_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        for i, first in duplicates:
+            items[i] = BatchItemResult(
+                url=songs[i].url,
+                status=BatchItemStatus.DUPLICATE,
+                song=items[first].song,
+                error=items[first].error,
+            )
+
+        elapsed = time.monotonic() - started
+        stored = sum(item.status == BatchItemStatus.STORED for item in items)
+        report = BatchAnalyzeResult(
+            items=items,
+            stored=stored,
+            existing=sum(item.status == BatchItemStatus.EXISTS for item in items),
+            failed=sum(item.status == BatchItemStatus.FAILED for item in items),
+            elapsed_seconds=elapsed,
+            songs_per_second=stored / elapsed if elapsed > 0 else 0.0,
+        )
+        print(
+            f"🏁 Batch done: {report.stored} stored, {report.existing} existing, "
+            f"{report.failed} failed in {elapsed:.1f}s"
+        )
+        return report
 
     def find_similar_by_id(
         self,
         song_id: int,
         limit: int = 10,
         exclude_self: bool = True,
+        min_score: Optional[float] = None,
+        budget_ms: Optional[float] = None,
     ) -> list[SimilarSongResult]:
         """
         Find similar songs by song ID, now with the distance-based score and
         negative-only feedback adjustment (max score of 10, min score of 0).
+        With min_score, only results scoring at least that are returned and
+        the candidate pool is widened adaptively (uncached, see
+        _find_similar_adaptive) within budget_ms.
         Returns: A list of similar songs with adjusted scores (0-10 scale).
         """
+        if min_score is not None:
+            return self._find_similar_adaptive(
+                song_id, limit, exclude_self, min_score, budget_ms
+            )
 
-        # --- START: NEW SCORE CONFIGURATION ---
-        # The score is primarily driven by 10 * (1 - distance).
-        # This value controls how "fast" the negative vote penalty climbs.
-        # A smaller value (e.g., 0.1) requires more downvotes for a large penalty.
-        VOTE_PENALTY_SENSITIVITY = 0.1
-        # --- END: NEW SCORE CONFIGURATION ---
+        if self.similar_cache:
+            key, cached = self.similar_cache.lookup(song_id, limit, exclude_self)
+            if cached is not None:
+                return [SimilarSongResult(**song) for song in cached]
 
-        # Step 1: Retrieve features
-        features = self.repository.get_features(song_id)
-        if features is None:
+        # Find candidates with their feedback sums in one repository call
+        # (get a few extra to allow for re-ranking)
+        search_limit = limit + 5  # Get a few extra candidates
+        similar_raw = None
+        if self.similar_source == "neighbors":
+            similar_raw = self.repository.find_similars_from_neighbors(
+                song_id, search_limit
+            )
+        if similar_raw is None:
+            similar_raw = self.repository.find_similars_with_feedback(
+                song_id=song_id,
+                limit=search_limit,
+                metric="cosine",
+            )
+        if similar_raw is None:
             raise ValueError(f"Song with ID {song_id} not found")
 
-        # Step 2: Find similar songs (get a few extra to allow for re-ranking)
-        search_limit = limit + 5  # Get a few extra candidates
-        similar_raw = self.repository.find_similars(
-            features=features,
-            limit=search_limit,
-            metric="cosine",
-            exclude_id=None,
+        results = (
+            self._rank_similar(song_id, similar_raw, limit, exclude_self)
+            if similar_raw
+            else []
         )
+        if self.similar_cache:
+            self.similar_cache.store(key, [song.model_dump() for song in results])
+        return results
 
-        if not similar_raw:
-            return []
-
-        # Step 3: Get feedback scores for these candidates
-        candidate_ids = [song["id"] for song in similar_raw]
-        feedback_scores = self.repository.get_feedback_scores(
-            query_song_id=song_id, suggested_song_ids=candidate_ids
+    def find_similar_by_vector(
+        self, features: np.ndarray, limit: int = 10
+    ) -> list[SimilarSongResult]:
+        """
+        Similar songs for an arbitrary feature vector; nothing is stored.
+        Scored like find_similar_by_id, without feedback (there is no query
+        song the votes could refer to).
+        """
+        features = self._query_vector(features)
+        similar_raw = self.repository.find_similars(
+            features, limit=limit, metric="cosine"
         )
+        return self._rank_unstored(similar_raw, limit)
 
-        # Step 4: Calculate new combined score
-        results = []
-
-        for song in similar_raw:
-            # Exclude self if needed
-            if exclude_self and song["id"] == song_id:
-                continue
-
-            distance = song["distance"]  # Cosine Distance (0.0 to 1.0)
-
-            # 1. Calculate Base Score (0 to 10)
-            # Distance=0 (Perfect Match) -> BaseScore=10.0
-            # Distance=1 (Max Distance) -> BaseScore=0.0
-            base_score = 10.0 * (1.0 - distance * 100)
-
-            # Get vote score (Positive = upvotes, Negative = downvotes)
-            total_votes = feedback_scores.get(song["id"], 0)
-
-            # 2. Calculate Penalty Score (>= 0)
-            # Only apply a penalty if total_votes is negative (net downvotes).
-            if total_votes < 0:
-                # np.tanh(abs(total_votes) * sensitivity) results in a value between 0 and 1.
-                # This is scaled up to 10 to represent the maximum possible penalty.
-                penalty = 10.0 * np.tanh(abs(total_votes) * VOTE_PENALTY_SENSITIVITY)
-            else:
-                # If votes are 0 or positive (net upvotes), the penalty is 0.
-                penalty = 0.0
+    def find_similar_by_audio(
+        self, audio: bytes, limit: int = 10
+    ) -> list[SimilarSongResult]:
+        """
+        Similar songs for an uploaded audio clip, decoded in memory (no
+        download, no database write). Raises ValueError for undecodable audio.
+        """
+        return self.find_similar_by_vector(self.extract_from_audio(audio), limit)
 
-            # 3. Combine scores
-            # Positive feedback (penalty=0) keeps the score at the base_score (max 10).
-            # Negative feedback (penalty>0) reduces the score from the base_score.
-            combined_score = base_score - penalty
+    def extract_from_audio(self, audio: bytes) -> np.ndarray:
+        """
+        Feature vector of encoded audio bytes (any format libsndfile reads:
+        WAV, FLAC, OGG, MP3), with the configured extractor.
+        """
+        try:
+            y, sr = sf.read(io.BytesIO(audio), dtype="float32", always_2d=True)
+        except sf.SoundFileError as e:
+            raise ValueError(f"Unsupported or corrupt audio: {e}") from None
+        if y.shape[0] == 0:
+            raise ValueError("Audio contains no samples")
 
-            # 4. Enforce the minimum score of 0.
-            combined_score = max(0.0, combined_score)
+        y = y.mean(axis=1)
+        # Decode like the extractor would from a file (e.g. "fast" analyses at 22.05 kHz)
+        target_sr = getattr(self.feature_extractor, "sr", None)
+        if target_sr and target_sr != sr:
+            y, sr = soxr.resample(y, sr, target_sr), target_sr
+        return self.feature_extractor.extract_waveform(y, sr)
 
-            results.append(
-                {
-                    "song": SimilarSongResult(
-                        id=song["id"],
-                        title=song["title"],
-                        artist_name=song["artist_name"],
-                        url=song["url"],
-                        source_platform=song["source_platform"],
-                        score=combined_score,  # Use the new 0-10 scale score
-                    ),
-                    "combined_score": combined_score,
-                }
+    def find_similar_batch(
+        self,
+        song_ids: List[int],
+        limit: int = 10,
+        exclude_self: bool = True,
+    ) -> SimilarBatchResult:
+        """
+        find_similar_by_id for many seeds: cached seeds are answered from the
+        similar cache and the rest share one batched repository search.
+        Unknown ids are reported with found=False; items follow the input.
+        """
+        results, keys = self._cached_similar_batch(song_ids, limit, exclude_self)
+        if keys:
+            similar_raw = self.repository.find_similars_with_feedback_batch(
+                list(keys), limit=limit + 5, metric="cosine"
             )
-
-        # Step 5: Re-sort based on the new combined score
-        results.sort(key=lambda x: x["combined_score"], reverse=True)
-
-        # Step 6: Return the top 'limit' songs
-        # The 'score' field in the returned object is now on your 0-10 scale.
-        return [res["song"] for res in results[:limit]]
+            self._rank_similar_batch(similar_raw, keys, limit, exclude_self, results)
+            if self.similar_cache:
+                self._store_similar_batch(keys, results)
+        return self._similar_batch_result(song_ids, results)
 
     def store_user_feedback(
         self, user_id: int, query_song_id: int, suggested_song_id: int, vote: int
@@ -179,6 +461,7 @@ class MusicAnalysisService:
             f"🔔 Service storing feedback: User {user_id} on {query_song_id} -> {suggested_song_id} ({vote})"
         )
         self.repository.store_feedback(user_id, query_song_id, suggested_song_id, vote)
+        self._invalidate_similar(query_song_id)
 
     def list_all_songs(self) -> list[SongResult]:
         """
@@ -188,35 +471,584 @@ class MusicAnalysisService:
         songs = self.repository.list_all_songs()
         return [SongResult(**song) for song in songs]
 
+    def list_songs(
+        self,
+        after_id: int = 0,
+        limit: int = 100,
+        fields: Optional[List[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        One keyset page of songs (id > after_id, id order) as plain dicts
+        projected to `fields`. The last id is the `after_id` of the next page.
+        Raises ValueError for unknown fields.
+        """
+        return self.repository.list_songs(
+            after_id, limit, fields, source_platform, added_by
+        )
+
+    def iter_songs(
+        self,
+        after_id: int = 0,
+        fields: Optional[List[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """
+        Stream every matching song (server-side cursor where available).
+        Fields are validated here, before the first row is produced.
+        """
+        song_fields(fields)
+        return self.repository.iter_songs(after_id, fields, source_platform, added_by)
+
     def get_song_by_id(self, song_id: int) -> Optional[SongResult]:
         """
         Retrieve a specific song by ID.
         Returns: SongResult or None if not found.
         """
-        songs = self.repository.list_all_songs()
-        song = next((s for s in songs if s["id"] == song_id), None)
+        song = self.repository.get_song_by_id(song_id)
         return SongResult(**song) if song else None
 
+    # ============================================
+    # Background analysis jobs
+    # ============================================
+
+    def submit_analysis(self, song_data: SongData) -> JobStatus:
+        """
+        Queue analyze_and_store on the worker pool.
+        Concurrent submissions for the same URL share one job.
+        """
+        if not self.job_queue:
+            raise RuntimeError("Background analysis is not configured")
+        return self._submit_job(song_data)
+
+    def get_analysis_job(self, job_id: str) -> Optional[JobStatus]:
+        """Status of a background analysis job (None if unknown/expired)."""
+        if not self.job_queue:
+            return None
+        return self.job_queue.get(job_id)
+
+    async def analyze_and_store_async(
+        self, song_data: SongData
+    ) -> Tuple[SongResult, bool]:
+        """
+        analyze_and_store without holding an event-loop thread: runs through
+        the job queue (and its in-flight dedupe) when one is configured.
+        """
+        if not self.job_queue:
+            return await asyncio.to_thread(self.analyze_and_store, song_data)
+
+        job = self._submit_job(song_data)
+        song, is_new = await asyncio.wrap_future(self.job_queue.future(job.id))
+        return SongResult(**song), is_new
+
+    async def analyze_batch_async(self, songs: List[SongData]) -> BatchAnalyzeResult:
+        """
+        analyze_batch off the event loop, extracting on the job queue's
+        worker pool when one is configured (bounded by its capacity, and
+        joining analysis jobs already running for a URL).
+        """
+        if not self.job_queue:
+            return await asyncio.to_thread(self.analyze_batch, songs)
+
+        return await asyncio.to_thread(
+            self.analyze_batch,
+            songs,
+            executor=self.job_queue.batch_executor(),
+            extract_task=run_extraction_task,
+        )
+
+    def close(self):
+        """Release repository resources (called on application shutdown)."""
+        if self.job_queue:
+            self.job_queue.shutdown()
+        self.repository.close()
+
+    # ============================================
+    # Async read paths (used by the async FastAPI routes)
+    # ============================================
+
+    async def open_async(self):
+        """Open the async repository's resources (called on application startup)."""
+        if self.async_repository:
+            await self.async_repository.open()
+
+    async def close_async(self):
+        """Release async and sync repository resources."""
+        if self.async_repository:
+            await self.async_repository.close()
+        self.close()
+
+    def _async_similarity(self) -> bool:
+        """
+        Whether similarity reads go to the async repository. Not when the
+        sync repository searches an in-process index: that would bypass it.
+        """
+        return bool(self.async_repository) and not self.repository.in_process_search
+
+    async def find_similar_by_id_async(
+        self,
+        song_id: int,
+        limit: int = 10,
+        exclude_self: bool = True,
+        min_score: Optional[float] = None,
+        budget_ms: Optional[float] = None,
+    ) -> list[SimilarSongResult]:
+        """
+        Async version of find_similar_by_id (same scoring). Adaptive
+        requests (min_score) stream candidates through the sync repository
+        in a worker thread.
+        """
+        if not self._async_similarity() or min_score is not None:
+            return await asyncio.to_thread(
+                self.find_similar_by_id,
+                song_id,
+                limit,
+                exclude_self,
+                min_score,
+                budget_ms,
+            )
+
+        if self.similar_cache:
+            key, cached = await self._similar_cache_call(
+                self.similar_cache.lookup, song_id, limit, exclude_self
+            )
+            if cached is not None:
+                return [SimilarSongResult(**song) for song in cached]
+
+        search_limit = limit + 5  # Get a few extra candidates
+        similar_raw = None
+        if self.similar_source == "neighbors":
+            similar_raw = await self.async_repository.find_similars_from_neighbors(
+                song_id, search_limit
+            )
+        if similar_raw is None:
+            similar_raw = await self.async_repository.find_similars_with_feedback(
+                song_id=song_id,
+                limit=search_limit,
+                metric="cosine",
+            )
+        if similar_raw is None:
+            raise ValueError(f"Song with ID {song_id} not found")
+
+        results = (
+            self._rank_similar(song_id, similar_raw, limit, exclude_self)
+            if similar_raw
+            else []
+        )
+        if self.similar_cache:
+            await self._similar_cache_call(
+                self.similar_cache.store, key, [song.model_dump() for song in results]
+            )
+        return results
+
+    async def find_similar_by_vector_async(
+        self, features: np.ndarray, limit: int = 10
+    ) -> list[SimilarSongResult]:
+        """Async version of find_similar_by_vector."""
+        if not self._async_similarity():
+            return await asyncio.to_thread(self.find_similar_by_vector, features, limit)
+
+        features = self._query_vector(features)
+        similar_raw = await self.async_repository.find_similars(
+            features, limit=limit, metric="cosine"
+        )
+        return self._rank_unstored(similar_raw, limit)
+
+    async def find_similar_by_audio_async(
+        self, audio: bytes, limit: int = 10
+    ) -> list[SimilarSongResult]:
+        """Async version of find_similar_by_audio (extraction runs in a thread)."""
+        features = await asyncio.to_thread(self.extract_from_audio, audio)
+        return await self.find_similar_by_vector_async(features, limit)
+
+    async def find_similar_batch_async(
+        self,
+        song_ids: List[int],
+        limit: int = 10,
+        exclude_self: bool = True,
+    ) -> SimilarBatchResult:
+        """Async version of find_similar_batch."""
+        if not self._async_similarity():
+            return await asyncio.to_thread(
+                self.find_similar_batch, song_ids, limit, exclude_self
+            )
+
+        if self.similar_cache and not self.similar_cache.backend.local:
+            results, keys = await asyncio.to_thread(
+                self._cached_similar_batch, song_ids, limit, exclude_self
+            )
+        else:
+            results, keys = self._cached_similar_batch(song_ids, limit, exclude_self)
+        if keys:
+            similar_raw = await self.async_repository.find_similars_with_feedback_batch(
+                list(keys), limit=limit + 5, metric="cosine"
+            )
+            self._rank_similar_batch(similar_raw, keys, limit, exclude_self, results)
+            if self.similar_cache:
+                await self._similar_cache_call(self._store_similar_batch, keys, results)
+        return self._similar_batch_result(song_ids, results)
+
+    async def store_user_feedback_async(
+        self, user_id: int, query_song_id: int, suggested_song_id: int, vote: int
+    ):
+        """Async version of store_user_feedback."""
+        if not self.async_repository:
+            return await asyncio.to_thread(
+                self.store_user_feedback,
+                user_id,
+                query_song_id,
+                suggested_song_id,
+                vote,
+            )
+
+        if vote not in [1, -1]:
+            raise ValueError("Vote must be 1 (up) or -1 (down)")
+
+        await self.async_repository.store_feedback(
+            user_id, query_song_id, suggested_song_id, vote
+        )
+        if self.similar_cache:
+            await self._similar_cache_call(
+                self.similar_cache.invalidate_song, query_song_id
+            )
+
+    async def list_all_songs_async(self) -> list[SongResult]:
+        """Async version of list_all_songs."""
+        if not self.async_repository:
+            return await asyncio.to_thread(self.list_all_songs)
+
+        songs = await self.async_repository.list_all_songs()
+        return [SongResult(**song) for song in songs]
+
+    async def list_songs_async(
+        self,
+        after_id: int = 0,
+        limit: int = 100,
+        fields: Optional[List[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+    ) -> List[Dict]:
+        """Async version of list_songs."""
+        if not self.async_repository:
+            return await asyncio.to_thread(
+                self.list_songs, after_id, limit, fields, source_platform, added_by
+            )
+
+        return await self.async_repository.list_songs(
+            after_id, limit, fields, source_platform, added_by
+        )
+
+    def iter_songs_async(
+        self,
+        after_id: int = 0,
+        fields: Optional[List[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+    ) -> AsyncIterator[Dict]:
+        """
+        Async version of iter_songs. Without an async repository the sync
+        stream is read in chunks on a worker thread.
+        """
+        song_fields(fields)
+        if self.async_repository:
+            return self.async_repository.iter_songs(
+                after_id, fields, source_platform, added_by
+            )
+        return self._iterate_in_thread(
+            self.repository.iter_songs(after_id, fields, source_platform, added_by)
+        )
+
+    async def get_song_by_id_async(self, song_id: int) -> Optional[SongResult]:
+        """Async version of get_song_by_id."""
+        if not self.async_repository:
+            return await asyncio.to_thread(self.get_song_by_id, song_id)
+
+        song = await self.async_repository.get_song_by_id(song_id)
+        return SongResult(**song) if song else None
+
+    def get_cache_stats(self) -> Dict:
+        """Analysis cache usage (disk totals and this process's counters)."""
+        if not self.analysis_cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.analysis_cache.stats()}
+
+    def get_similar_cache_stats(self) -> Dict:
+        """/similar result cache hit/miss/eviction counters."""
+        if not self.similar_cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.similar_cache.stats()}
+
+    def get_pool_stats(self) -> Dict:
+        """Expose the repositories' connection pool statistics."""
+        stats = self.repository.pool_stats()
+        if self.async_repository:
+            stats = {**stats, "async": self.async_repository.pool_stats()}
+        return stats
+
     # ============================================
     # Private helper methods
     # ============================================
-    def _download_audio(self, url: str) -> str:
-        """Download audio from a given URL using yt_dlp."""
-        tempdir = tempfile.mkdtemp()
-        output_path = os.path.join(tempdir, "%(id)s.%(ext)s")
+    def _rank_similar(
+        self,
+        song_id: int,
+        similar_raw: List[Dict],
+        limit: int,
+        exclude_self: bool,
+    ) -> list[SimilarSongResult]:
+        """
+        Re-rank candidates (with "distance" and "feedback_score") by the
+        re-ranker's 0-10 score. Scores are computed for all candidates at
+        once and models are built only for the returned top `limit`.
+        Shared by the sync and async read paths.
+        """
+        if exclude_self:
+            similar_raw = [song for song in similar_raw if song["id"] != song_id]
+        if not similar_raw:
+            return []
+        scores = self._candidate_scores(similar_raw)
+
+        return [
+            SimilarSongResult(
+                id=similar_raw[i]["id"],
+                title=similar_raw[i]["title"],
+                artist_name=similar_raw[i]["artist_name"],
+                url=similar_raw[i]["url"],
+                source_platform=similar_raw[i]["source_platform"],
+                score=float(scores[i]),
+            )
+            for i in top_k(scores, limit)
+        ]
+
+    def _candidate_scores(self, similar_raw: List[Dict]) -> np.ndarray:
+        """Re-ranker scores of candidates, as one array operation."""
+        distances = np.fromiter(
+            (song["distance"] for song in similar_raw), np.float64, len(similar_raw)
+        )
+        feedback = np.fromiter(
+            (song["feedback_score"] for song in similar_raw),
+            np.float64,
+            len(similar_raw),
+        )
+        return self.reranker.scores(distances, feedback)
+
+    def _find_similar_adaptive(
+        self,
+        song_id: int,
+        limit: int,
+        exclude_self: bool,
+        min_score: float,
+        budget_ms: Optional[float],
+    ) -> list[SimilarSongResult]:
+        """
+        Widen the candidate pool from one repository stream (its cursor is
+        reused, never re-queried), doubling the step from limit + 5, until
+        `limit` candidates score at least `min_score`, the stream or
+        ADAPTIVE_MAX_CANDIDATES runs out, or the time budget is spent.
+        """
+        deadline = time.monotonic() + (budget_ms or ADAPTIVE_BUDGET_MS) / 1000.0
+        candidates: List[Dict] = []
+        passing, step = 0, limit + 5
+
+        with self.repository.open_similar_stream(song_id, metric="cosine") as fetch:
+            while True:
+                wanted = min(step, ADAPTIVE_MAX_CANDIDATES - len(candidates))
+                chunk = fetch(wanted)
+                if chunk is None:
+                    raise ValueError(f"Song with ID {song_id} not found")
+                candidates.extend(chunk)
+
+                scored = [s for s in chunk if not (exclude_self and s["id"] == song_id)]
+                if scored:
+                    scores = self._candidate_scores(scored)
+                    passing += int(np.count_nonzero(scores >= min_score))
+
+                if (
+                    passing >= limit
+                    or len(chunk) < wanted
+                    or len(candidates) >= ADAPTIVE_MAX_CANDIDATES
+                    or time.monotonic() >= deadline
+                ):
+                    break
+                step *= 2
+
+        print(
+            f"🎯 Adaptive search for {song_id}: {passing} of {len(candidates)} "
+            f"candidates scored >= {min_score}"
+        )
+        return [
+            song
+            for song in self._rank_similar(song_id, candidates, limit, exclude_self)
+            if song.score >= min_score
+        ]
 
+    def _query_vector(self, features) -> np.ndarray:
+        """Validate a caller-supplied feature vector."""
+        features = np.asarray(features, dtype=np.float64).reshape(-1)
+        dim = getattr(self.repository, "dim", features.shape[0])
+        if features.shape[0] != dim:
+            raise ValueError(f"Feature vector must have dimension {dim}")
+        if not np.all(np.isfinite(features)) or not np.any(features):
+            raise ValueError("Feature vector must be finite and non-zero")
+        return features
+
+    def _rank_unstored(
+        self, similar_raw: Optional[List[Dict]], limit: int
+    ) -> list[SimilarSongResult]:
+        """Rank candidates of a query that is not a stored song (no feedback)."""
+        candidates = [{**song, "feedback_score": 0} for song in similar_raw or []]
+        return self._rank_similar(None, candidates, limit, exclude_self=False)
+
+    def _cached_similar_batch(
+        self, song_ids: List[int], limit: int, exclude_self: bool
+    ) -> Tuple[Dict[int, list], Dict[int, Optional[str]]]:
+        """
+        (results served from the similar cache, {seed id: cache key} of the
+        seeds still to search). Keys are None without a cache.
+        """
+        results, keys = {}, {}
+        for song_id in dict.fromkeys(song_ids):
+            if not self.similar_cache:
+                keys[song_id] = None
+                continue
+            key, cached = self.similar_cache.lookup(song_id, limit, exclude_self)
+            if cached is None:
+                keys[song_id] = key
+            else:
+                results[song_id] = [SimilarSongResult(**song) for song in cached]
+        return results, keys
+
+    def _rank_similar_batch(
+        self,
+        similar_raw: Dict[int, List[Dict]],
+        keys: Dict[int, Optional[str]],
+        limit: int,
+        exclude_self: bool,
+        results: Dict[int, list],
+    ):
+        """Rank each searched seed's candidates into `results`."""
+        for song_id in keys:
+            if song_id not in similar_raw:
+                continue  # Unknown song id
+            results[song_id] = self._rank_similar(
+                song_id, similar_raw[song_id], limit, exclude_self
+            )
+
+    def _store_similar_batch(self, keys: Dict[int, Optional[str]], results: Dict):
+        """Cache the freshly searched seeds' results under their lookup keys."""
+        for song_id, key in keys.items():
+            if song_id in results:
+                self.similar_cache.store(
+                    key, [song.model_dump() for song in results[song_id]]
+                )
+
+    @staticmethod
+    def _similar_batch_result(
+        song_ids: List[int], results: Dict[int, list]
+    ) -> SimilarBatchResult:
+        return SimilarBatchResult(
+            items=[
+                SimilarBatchItem(
+                    song_id=song_id,
+                    found=song_id in results,
+                    similar=results.get(song_id, []),
+                )
+                for song_id in song_ids
+            ]
+        )
+
+    def _store_batch(
+        self,
+        songs: List[SongData],
+        extracted: List[Tuple[int, np.ndarray]],
+        items: List[Optional[BatchItemResult]],
+    ):
+        """Insert extracted songs with one repository call and record outcomes."""
+        try:
+            results = self.repository.store_features_batch(
+                [
+                    {
+                        "title": songs[i].title,
+                        "artist_name": songs[i].artist_name,
+                        "url": songs[i].url,
+                        "song_feature": features,
+                        "source_platform": songs[i].source_platform,
+                        "added_by": songs[i].added_by,
+                        "release_date": songs[i].release_date,
+                    }
+                    for i, features in extracted
+                ]
+            )
+        except Exception as e:
+            print(f"❌ Batch insert failed: {e}")
+            for i, _ in extracted:
+                items[i] = BatchItemResult(
+                    url=songs[i].url, status=BatchItemStatus.FAILED, error=str(e)
+                )
+            return
+
+        if any(is_new for _, is_new in results):
+            self._invalidate_similar()
+        for (i, _), (song_dict, is_new) in zip(extracted, results):
+            items[i] = BatchItemResult(
+                url=songs[i].url,
+                status=BatchItemStatus.STORED if is_new else BatchItemStatus.EXISTS,
+                song=SongResult(**song_dict),
+            )
+
+    @staticmethod
+    async def _iterate_in_thread(
+        iterator: Iterator, chunk_size: int = STREAM_CHUNK_SIZE
+    ):
+        """Drain a blocking iterator from the event loop, one chunk per thread hop."""
+        while True:
+            chunk = await asyncio.to_thread(
+                list, itertools.islice(iterator, chunk_size)
+            )
+            for item in chunk:
+                yield item
+            if len(chunk) < chunk_size:
+                return
+
+    def _invalidate_similar(self, song_id: Optional[int] = None):
+        """Drop cached /similar results for one query song, or all of them."""
+        if not self.similar_cache:
+            return
+        if song_id is None:
+            self.similar_cache.invalidate_all()
+        else:
+            self.similar_cache.invalidate_song(song_id)
+
+    async def _similar_cache_call(self, method, *args):
+        """Call the similar cache, off the event loop if its backend does I/O."""
+        if self.similar_cache.backend.local:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    def _submit_job(self, song_data: SongData) -> JobStatus:
+        """
+        Queue a job; a song inserted by a worker process invalidates the
+        cached /similar results here, where they are served.
+        """
+        job = self.job_queue.submit(song_data)
+        self.job_queue.future(job.id).add_done_callback(self._on_job_done)
+        return job
+
+    def _on_job_done(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, is_new = future.result()
+        if is_new:
+            self._invalidate_similar()
+
+    def _ydl_options(self, **options) -> Dict:
+        """Base yt_dlp options (quiet, best audio, optional cookies)."""
         ydl_opts = {
             "format": "ba[ext=m4a]/bestaudio/best",
-            "outtmpl": output_path,
-            "postprocessors": [
-                {
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "wav",
-                    "preferredquality": "192",
-                }
-            ],
             "quiet": True,
             "noprogress": True,
+            **options,
         }
 
         # --- NEW SECURE COOKIE LOGIC ---
@@ -226,36 +1058,210 @@ class MusicAnalysisService:
             ydl_opts["cookiefile"] = cookies_file
         # -------------------------------
 
+        return ydl_opts
+
+    def _download_audio(self, url: str, tempdir: str) -> str:
+        """Download audio from a given URL into `tempdir` as WAV using yt_dlp."""
+        output_path = os.path.join(tempdir, "%(id)s.%(ext)s")
+
+        ydl_opts = self._ydl_options(
+            outtmpl=output_path,
+            postprocessors=[
+                {
+                    "key": "FFmpegExtractAudio",
+                    "preferredcodec": "wav",
+                    "preferredquality": "192",
+                }
+            ],
+        )
+
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=True)
             return os.path.join(tempdir, f"{info['id']}.wav")
 
-    def _extract_features(self, audio_path: str) -> np.ndarray:
-        """Extract normalized audio features using librosa."""
-        y, sr = librosa.load(audio_path, sr=None)
+    def _extract_from_pipe(
+        self, url: str, mode: ExtractionMode = ExtractionMode.AUTO
+    ) -> np.ndarray:
+        """
+        Resolve the best audio stream with yt_dlp (no download), decode it with
+        ffmpeg to mono float32 PCM on stdout and feed the streaming extractor
+        block by block while the bytes arrive.
 
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        spec_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
-        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+        With a duration-capped extractor (see _capped_extractor) only its
+        excerpts are decoded, each with its own ffmpeg seek, and analysed
+        as in file mode; the audio is then not cached.
+        """
+        with yt_dlp.YoutubeDL(self._ydl_options()) as ydl:
+            info = ydl.extract_info(url, download=False)
 
-        tempo = np.array([tempo]).flatten()
-        spec_centroid_mean = np.mean(spec_centroid).reshape(
-            1,
-        )
-        mfcc_mean = (
-            np.mean(mfcc, axis=1).flatten()
-            if mfcc.ndim > 1
-            else np.array([np.mean(mfcc)])
-        )
-        chroma_mean = (
-            np.mean(chroma, axis=1).flatten()
-            if chroma.ndim > 1
-            else np.array([np.mean(chroma)])
-        )
+        capped = self._capped_extractor(mode)
+        extractor = capped or self.streaming_extractor
+        # The extractor's rate, or the source's own if it keeps native
+        sr = int(extractor.sr or info.get("asr") or ANALYSIS_SAMPLE_RATE)
+        command = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+        headers = info.get("http_headers") or {}
+        if headers:
+            command += [
+                "-headers",
+                "".join(f"{key}: {value}\r\n" for key, value in headers.items()),
+            ]
+        source = ["-i", info["url"]]
+        output = ["-f", "f32le", "-ac", "1", "-ar", str(sr), "pipe:1"]
+
+        if capped:
+            duration = info.get("duration")
+            # Unknown duration (e.g. live): the first max_duration seconds
+            excerpts = (
+                capped.excerpts(duration) if duration else [(0.0, capped.max_duration)]
+            )
+            chunks = []
+            for offset, length in excerpts or [(None, None)]:
+                seek = []
+                if offset is not None:
+                    seek = ["-ss", f"{offset:.3f}", "-t", f"{length:.3f}"]
+                with self._ffmpeg(command + seek + source + output) as (process, check):
+                    chunks.extend(self._pcm_blocks(process.stdout))
+                    check()
+            if not chunks:
+                raise ValueError("No audio decoded from the stream")
+            return capped.extract_waveform(np.concatenate(chunks), sr)
+
+        with self._ffmpeg(command + source + output) as (process, check):
+            with ExitStack() as stack:
+                blocks = self._pcm_blocks(process.stdout)
+                if self.analysis_cache:
+                    # Keep a FLAC copy of the decoded stream (discarded on error)
+                    write = stack.enter_context(
+                        self.analysis_cache.audio_writer(
+                            url, sr, native=sr == info.get("asr")
+                        )
+                    )
+                    blocks = self._tee_blocks(blocks, write)
+                try:
+                    features = self.streaming_extractor.extract_stream(blocks, sr)
+                except ValueError:
+                    # Stream ended without usable audio: report ffmpeg's reason
+                    check()
+                    raise
+                check()
+        return features
+
+    @staticmethod
+    @contextmanager
+    def _ffmpeg(command: List[str]) -> Iterator[Tuple[subprocess.Popen, Callable]]:
+        """
+        Run ffmpeg with PCM on stdout. Its error output goes to a temporary
+        file, so a chatty ffmpeg cannot block on a full stderr pipe. Yields
+        the process and a check() raising with that output if ffmpeg failed.
+        """
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+
+            def check():
+                if process.wait() != 0:
+                    stderr.seek(0)
+                    error = stderr.read().decode(errors="replace").strip()
+                    raise RuntimeError(f"ffmpeg failed: {error}")
+
+            try:
+                yield process, check
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+
+    def _capped_extractor(self, mode: ExtractionMode) -> Optional[FeatureExtractor]:
+        """
+        The configured extractor if it reads at most max_duration seconds
+        (fast with FEATURE_MAX_DURATION). Pipe mode then analyses the same
+        excerpts as file mode instead of streaming the whole track.
+        """
+        if mode == ExtractionMode.STREAMING:
+            return None
+        if getattr(self.feature_extractor, "max_duration", None) is None:
+            return None
+        return self.feature_extractor
+
+    @staticmethod
+    def _pcm_blocks(stream, block_bytes: int = PIPE_BLOCK_BYTES):
+        """Yield float32 sample blocks from a raw little-endian PCM stream."""
+        remainder = b""
+        while True:
+            data = stream.read(block_bytes)
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % 4
+            remainder = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype="<f4")
+
+    @staticmethod
+    def _tee_blocks(blocks, write):
+        for block in blocks:
+            write(block)
+            yield block
 
-        features = np.concatenate([tempo, spec_centroid_mean, mfcc_mean, chroma_mean])
+    def _feature_versions(self, mode: ExtractionMode) -> List[str]:
+        """Extractor versions whose cached vectors satisfy `mode`."""
+        if mode == ExtractionMode.FULL:
+            return [self.feature_extractor.version]
+        if self.download_mode == "pipe" and self._capped_extractor(mode):
+            return [self.feature_extractor.version]
+        if mode == ExtractionMode.STREAMING or self.download_mode == "pipe":
+            return [self.streaming_extractor.version]
+        if self.streaming_threshold_seconds is None:
+            return [self.feature_extractor.version]
+        # AUTO: either pipeline may have produced it, depending on duration
+        return [self.feature_extractor.version, self.streaming_extractor.version]
 
-        # Normalize for cosine similarity
-        features = features / (np.linalg.norm(features) + 1e-8)
+    def _audio_rate(self) -> Optional[int]:
+        """
+        Rate audio is analysed at by both extractors, which a cached copy
+        may be resampled to (None = the source rate, or the two differ).
+        """
+        rates = {
+            getattr(extractor, "sr", None)
+            for extractor in (self.feature_extractor, self.streaming_extractor)
+        }
+        return rates.pop() if len(rates) == 1 else None
+
+    def _extract_and_cache(
+        self, url: str, audio_path: str, mode: ExtractionMode
+    ) -> np.ndarray:
+        """_extract_features, storing the result under the extractor's version."""
+        extractor = (
+            self.streaming_extractor
+            if self._use_streaming(audio_path, mode)
+            else self.feature_extractor
+        )
+        features = self._extract_features(audio_path, mode)
+        self.analysis_cache.put_features(url, extractor.version, features)
         return features
+
+    def _extract_features(
+        self, audio_path: str, mode: ExtractionMode = ExtractionMode.AUTO
+    ) -> np.ndarray:
+        """Extract normalized audio features with the configured extractor."""
+        if self._use_streaming(audio_path, mode):
+            print("🌊 Streaming feature extraction")
+            return self.streaming_extractor.extract(audio_path)
+        return self.feature_extractor.extract(audio_path)
+
+    def _use_streaming(self, audio_path: str, mode: ExtractionMode) -> bool:
+        if mode == ExtractionMode.FULL:
+            return False
+        # Pipe mode streams unless the extractor is duration-capped; cached
+        # audio is analysed the same way
+        if mode == ExtractionMode.STREAMING:
+            return True
+        if self.download_mode == "pipe":
+            return self._capped_extractor(mode) is None
+        if self.streaming_threshold_seconds is None:
+            return False
+        try:
+            # Header only: no decoding needed to know the duration
+            return sf.info(audio_path).duration > self.streaming_threshold_seconds
+        except RuntimeError:
+            return False
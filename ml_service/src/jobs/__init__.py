@@ -0,0 +1 @@
+from .analysis_queue import AnalysisJobQueue, QueueFullError
@@ -0,0 +1,332 @@
+import multiprocessing
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Executor, Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from src.repositories.source_keys import canonical_source_key
+from src.models import ExtractionMode, JobState, JobStatus, SongData, SongResult
+
+# Task run by the executor: SongData -> (song dict, is_new).
+# Plain dicts keep results picklable across process boundaries.
+AnalysisTask = Callable[[SongData], Tuple[Dict, bool]]
+
+
+class QueueFullError(Exception):
+    """Raised when too many analysis jobs are already pending."""
+
+
+# ============================================
+# Worker-side task
+# ============================================
+
+# One service per worker process (or the application's own for thread mode)
+_worker_service = None
+
+
+def init_worker(dsn: str, dim: int, service_options: Optional[Dict] = None):
+    """
+    ProcessPoolExecutor initializer: build this process's service.
+    service_options are MusicAnalysisService keyword arguments
+    (feature_extractor, streaming_threshold_seconds, ...).
+    """
+    global _worker_service
+    from src.extractors.youtube_extractor import MusicAnalysisService
+    from src.repositories.pgvector_repository import PGVectorRepository
+
+    _worker_service = MusicAnalysisService(
+        PGVectorRepository(dsn=dsn, dim=dim), **(service_options or {})
+    )
+
+
+def use_service(service):
+    """Run tasks with an existing service (in-process thread executors)."""
+    global _worker_service
+    _worker_service = service
+
+
+def _picklable(error: Exception) -> Exception:
+    """
+    Errors cross the process boundary pickled; some (e.g. yt_dlp's, which
+    carry a traceback) cannot, so they are reduced to their message.
+    """
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(str(error))
+
+
+def run_analysis_job(song_data: SongData) -> Tuple[Dict, bool]:
+    """Download, extract and store one song in the current worker."""
+    if _worker_service is None:
+        raise RuntimeError("Analysis worker has no service configured")
+    try:
+        song, is_new = _worker_service.analyze_and_store(song_data)
+    except Exception as e:
+        raise _picklable(e) from None
+    return song.model_dump(), is_new
+
+
+def run_extraction_task(url: str, mode: ExtractionMode) -> np.ndarray:
+    """Download one URL and return its feature vector (batch ingestion)."""
+    if _worker_service is None:
+        raise RuntimeError("Analysis worker has no service configured")
+    try:
+        return _worker_service.extract_from_url(url, mode)
+    except Exception as e:
+        raise _picklable(e) from None
+
+
+def create_process_executor(
+    max_workers: int, dsn: str, dim: int, service_options: Optional[Dict] = None
+) -> Executor:
+    """
+    Process pool for CPU-bound analysis (librosa). Uses "spawn" so workers
+    never inherit the parent's open database sockets. `service_options`
+    are pickled into every worker (see init_worker).
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(dsn, dim, service_options),
+    )
+
+
+# ============================================
+# Queue
+# ============================================
+
+
+class _Job:
+    def __init__(self, job_id: str, url: str, future: Future):
+        self.id = job_id
+        self.url = url
+        self.future = future
+        self.state = JobState.QUEUED
+        self.song: Optional[SongResult] = None
+        self.is_new: Optional[bool] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.finished_monotonic: Optional[float] = None
+
+
+class AnalysisJobQueue:
+    """
+    Bounded queue of song analysis jobs executed by a worker pool.
+
+    - Jobs for a URL that is already queued/running are deduplicated: the
+      caller gets the in-flight job instead of a second download.
+    - Finished jobs are kept for `retention_seconds` for status polling.
+    - Batch ingestion extracts through batch_executor(), which shares the
+      max_pending bound and keeps at most `batch_slots` extractions queued.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        task: AnalysisTask = run_analysis_job,
+        max_pending: int = 100,
+        retention_seconds: float = 3600.0,
+        batch_slots: Optional[int] = None,
+    ):
+        """
+        batch_slots: batch extractions in flight at once (default
+            max_pending); about the worker count keeps single jobs from
+            waiting behind a whole batch
+        """
+        self.executor = executor
+        self.task = task
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self.batch_slots = max(1, min(batch_slots or max_pending, max_pending))
+
+        self._jobs: Dict[str, _Job] = {}
+        self._in_flight: Dict[str, str] = {}  # url -> job id
+        self._batch_futures: Set[Future] = set()
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+
+    def submit(self, song_data: SongData) -> JobStatus:
+        """Enqueue an analysis, or return the in-flight job for the same URL."""
+        key = self._dedupe_key(song_data.url)
+
+        with self._lock:
+            self._prune()
+
+            existing_id = self._in_flight.get(key)
+            if existing_id:
+                print(f"🔁 Joining in-flight analysis job {existing_id}")
+                return self._status(self._jobs[existing_id])
+
+            if self._pending() >= self.max_pending:
+                raise QueueFullError(
+                    f"Too many pending analysis jobs ({self.max_pending})"
+                )
+
+            job_id = uuid.uuid4().hex
+            future = self.executor.submit(self.task, song_data)
+            job = _Job(job_id, song_data.url, future)
+            self._jobs[job_id] = job
+            self._in_flight[key] = job_id
+
+        print(f"📥 Queued analysis job {job_id} for {song_data.url}")
+        # Registered outside the lock: it may run immediately for finished futures
+        future.add_done_callback(lambda f, job=job, key=key: self._finish(job, key))
+        return self._status(job)
+
+    def batch_executor(self) -> "BatchExecutor":
+        """Executor for MusicAnalysisService.analyze_batch backed by this queue."""
+        return BatchExecutor(self)
+
+    def submit_extraction(
+        self, task: Callable, url: str, mode: ExtractionMode
+    ) -> Future:
+        """
+        Run one batch extraction on the pool, counted against max_pending.
+        Blocks while batch_slots extractions (or max_pending jobs) are in
+        flight. A URL already running as an analysis job is not downloaded
+        again: the future resolves to that job's stored song dict instead.
+        """
+        key = self._dedupe_key(url)
+        with self._slot_freed:
+            while True:
+                existing_id = self._in_flight.get(key)
+                if existing_id:
+                    return self._song_future(self._jobs[existing_id].future)
+                if (
+                    len(self._batch_futures) < self.batch_slots
+                    and self._pending() < self.max_pending
+                ):
+                    break
+                self._slot_freed.wait()
+
+            future = self.executor.submit(task, url, mode)
+            self._batch_futures.add(future)
+
+        future.add_done_callback(self._finish_extraction)
+        return future
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        """Current status of a job, or None if unknown/expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._status(job) if job else None
+
+    def future(self, job_id: str) -> Future:
+        """Future resolving to the task's (song dict, is_new) result."""
+        return self._jobs[job_id].future
+
+    def stats(self) -> Dict:
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        return {state.value: states.count(state) for state in JobState}
+
+    def shutdown(self, wait: bool = False):
+        """Stop the workers; queued jobs are cancelled."""
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    # ============================================
+    # Private helpers
+    # ============================================
+
+    @staticmethod
+    def _dedupe_key(url: str) -> str:
+        return canonical_source_key(url)
+
+    def _pending(self) -> int:
+        """Queued/running jobs and batch extractions (lock held)."""
+        return len(self._in_flight) + len(self._batch_futures)
+
+    def _finish_extraction(self, future: Future):
+        with self._slot_freed:
+            self._batch_futures.discard(future)
+            self._slot_freed.notify_all()
+
+    @staticmethod
+    def _song_future(job_future: Future) -> Future:
+        """Future of the song dict an analysis job stores."""
+        song_future = Future()
+
+        def relay(f: Future):
+            if f.cancelled():
+                song_future.set_exception(CancelledError())
+            elif f.exception() is not None:
+                song_future.set_exception(f.exception())
+            else:
+                song_future.set_result(f.result()[0])
+
+        job_future.add_done_callback(relay)
+        return song_future
+
+    def _finish(self, job: _Job, key: str):
+        with self._lock:
+            if job.future.cancelled():
+                job.state = JobState.FAILED
+                job.error = "Cancelled"
+            elif job.future.exception() is not None:
+                job.state = JobState.FAILED
+                job.error = str(job.future.exception())
+            else:
+                song, is_new = job.future.result()
+                job.state = JobState.SUCCEEDED
+                job.song = SongResult(**song)
+                job.is_new = is_new
+            job.finished_at = datetime.now(timezone.utc)
+            job.finished_monotonic = time.monotonic()
+            if self._in_flight.get(key) == job.id:
+                del self._in_flight[key]
+            self._slot_freed.notify_all()
+
+        print(f"🏁 Analysis job {job.id} {job.state.value}")
+
+    def _status(self, job: _Job) -> JobStatus:
+        state = job.state
+        if state == JobState.QUEUED and job.future.running():
+            state = JobState.RUNNING
+        return JobStatus(
+            id=job.id,
+            url=job.url,
+            state=state,
+            song=job.song,
+            is_new=job.is_new,
+            error=job.error,
+            created_at=job.created_at,
+            finished_at=job.finished_at,
+        )
+
+    def _prune(self):
+        """Drop finished jobs older than the retention period (lock held)."""
+        cutoff = time.monotonic() - self.retention_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_monotonic is not None and job.finished_monotonic < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class BatchExecutor:
+    """The executor.submit(task, url, mode) analyze_batch uses, over a job queue."""
+
+    def __init__(self, queue: AnalysisJobQueue):
+        self.queue = queue
+
+    @property
+    def max_in_flight(self) -> int:
+        """
+        Futures analyze_batch keeps at once: the queue's capacity, as some
+        join running analysis jobs (batch_slots still bounds extractions).
+        """
+        return self.queue.max_pending
+
+    def submit(self, task: Callable, url: str, mode: ExtractionMode) -> Future:
+        return self.queue.submit_extraction(task, url, mode)
@@ -1,3 +1,5 @@
 from .requests import *
 from .responses import *
 from .songs import *
+from .jobs import *
+from .batch import *
@@ -0,0 +1,48 @@
+from enum import Enum
+from pydantic import BaseModel
+from typing import List, Optional
+
+from .songs import SimilarSongResult, SongResult
+
+
+class BatchItemStatus(str, Enum):
+    """Outcome of one song in a batch analysis"""
+
+    STORED = "stored"
+    EXISTS = "exists"
+    DUPLICATE = "duplicate"
+    FAILED = "failed"
+
+
+class BatchItemResult(BaseModel):
+    """Result for one input song of a batch analysis"""
+
+    url: str
+    status: BatchItemStatus
+    song: Optional[SongResult] = None
+    error: Optional[str] = None
+
+
+class BatchAnalyzeResult(BaseModel):
+    """Report of a batch analysis, items in input order"""
+
+    items: List[BatchItemResult]
+    stored: int
+    existing: int
+    failed: int
+    elapsed_seconds: float
+    songs_per_second: float
+
+
+class SimilarBatchItem(BaseModel):
+    """Neighbours of one seed song of a batch similarity search"""
+
+    song_id: int
+    found: bool
+    similar: List[SimilarSongResult] = []
+
+
+class SimilarBatchResult(BaseModel):
+    """Batch similarity search, items in input order"""
+
+    items: List[SimilarBatchItem]
@@ -0,0 +1,28 @@
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel
+from typing import Optional
+
+from .songs import SongResult
+
+
+class JobState(str, Enum):
+    """Lifecycle of a background analysis job"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobStatus(BaseModel):
+    """Status of a background analysis job"""
+
+    id: str
+    url: str
+    state: JobState
+    song: Optional[SongResult] = None
+    is_new: Optional[bool] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -1,8 +1,17 @@
 from datetime import datetime
+from enum import Enum
 from pydantic import BaseModel
 from typing import Optional
 
 
+class ExtractionMode(str, Enum):
+    """How audio is turned into features"""
+
+    AUTO = "auto"  # streaming above the service's duration threshold
+    FULL = "full"  # decode the whole track, then extract
+    STREAMING = "streaming"  # block-wise, bounded memory
+
+
 class SongData(BaseModel):
     """Data transfer object for song information"""
 
@@ -12,6 +21,7 @@ class SongData(BaseModel):
     source_platform: str
     added_by: Optional[int] = None
     release_date: Optional[str] = None
+    extraction_mode: ExtractionMode = ExtractionMode.AUTO
 
 
 class SongResult(BaseModel):
@@ -1,2 +1,4 @@
 from .pgvector_repository import PGVectorRepository
 from .mock_repository import MockVectorRepository
+from .memory_index_repository import InMemoryIndexRepository
+from .mapped_index_repository import MappedIndexRepository
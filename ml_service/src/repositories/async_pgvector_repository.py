@@ -0,0 +1,458 @@
+import numpy as np
+from psycopg.types import TypeInfo
+from psycopg_pool import AsyncConnectionPool
+from typing import AsyncIterator, List, Dict, Optional, Sequence, Tuple
+from .async_vector_repository import AsyncVectorRepository
+from .pgvector_repository import SONG_COLUMNS, PGVectorRepository
+from .source_keys import canonical_source_key
+from .vector_codec import register_vector_types
+from .vector_repository import song_fields
+
+
+class AsyncPGVectorRepository(AsyncVectorRepository):
+    """
+    psycopg 3 async implementation of the repository, backed by an
+    AsyncConnectionPool so queries run natively on the event loop.
+    Mirrors the SQL of PGVectorRepository. Vectors travel in pgvector's
+    binary format (see vector_codec): parameters are bound with %b and
+    vector columns load straight into float32 arrays.
+    """
+
+    METRIC_OPERATORS = PGVectorRepository.METRIC_OPERATORS
+
+    def __init__(
+        self,
+        dsn: str,
+        dim: int,
+        pool_min_size: int = 1,
+        pool_max_size: int = 10,
+        pool_timeout: float = 5.0,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ):
+        """
+        dsn: PostgreSQL connection string
+        dim: dimension of the feature vector
+        pool_min_size / pool_max_size: async connection pool bounds
+        pool_timeout: seconds to wait for a free pooled connection
+        ef_search / probes: default ANN search knobs (None = server default)
+        """
+        self.dsn = dsn
+        self.dim = dim
+        self.ef_search = ef_search
+        self.probes = probes
+        # Opened explicitly from the application lifespan (needs a running loop)
+        self.pool = AsyncConnectionPool(
+            dsn,
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            timeout=pool_timeout,
+            configure=self._configure_connection,
+            open=False,
+        )
+
+    @staticmethod
+    async def _configure_connection(conn) -> None:
+        """Register the binary vector adapters on a new pooled connection."""
+        info = await TypeInfo.fetch(conn, "vector")
+        if info is None:
+            raise RuntimeError("The pgvector extension is not installed")
+        register_vector_types(conn, info)
+        await conn.commit()  # leave the connection idle for the pool
+
+    async def open(self) -> None:
+        """Open the connection pool and wait for the minimum connections."""
+        await self.pool.open(wait=True)
+        print(f"🏊 Opened async database pool (max={self.pool.max_size})")
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        await self.pool.close()
+        print("🔌 Closed async database pool")
+
+    def pool_stats(self) -> Dict:
+        """Connection pool usage counters."""
+        return {"pooled": True, **self.pool.get_stats()}
+
+    async def _apply_search_settings(
+        self, cur, ef_search=None, probes=None, limit=None
+    ):
+        """
+        SET LOCAL the ANN search knobs for the current transaction, with
+        ef_search raised to the query's limit (see scan_ef_search).
+        """
+        ef_search = PGVectorRepository.scan_ef_search(
+            ef_search or self.ef_search, limit
+        )
+        probes = probes or self.probes
+        if ef_search:
+            await cur.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search)};")
+        if probes:
+            await cur.execute(f"SET LOCAL ivfflat.probes = {int(probes)};")
+
+    @staticmethod
+    def _song_row(row) -> Dict:
+        return {
+            "id": row[0],
+            "title": row[1],
+            "artist_name": row[2],
+            "release_date": row[3],
+            "url": row[4],
+            "source_platform": row[5],
+            "added_by": row[6],
+            "added_at": row[7],
+        }
+
+    async def get_song_by_url(self, url: str) -> Optional[Dict]:
+        """Get a song's metadata by URL (any URL form of the same media)."""
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                "SELECT id, title, artist_name, release_date, url, source_platform, added_by, added_at FROM songs WHERE source_key = %s OR url = %s ORDER BY id LIMIT 1",
+                (canonical_source_key(url), url),
+            )
+            existing = await cur.fetchone()
+
+        return self._song_row(existing) if existing else None
+
+    async def get_song_by_id(self, song_id: int) -> Optional[Dict]:
+        """Get a song's metadata by primary key."""
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                f"SELECT {SONG_COLUMNS} FROM songs WHERE id = %s", (song_id,)
+            )
+            row = await cur.fetchone()
+
+        return self._song_row(row) if row else None
+
+    async def get_songs_by_ids(self, song_ids: List[int]) -> Dict[int, Dict]:
+        """Metadata of the existing songs among `song_ids` (one query), keyed by id."""
+        if not song_ids:
+            return {}
+
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                f"SELECT {SONG_COLUMNS} FROM songs WHERE id = ANY(%s)",
+                (list(song_ids),),
+            )
+            rows = await cur.fetchall()
+
+        return {row[0]: self._song_row(row) for row in rows}
+
+    async def store_features(
+        self,
+        title: str,
+        artist_name: str,
+        url: str,
+        song_feature: np.ndarray,
+        source_platform: str,
+        added_by: Optional[int] = None,
+        release_date: Optional[str] = None,
+    ) -> Tuple[Dict, bool]:
+        """
+        Insert a song record (single transaction).
+        Returns (song_data, is_new); is_new is False if the URL (or another
+        URL of the same media) already existed.
+        """
+        if song_feature.shape[0] != self.dim:
+            raise ValueError(f"Feature vector must have dimension {self.dim}")
+
+        source_key = canonical_source_key(url)
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO songs (title, artist_name, release_date, url, source_key, song_feature, source_platform, added_by)
+                VALUES (%s, %s, %s, %s, %s, %b, %s, %s)
+                ON CONFLICT DO NOTHING
+                RETURNING id, title, artist_name, release_date, url, source_platform, added_by, added_at;
+                """,
+                (
+                    title,
+                    artist_name,
+                    release_date,
+                    url,
+                    source_key,
+                    song_feature,
+                    source_platform,
+                    added_by,
+                ),
+            )
+            new_song = await cur.fetchone()
+            if not new_song:
+                await cur.execute(
+                    "SELECT id, title, artist_name, release_date, url, source_platform, added_by, added_at FROM songs WHERE source_key = %s OR url = %s ORDER BY id LIMIT 1",
+                    (source_key, url),
+                )
+                return self._song_row(await cur.fetchone()), False
+            await cur.execute(
+                PGVectorRepository.neighbor_update_query(), {"song_id": new_song[0]}
+            )
+
+        print(f"✅ Stored new song: {new_song[1]} by {new_song[2]} (ID: {new_song[0]})")
+        return self._song_row(new_song), True
+
+    async def find_similars(
+        self,
+        features: np.ndarray,
+        limit: int = 10,
+        metric: str = "cosine",
+        exclude_id: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> Optional[List[Dict]]:
+        """Find similar songs by vector distance."""
+        if features.shape[0] != self.dim:
+            raise ValueError(f"Query vector must have dimension {self.dim}")
+
+        operator = self.METRIC_OPERATORS.get(metric, "<=>")
+        where_clause = "WHERE id != %s" if exclude_id else ""
+        params = [features]
+        if exclude_id:
+            params.append(exclude_id)
+        params.append(limit)
+
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await self._apply_search_settings(
+                cur, ef_search, probes, limit + 1 if exclude_id else limit
+            )
+            await cur.execute(
+                f"""
+                SELECT id, title, artist_name, url, source_platform,
+                       (song_feature {operator} %b) AS distance
+                FROM songs
+                {where_clause}
+                ORDER BY distance ASC
+                LIMIT %s;
+                """,
+                params,
+            )
+            rows = await cur.fetchall()
+
+        if not rows:
+            return None
+
+        return [
+            {
+                "id": row[0],
+                "title": row[1],
+                "artist_name": row[2],
+                "url": row[3],
+                "source_platform": row[4],
+                "distance": float(row[5]),
+            }
+            for row in rows
+        ]
+
+    async def find_similars_with_feedback(
+        self,
+        song_id: int,
+        limit: int = 10,
+        metric: str = "cosine",
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> Optional[List[Dict]]:
+        """Neighbours of a stored song with their feedback sums, in one query."""
+        operator = self.METRIC_OPERATORS.get(metric, "<=>")
+
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await self._apply_search_settings(cur, ef_search, probes, limit)
+            await cur.execute(
+                f"""
+                WITH query_song AS (
+                    SELECT song_feature FROM songs WHERE id = %(song_id)s
+                ),
+                candidates AS (
+                    SELECT id, title, artist_name, url, source_platform,
+                           (song_feature {operator} (SELECT song_feature FROM query_song)) AS distance
+                    FROM songs
+                    WHERE EXISTS (SELECT 1 FROM query_song)
+                    ORDER BY distance ASC
+                    LIMIT %(limit)s
+                )
+                SELECT c.id, c.title, c.artist_name, c.url, c.source_platform,
+                       c.distance, COALESCE(f.net_score, 0) AS feedback_score
+                FROM candidates c
+                LEFT JOIN SONG_FEEDBACK_SCORES f
+                    ON f.query_song_id = %(song_id)s AND f.suggested_song_id = c.id
+                ORDER BY c.distance ASC;
+                """,
+                {"song_id": song_id, "limit": limit},
+            )
+            rows = await cur.fetchall()
+
+        if not rows:
+            return None
+
+        return [
+            {
+                "id": row[0],
+                "title": row[1],
+                "artist_name": row[2],
+                "url": row[3],
+                "source_platform": row[4],
+                "distance": float(row[5]),
+                "feedback_score": int(row[6]),
+            }
+            for row in rows
+        ]
+
+    async def find_similars_with_feedback_batch(
+        self,
+        song_ids: List[int],
+        limit: int = 10,
+        metric: str = "cosine",
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> Dict[int, List[Dict]]:
+        """Neighbours with feedback sums for many query songs in one query."""
+        if not song_ids:
+            return {}
+
+        operator = self.METRIC_OPERATORS.get(metric, "<=>")
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await self._apply_search_settings(cur, ef_search, probes, limit)
+            await cur.execute(
+                PGVectorRepository.similar_batch_query(operator),
+                {"song_ids": list(song_ids), "limit": limit},
+            )
+            rows = await cur.fetchall()
+
+        return PGVectorRepository.similar_batch_rows(rows)
+
+    async def find_similars_from_neighbors(
+        self, song_id: int, limit: int = 10
+    ) -> Optional[List[Dict]]:
+        """Neighbours with feedback sums from the song's precomputed list."""
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                PGVectorRepository.neighbor_list_query(),
+                {"song_id": song_id, "limit": limit},
+            )
+            rows = await cur.fetchall()
+
+        if not rows:
+            return None
+
+        return [
+            {
+                "id": row[0],
+                "title": row[1],
+                "artist_name": row[2],
+                "url": row[3],
+                "source_platform": row[4],
+                "distance": float(row[5]),
+                "feedback_score": int(row[6]),
+            }
+            for row in rows
+        ]
+
+    async def get_features(self, song_id: int) -> Optional[np.ndarray]:
+        """Retrieve the feature vector for a given song ID."""
+        async with self.pool.connection() as conn, conn.cursor(binary=True) as cur:
+            await cur.execute(
+                "SELECT song_feature FROM songs WHERE id = %s;", (song_id,)
+            )
+            row = await cur.fetchone()
+
+        return row[0] if row else None
+
+    async def list_all_songs(self) -> List[Dict]:
+        """List all songs with their metadata (excluding vector)."""
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT id, title, artist_name, url, source_platform, added_by, added_at
+                FROM songs
+                ORDER BY id;
+                """
+            )
+            rows = await cur.fetchall()
+
+        return [
+            {
+                "id": row[0],
+                "title": row[1],
+                "artist_name": row[2],
+                "url": row[3],
+                "source_platform": row[4],
+                "added_by": row[5],
+                "added_at": row[6],
+            }
+            for row in rows
+        ]
+
+    async def list_songs(
+        self,
+        after_id: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+    ) -> List[Dict]:
+        """One keyset page of songs (see VectorRepository.list_songs)."""
+        columns = song_fields(fields)
+        sql, params = PGVectorRepository.song_list_query(
+            columns, after_id, source_platform, added_by, limit
+        )
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(sql, params)
+            rows = await cur.fetchall()
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    async def iter_songs(
+        self,
+        after_id: int = 0,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict]:
+        """Stream matching songs through a server-side cursor (see PGVectorRepository.iter_songs)."""
+        columns = song_fields(fields)
+        sql, params = PGVectorRepository.song_list_query(
+            columns, after_id, source_platform, added_by
+        )
+        async with self.pool.connection() as conn:
+            async with conn.cursor(name="songs_stream") as cur:
+                cur.itersize = batch_size
+                await cur.execute(sql, params)
+                async for row in cur:
+                    yield dict(zip(columns, row))
+
+    async def store_feedback(
+        self, user_id: int, query_song_id: int, suggested_song_id: int, vote: int
+    ) -> None:
+        """Upsert a user's vote for a song match."""
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO SONG_FEEDBACK (user_id, query_song_id, suggested_song_id, vote)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (user_id, query_song_id, suggested_song_id)
+                DO UPDATE SET vote = EXCLUDED.vote, voted_at = NOW();
+                """,
+                (user_id, query_song_id, suggested_song_id, vote),
+            )
+        print(
+            f"✅ Stored feedback: User {user_id} voted {vote} for song {suggested_song_id}"
+        )
+
+    async def get_feedback_scores(
+        self, query_song_id: int, suggested_song_ids: List[int]
+    ) -> Dict[int, int]:
+        """Net vote score per suggested song (song_feedback_scores aggregate)."""
+        if not suggested_song_ids:
+            return {}
+
+        async with self.pool.connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT suggested_song_id, net_score
+                FROM SONG_FEEDBACK_SCORES
+                WHERE query_song_id = %s AND suggested_song_id = ANY(%s);
+                """,
+                (query_song_id, list(suggested_song_ids)),
+            )
+            rows = await cur.fetchall()
+
+        return {row[0]: int(row[1]) for row in rows}
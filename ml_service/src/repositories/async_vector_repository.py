@@ -0,0 +1,166 @@
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import AsyncIterator, List, Dict, Optional, Sequence, Tuple
+
+
+class AsyncVectorRepository(ABC):
+    """
+    Async counterpart of VectorRepository for use on the event loop.
+    Same operations, same return shapes; every method is a coroutine.
+    """
+
+    @abstractmethod
+    async def get_song_by_url(self, url: str) -> Optional[Dict]:
+        """Get a song's metadata by its unique URL."""
+        pass
+
+    @abstractmethod
+    async def get_song_by_id(self, song_id: int) -> Optional[Dict]:
+        """Get a song's metadata by its id (None if it does not exist)."""
+        pass
+
+    @abstractmethod
+    async def get_songs_by_ids(self, song_ids: List[int]) -> Dict[int, Dict]:
+        """Metadata of the existing songs among `song_ids`, keyed by id."""
+        pass
+
+    @abstractmethod
+    async def store_features(
+        self,
+        title: str,
+        artist_name: str,
+        url: str,
+        song_feature: np.ndarray,
+        source_platform: str,
+        added_by: Optional[int] = None,
+        release_date: Optional[str] = None,
+    ) -> Tuple[Dict, bool]:
+        """Store audio features with metadata. Returns (song_data, is_new)."""
+        pass
+
+    @abstractmethod
+    async def find_similars(
+        self,
+        features: np.ndarray,
+        limit: int = 10,
+        metric: str = "cosine",
+        exclude_id: Optional[int] = None,
+    ) -> Optional[List[Dict]]:
+        """Find similar tracks using vector similarity."""
+        pass
+
+    @abstractmethod
+    async def get_features(self, song_id: int) -> Optional[np.ndarray]:
+        """Get features for a specific track."""
+        pass
+
+    @abstractmethod
+    async def list_all_songs(self) -> List[Dict]:
+        """Lists all stored track_id and metadata."""
+        pass
+
+    @abstractmethod
+    async def list_songs(
+        self,
+        after_id: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+    ) -> List[Dict]:
+        """One keyset page of songs (see VectorRepository.list_songs)."""
+        pass
+
+    async def iter_songs(
+        self,
+        after_id: int = 0,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict]:
+        """Every matching song after `after_id`, in id order (walks pages)."""
+        while True:
+            page = await self.list_songs(
+                after_id, batch_size, fields, source_platform, added_by
+            )
+            for song in page:
+                yield song
+            if len(page) < batch_size:
+                return
+            after_id = page[-1]["id"]
+
+    async def find_similars_with_feedback_batch(
+        self,
+        song_ids: List[int],
+        limit: int = 10,
+        metric: str = "cosine",
+    ) -> Dict[int, List[Dict]]:
+        """find_similars_with_feedback for many query songs (unknown ids absent)."""
+        results = {}
+        for song_id in song_ids:
+            similar = await self.find_similars_with_feedback(song_id, limit, metric)
+            if similar is not None:
+                results[song_id] = similar
+        return results
+
+    @abstractmethod
+    async def store_feedback(
+        self, user_id: int, query_song_id: int, suggested_song_id: int, vote: int
+    ) -> None:
+        """Store a user's vote for a song match."""
+        pass
+
+    @abstractmethod
+    async def get_feedback_scores(
+        self, query_song_id: int, suggested_song_ids: List[int]
+    ) -> Dict[int, int]:
+        """Get the aggregate vote score for a list of suggested songs."""
+        pass
+
+    async def find_similars_with_feedback(
+        self,
+        song_id: int,
+        limit: int = 10,
+        metric: str = "cosine",
+    ) -> Optional[List[Dict]]:
+        """
+        Nearest neighbours of a stored song with their "feedback_score".
+        Returns None if the query song does not exist.
+        """
+        features = await self.get_features(song_id)
+        if features is None:
+            return None
+
+        candidates = await self.find_similars(
+            features=features, limit=limit, metric=metric, exclude_id=None
+        )
+        if not candidates:
+            return []
+
+        feedback_scores = await self.get_feedback_scores(
+            query_song_id=song_id,
+            suggested_song_ids=[song["id"] for song in candidates],
+        )
+        return [
+            {**song, "feedback_score": feedback_scores.get(song["id"], 0)}
+            for song in candidates
+        ]
+
+    async def find_similars_from_neighbors(
+        self, song_id: int, limit: int = 10
+    ) -> Optional[List[Dict]]:
+        """Neighbours from precomputed lists, or None (search live instead)."""
+        return None
+
+    async def open(self) -> None:
+        """Acquire resources (e.g. open the connection pool)."""
+        pass
+
+    async def close(self) -> None:
+        """Release any resources held by the repository."""
+        pass
+
+    def pool_stats(self) -> Dict:
+        """Connection pool statistics. Backends without a pool report none."""
+        return {"pooled": False}
@@ -0,0 +1,202 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+import psycopg2
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be borrowed within the pool timeout."""
+
+
+class PGConnectionPool:
+    """
+    Thread-safe, bounded pool of psycopg2 connections.
+
+    - Never opens more than `max_size` connections to Postgres.
+    - Opens `min_size` connections up front and keeps every returned
+      connection (up to `max_size`) open for reuse.
+    - Borrowers wait at most `timeout` seconds for a free connection.
+    - Connections idle for longer than `health_check_interval` seconds are
+      pinged before being handed out; broken ones are replaced transparently.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        health_check_interval: float = 30.0,
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(
+                "Pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1"
+            )
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self.dsn = dsn
+        # The semaphore bounds borrowers, so at most max_size connections exist
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        # Idle connections, most recently returned last (reused first)
+        self._idle: List = [psycopg2.connect(dsn) for _ in range(min_size)]
+        self._last_used: Dict[int, float] = {}
+        self._closed = False
+
+        self._in_use = 0
+        self._opened = min_size
+        self._borrows = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_seconds = 0.0
+
+    # ============================================
+    # Borrow / return
+    # ============================================
+
+    @contextmanager
+    def connection(self) -> Iterator:
+        """Borrow a connection for the duration of the `with` block."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def getconn(self):
+        """Borrow a healthy connection, waiting at most `timeout` seconds."""
+        if self._closed:
+            raise psycopg2.InterfaceError("Connection pool is closed")
+
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeoutError(
+                f"No database connection available within {self.timeout}s "
+                f"(max_size={self.max_size})"
+            )
+
+        try:
+            conn = self._checkout_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._borrows += 1
+            self._wait_seconds += time.monotonic() - started
+        return conn
+
+    def putconn(self, conn) -> None:
+        """
+        Return a borrowed connection, closing it if it is broken or the pool
+        has been closed.
+        """
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                # Never hand out a connection with a transaction left open
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+
+        with self._lock:
+            self._in_use -= 1
+            if broken:
+                self._discarded += 1
+            keep = not broken and not self._closed
+            if keep:
+                self._last_used[id(conn)] = time.monotonic()
+                self._idle.append(conn)
+            else:
+                self._last_used.pop(id(conn), None)
+
+        try:
+            if not keep:
+                conn.close()
+        finally:
+            self._slots.release()
+
+    def _checkout_healthy(self):
+        """Reuse an idle connection, replacing dead ones, or open a new one."""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = psycopg2.connect(self.dsn)
+                with self._lock:
+                    self._opened += 1
+                return conn
+            if self._is_healthy(conn):
+                return conn
+            with self._lock:
+                self._discarded += 1
+                self._last_used.pop(id(conn), None)
+            conn.close()
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+
+        last_used = self._last_used.get(id(conn))
+        if (
+            last_used is not None
+            and time.monotonic() - last_used < self.health_check_interval
+        ):
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    # ============================================
+    # Lifecycle / introspection
+    # ============================================
+
+    def close(self) -> None:
+        """Close every connection held by the pool."""
+        if self._closed:
+            return
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._last_used.clear()
+        for conn in idle:
+            conn.close()
+        print("🔌 Closed database connection pool")
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> Dict:
+        """Snapshot of pool usage counters."""
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "opened": self._opened,
+                "borrows": self._borrows,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "avg_wait_ms": (
+                    1000.0 * self._wait_seconds / self._borrows
+                    if self._borrows
+                    else 0.0
+                ),
+                "closed": self._closed,
+            }
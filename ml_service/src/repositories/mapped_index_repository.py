@@ -0,0 +1,91 @@
+import numpy as np
+from typing import Dict, Optional
+from .memory_index_repository import InMemoryIndexRepository
+from .pgvector_repository import PGVectorRepository
+from .vector_math import VectorMatrix
+from .vector_snapshot import open_index_snapshot
+
+
+class MappedIndexRepository(InMemoryIndexRepository):
+    """
+    InMemoryIndexRepository serving a read-only, memory-mapped index
+    snapshot (PGVectorRepository.export_vectors(path, index=True)).
+
+    The snapshot's unit rows are searched in place, so every worker process
+    shares one copy of them in the page cache and starts without reading
+    the catalogue. Only songs added since the snapshot's highest id are
+    held per process (the usual watermark refresh), and metadata of search
+    results is read from Postgres. Re-export the snapshot and restart the
+    workers to fold the delta back in. Once stored vectors change
+    (import_vectors) the snapshot is stale: every song is then reloaded
+    into memory until the snapshot is re-exported.
+    """
+
+    def __init__(
+        self,
+        backing: PGVectorRepository,
+        snapshot_path: str,
+        refresh_interval: float = 5.0,
+    ):
+        """
+        backing: the PGVectorRepository that owns the data
+        snapshot_path: index snapshot to map (if missing, every song is
+            loaded into memory as with InMemoryIndexRepository)
+        refresh_interval: seconds after which reads first pull new rows
+            from Postgres (0 = check on every read)
+        """
+        self._base_ids = np.empty(0, dtype=np.int64)
+        super().__init__(
+            backing, refresh_interval=refresh_interval, snapshot_path=snapshot_path
+        )
+        if not self._base_ids.size:
+            print(f"⚠️  No index snapshot at {snapshot_path}, all songs are in memory")
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Map an index snapshot as the base of the matrix. Songs deleted since
+        it was written are skipped at search time; vectors changed since are
+        not noticed. Returns the number of mapped rows.
+        """
+        ids, unit, norms = open_index_snapshot(path, self.dim)
+        self._base_ids = ids
+        self._matrix = VectorMatrix(self.dim, base=(ids, unit, norms))
+        if ids.size:
+            self._watermark = int(ids[-1])
+        print(f"🗺️  Mapped {ids.size} song vectors from index snapshot {path}")
+        return int(ids.size)
+
+    def _reload(self) -> int:
+        loaded = super()._reload()
+        if self._base_ids.size:
+            self._base_ids = np.empty(0, dtype=np.int64)
+            print("⚠️  Index snapshot is stale, re-export it to map it again")
+        return loaded
+
+    def stats(self) -> Dict:
+        """Index size and synchronisation state."""
+        return {**super().stats(), "mapped_songs": int(self._base_ids.size)}
+
+    def _loaded(self, ids: np.ndarray) -> np.ndarray:
+        return super()._loaded(ids) | (self._base_row(ids) >= 0)
+
+    def _base_row(self, ids: np.ndarray) -> np.ndarray:
+        """Base segment row of each id (snapshot ids are sorted), -1 if absent."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not self._base_ids.size or not self._matrix.base_size:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self._base_ids, ids), self._base_ids.size - 1)
+        return np.where(self._base_ids[rows] == ids, rows, -1)
+
+    def _row_of(self, song_id: int) -> Optional[int]:
+        self._maybe_refresh()
+        row = int(self._base_row(song_id))
+        return row if row >= 0 else super()._row_of(song_id)
+
+    def _songs(self, ids: np.ndarray) -> Dict[int, Optional[Dict]]:
+        """Metadata of mapped rows comes from Postgres, in one query."""
+        songs = super()._songs(ids)
+        mapped = [song_id for song_id, song in songs.items() if song is None]
+        if mapped:
+            songs.update(self.backing.get_songs_by_ids(mapped))
+        return songs
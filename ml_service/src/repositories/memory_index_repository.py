@@ -0,0 +1,464 @@
+import os
+import threading
+import time
+import numpy as np
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from .pgvector_repository import PGVectorRepository
+from .vector_math import VectorMatrix, smallest_k
+from .vector_repository import VectorRepository
+from .vector_snapshot import read_snapshot
+
+
+# Ids below the watermark re-read on refresh: serial ids can commit out of
+# order, so a concurrent insert may become visible after a higher id did
+REFRESH_OVERLAP = 100
+# Minimum seconds between refreshes triggered by lookups of unknown ids, so
+# requests for ids that do not exist cannot each cost a query
+MISS_REFRESH_INTERVAL = 0.5
+
+
+class InMemoryIndexRepository(VectorRepository):
+    """
+    Read cache in front of PGVectorRepository.
+
+    Keeps every song_feature as an id-aligned float32 matrix of unit rows, so
+    get_features / find_similars are answered in-process with one matmul and
+    an argpartition. Writes go to Postgres; the matrix follows by incremental
+    refreshes that only read rows above the highest loaded id (watermark).
+    Changes to stored vectors (import_vectors) bump the backing's vector
+    generation, and the next refresh then reloads every row.
+    """
+
+    in_process_search = True
+
+    def __init__(
+        self,
+        backing: PGVectorRepository,
+        refresh_interval: float = 5.0,
+        snapshot_path: Optional[str] = None,
+    ):
+        """
+        backing: the PGVectorRepository that owns the data
+        refresh_interval: seconds after which reads first pull new rows
+            from Postgres (0 = check on every read)
+        snapshot_path: feature snapshot (PGVectorRepository.export_vectors)
+            to warm up from; only newer rows are then read from Postgres
+        """
+        self.backing = backing
+        self.dim = backing.dim
+        self.refresh_interval = refresh_interval
+
+        self._matrix = VectorMatrix(self.dim)
+        self._rows: Dict[int, int] = {}  # song id -> matrix row
+        self._metadata: Dict[int, Dict] = {}  # song id -> metadata
+        self._watermark = 0
+        self._generation = backing.vector_generation()
+        self._last_refresh = 0.0
+        self._last_miss_refresh = 0.0
+        self._refresh_lock = threading.Lock()
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load_snapshot(snapshot_path)
+        self.refresh()
+        print(f"🧠 Using in-memory vector index ({len(self._matrix)} songs)")
+
+    # ============================================
+    # Synchronisation
+    # ============================================
+
+    def refresh(self) -> int:
+        """
+        Load songs added since the watermark, or every song if stored vectors
+        changed since the last load. Returns the number of rows loaded.
+        """
+        with self._refresh_lock:
+            # Read before the rows: a change committed in between is seen next time
+            generation = self.backing.vector_generation()
+            if generation != self._generation:
+                self._generation = generation
+                added = self._reload()
+            else:
+                ids, vectors, metadata = self.backing.fetch_vectors(
+                    after_id=max(0, self._watermark - REFRESH_OVERLAP)
+                )
+                added = self._append(ids, vectors, metadata)
+            self._last_refresh = time.monotonic()
+            return added
+
+    def _reload(self) -> int:
+        """Replace the matrix with every song from Postgres (vectors changed)."""
+        ids, vectors, metadata = self.backing.fetch_vectors()
+        matrix = VectorMatrix(self.dim)
+        matrix.append(ids, vectors)
+        # Metadata first, so a published row always has its metadata
+        self._metadata = {song["id"]: song for song in metadata}
+        self._rows = {int(song_id): row for row, song_id in enumerate(ids)}
+        self._matrix = matrix
+        self._watermark = int(ids.max()) if ids.size else 0
+        print(f"🔁 Stored vectors changed, reloaded {ids.size} songs into the index")
+        return int(ids.size)
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Load vectors from a snapshot file, with metadata from Postgres.
+        Songs deleted since the snapshot are dropped and songs below its
+        watermark that it lacks are fetched; vectors changed after it was
+        taken are not noticed. Returns the number of rows loaded.
+        """
+        ids, vectors = read_snapshot(path, self.dim)
+        metadata = {song["id"]: song for song in self.backing.list_all_songs()}
+        keep = np.fromiter(
+            (int(i) in metadata for i in ids), dtype=bool, count=len(ids)
+        )
+        with self._refresh_lock:
+            added = self._append(
+                ids[keep],
+                vectors[keep],
+                [metadata[int(song_id)] for song_id in ids[keep]],
+            )
+            missing = [
+                song_id
+                for song_id in metadata
+                if song_id not in self._rows and song_id <= self._watermark
+            ]
+            if missing:
+                added += self._append(*self.backing.fetch_vectors(song_ids=missing))
+
+        print(f"📦 Loaded {added} song vectors from snapshot {path}")
+        return added
+
+    def _append(
+        self, ids: np.ndarray, vectors: np.ndarray, metadata: List[Dict]
+    ) -> int:
+        new = ~self._loaded(ids)
+        if not new.any():
+            return 0
+        ids, vectors = ids[new], vectors[new]
+        metadata = [song for song, keep in zip(metadata, new) if keep]
+
+        start = len(self._matrix)
+        # Metadata first, so a published row always has its metadata
+        for offset, song in enumerate(metadata):
+            self._metadata[song["id"]] = song
+            self._rows[song["id"]] = start + offset
+        self._matrix.append(ids, vectors)
+        self._watermark = max(self._watermark, int(ids.max()))
+        return int(ids.size)
+
+    def _loaded(self, ids: np.ndarray) -> np.ndarray:
+        """Which of `ids` already have a row."""
+        return np.fromiter(
+            (int(song_id) in self._rows for song_id in ids),
+            dtype=bool,
+            count=len(ids),
+        )
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    def stats(self) -> Dict:
+        """Index size and synchronisation state."""
+        return {
+            "songs": len(self._matrix),
+            "watermark": self._watermark,
+            "vector_generation": self._generation,
+            "seconds_since_refresh": time.monotonic() - self._last_refresh,
+        }
+
+    # ============================================
+    # Reads served from memory
+    # ============================================
+
+    def find_similars(
+        self,
+        features: np.ndarray,
+        limit: int = 10,
+        metric: str = "cosine",
+        exclude_id: Optional[int] = None,
+    ) -> Optional[List[Dict]]:
+        """Exact nearest neighbours from the in-memory matrix."""
+        if features.shape[0] != self.dim:
+            raise ValueError(f"Query vector must have dimension {self.dim}")
+
+        self._maybe_refresh()
+        matrix = self._matrix
+        dist = matrix.distances(features, metric)
+        if dist.size == 0:
+            return None
+
+        results = self._nearest(matrix, dist[np.newaxis], limit, exclude_id)[0]
+        return results or None
+
+    def get_features(self, song_id: int) -> Optional[np.ndarray]:
+        """Feature vector of a song, refreshing once if it is not loaded yet."""
+        row = self._row_of(song_id)
+        return None if row is None else self._matrix.vector(row)
+
+    def find_similars_with_feedback(
+        self,
+        song_id: int,
+        limit: int = 10,
+        metric: str = "cosine",
+    ) -> Optional[List[Dict]]:
+        """Neighbours from memory; only the feedback sums hit Postgres."""
+        features = self.get_features(song_id)
+        if features is None:
+            return None
+
+        candidates = self.find_similars(features, limit=limit, metric=metric) or []
+        if not candidates:
+            return []
+
+        feedback_scores = self.backing.get_feedback_scores(
+            query_song_id=song_id,
+            suggested_song_ids=[song["id"] for song in candidates],
+        )
+        return [
+            {**song, "feedback_score": feedback_scores.get(song["id"], 0)}
+            for song in candidates
+        ]
+
+    @contextmanager
+    def open_similar_stream(
+        self, song_id: int, metric: str = "cosine"
+    ) -> Iterator[Callable[[int], Optional[List[Dict]]]]:
+        """
+        Distances to every row are computed once; each fetch selects the next
+        n with argpartition, and only their feedback sums hit Postgres.
+        """
+        row = self._row_of(song_id)
+        matrix = self._matrix
+        dist = None
+        if row is not None:
+            dist = matrix.distances(matrix.vector(row), metric)
+        seen = 0
+
+        def fetch(n: int) -> Optional[List[Dict]]:
+            nonlocal seen
+            if dist is None:
+                return None
+            top = smallest_k(dist, seen + n)[seen:]
+            seen += top.size
+            if top.size == 0:
+                return []
+            songs = self._results(matrix.ids_at(top), dist[top])
+            feedback_scores = self.backing.get_feedback_scores(
+                query_song_id=song_id,
+                suggested_song_ids=[song["id"] for song in songs],
+            )
+            return [
+                {**song, "feedback_score": feedback_scores.get(song["id"], 0)}
+                for song in songs
+            ]
+
+        yield fetch
+
+    def find_similars_with_feedback_batch(
+        self,
+        song_ids: List[int],
+        limit: int = 10,
+        metric: str = "cosine",
+    ) -> Dict[int, List[Dict]]:
+        """
+        Neighbours of many seeds with one matrix-matrix product and a row-wise
+        argpartition; feedback sums for every pair come from one query.
+        """
+        rows = {song_id: self._row_of(song_id) for song_id in song_ids}
+        seeds = [song_id for song_id, row in rows.items() if row is not None]
+        if not seeds:
+            return {}
+
+        matrix = self._matrix
+        queries = np.stack([matrix.vector(rows[song_id]) for song_id in seeds])
+        dist = matrix.distances(queries, metric)  # (seeds, songs)
+        candidates = dict(zip(seeds, self._nearest(matrix, dist, limit)))
+        feedback_scores = self.backing.get_feedback_scores_batch(
+            [
+                (song_id, song["id"])
+                for song_id, songs in candidates.items()
+                for song in songs
+            ]
+        )
+        return {
+            song_id: [
+                {
+                    **song,
+                    "feedback_score": feedback_scores.get((song_id, song["id"]), 0),
+                }
+                for song in songs
+            ]
+            for song_id, songs in candidates.items()
+        }
+
+    def _row_of(self, song_id: int) -> Optional[int]:
+        self._maybe_refresh()
+        row = self._rows.get(song_id)
+        now = time.monotonic()
+        if (
+            row is None
+            and song_id > self._watermark
+            and now - self._last_miss_refresh >= MISS_REFRESH_INTERVAL
+        ):
+            # Possibly inserted by another worker since the last refresh
+            self._last_miss_refresh = now
+            self.refresh()
+            row = self._rows.get(song_id)
+        return row
+
+    def _nearest(
+        self,
+        matrix: VectorMatrix,
+        dist: np.ndarray,
+        limit: int,
+        exclude_id: Optional[int] = None,
+    ) -> List[List[Dict]]:
+        """
+        Results for each row of `dist` (queries x matrix rows): the `limit`
+        nearest songs other than exclude_id. Rows whose song is gone are
+        skipped before the lists are cut, looking further when needed.
+        """
+        n = dist.shape[-1]
+        # One spare candidate in case the excluded song is among them
+        k = min(limit + 1 if exclude_id else limit, n)
+        while True:
+            top = smallest_k(dist, k)
+            ids = matrix.ids_at(top)
+            songs = self._songs(np.unique(ids))
+            results = []
+            for q in range(dist.shape[0]):
+                hits = [
+                    (songs[int(song_id)], float(distance))
+                    for song_id, distance in zip(ids[q], dist[q, top[q]])
+                    if int(song_id) != exclude_id and songs.get(int(song_id))
+                ]
+                results.append([self._result(*hit) for hit in hits[:limit]])
+            if k >= n or all(len(found) == limit for found in results):
+                return results
+            # Songs deleted since they were loaded: look further
+            k = min(2 * k, n)
+
+    def _results(self, ids: np.ndarray, dist: np.ndarray) -> List[Dict]:
+        """Search results for matrix ids and their distances, in order."""
+        songs = self._songs(ids)
+        return [
+            self._result(songs[int(song_id)], float(distance))
+            for song_id, distance in zip(ids, dist)
+            if songs.get(int(song_id))
+        ]
+
+    def _songs(self, ids: np.ndarray) -> Dict[int, Optional[Dict]]:
+        """Metadata of matrix ids (None for songs no longer known)."""
+        return {int(song_id): self._metadata.get(int(song_id)) for song_id in ids}
+
+    @staticmethod
+    def _result(song: Dict, distance: float) -> Dict:
+        return {
+            "id": song["id"],
+            "title": song["title"],
+            "artist_name": song["artist_name"],
+            "url": song["url"],
+            "source_platform": song["source_platform"],
+            "distance": distance,
+        }
+
+    # ============================================
+    # Writes and everything else go to Postgres
+    # ============================================
+
+    def get_song_by_url(self, url: str) -> Optional[Dict]:
+        return self.backing.get_song_by_url(url)
+
+    def store_features(
+        self,
+        title: str,
+        artist_name: str,
+        url: str,
+        song_feature: np.ndarray,
+        source_platform: str,
+        added_by: Optional[int] = None,
+        release_date: Optional[str] = None,
+    ) -> Tuple[Dict, bool]:
+        """Insert through Postgres, then pull the new row into the index."""
+        song, is_new = self.backing.store_features(
+            title=title,
+            artist_name=artist_name,
+            url=url,
+            song_feature=song_feature,
+            source_platform=source_platform,
+            added_by=added_by,
+            release_date=release_date,
+        )
+        if is_new:
+            self.refresh()
+        return song, is_new
+
+    def get_songs_by_urls(self, urls: List[str]) -> Dict[str, Dict]:
+        return self.backing.get_songs_by_urls(urls)
+
+    def get_song_by_id(self, song_id: int) -> Optional[Dict]:
+        return self.backing.get_song_by_id(song_id)
+
+    def get_songs_by_ids(self, song_ids: List[int]) -> Dict[int, Dict]:
+        return self.backing.get_songs_by_ids(song_ids)
+
+    def store_features_batch(self, songs: List[Dict]) -> List[Tuple[Dict, bool]]:
+        """Batch insert through Postgres, then pull the new rows into the index."""
+        results = self.backing.store_features_batch(songs)
+        if any(is_new for _, is_new in results):
+            self.refresh()
+        return results
+
+    def list_all_songs(self) -> List[Dict]:
+        return self.backing.list_all_songs()
+
+    def list_songs(
+        self,
+        after_id: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+    ) -> List[Dict]:
+        return self.backing.list_songs(
+            after_id, limit, fields, source_platform, added_by
+        )
+
+    def iter_songs(
+        self,
+        after_id: int = 0,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict]:
+        return self.backing.iter_songs(
+            after_id, fields, source_platform, added_by, batch_size
+        )
+
+    def store_feedback(
+        self, user_id: int, query_song_id: int, suggested_song_id: int, vote: int
+    ) -> None:
+        self.backing.store_feedback(user_id, query_song_id, suggested_song_id, vote)
+
+    def get_feedback_scores(
+        self, query_song_id: int, suggested_song_ids: List[int]
+    ) -> Dict[int, int]:
+        return self.backing.get_feedback_scores(query_song_id, suggested_song_ids)
+
+    def get_feedback_scores_batch(
+        self, pairs: List[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], int]:
+        return self.backing.get_feedback_scores_batch(pairs)
+
+    def find_similars_from_neighbors(
+        self, song_id: int, limit: int = 10
+    ) -> Optional[List[Dict]]:
+        return self.backing.find_similars_from_neighbors(song_id, limit)
+
+    def close(self) -> None:
+        self.backing.close()
+
+    def pool_stats(self) -> Dict:
+        return self.backing.pool_stats()
@@ -1,4 +1,6 @@
 import numpy as np
+from .source_keys import canonical_source_key
+from .vector_math import VectorMatrix, distances, smallest_k
 from .vector_repository import VectorRepository
 from typing import Dict, List, Optional, Tuple
 
@@ -7,31 +9,44 @@ class MockVectorRepository(VectorRepository):
     """
     In-memory mock database for development/testing.
     Simulates storing and searching songs with feature vectors.
+
+    Vectors live in a preallocated, growable float32 matrix so similarity
+    search is one matrix-vector product plus a top-k selection, and URL
+    lookups go through a dict instead of scanning every song.
     """
 
-    def __init__(self):
-        # Simple dict acting as an in-memory songs table
-        # Key: song_id (auto incremented)
-        # Value: song record (dict)
+    def __init__(self, dim: int = 27, capacity: int = 1024):
+        # Matrix rows are aligned with song ids via the id <-> row maps below
+        self.dim = dim
+        self._matrix = VectorMatrix(dim, capacity=capacity)
+        self._row_by_id: Dict[int, int] = {}
+        # Song records (without the feature vector), keyed by song_id
         self.storage: Dict[int, Dict] = {}
+        # canonical source key -> song_id (any URL form of a track matches)
+        self._id_by_key: Dict[str, int] = {}
+        # (user_id, query_song_id, suggested_song_id) -> vote
+        self._feedback: Dict[Tuple[int, int, int], int] = {}
         self._next_id = 1
         print("🔧 Using MOCK vector repository (in-memory)")
 
     def get_song_by_url(self, url: str) -> Optional[Dict]:
         """Get a song's metadata by its unique URL."""
-        for song in self.storage.values():
-            if song["url"] == url:
-                return {
-                    "id": song["id"],
-                    "title": song["title"],
-                    "artist_name": song["artist_name"],
-                    "release_date": song["release_date"],
-                    "url": song["url"],
-                    "source_platform": song["source_platform"],
-                    "added_by": song["added_by"],
-                    "added_at": None,  # Mock doesn't track timestamps
-                }
-        return None
+        song_id = self._id_by_key.get(canonical_source_key(url))
+        if song_id is None:
+            return None
+        return self._song_dict(self.storage[song_id])
+
+    def get_song_by_id(self, song_id: int) -> Optional[Dict]:
+        """Get a song's metadata by id (dict lookup)."""
+        song = self.storage.get(song_id)
+        return self._song_dict(song) if song else None
+
+    def get_songs_by_ids(self, song_ids: List[int]) -> Dict[int, Dict]:
+        return {
+            song_id: self._song_dict(self.storage[song_id])
+            for song_id in song_ids
+            if song_id in self.storage
+        }
 
     def store_features(
         self,
@@ -51,6 +66,9 @@ class MockVectorRepository(VectorRepository):
                 - song_data: Dictionary containing the song information
                 - is_new: True if newly inserted, False if URL already existed
         """
+        if song_feature.shape[0] != self.dim:
+            raise ValueError(f"Feature vector must have dimension {self.dim}")
+
         # Check if song already exists (by URL)
         # This check remains as a final safety, but get_song_by_url will catch most
         existing_song = self.get_song_by_url(url)
@@ -70,23 +88,16 @@ class MockVectorRepository(VectorRepository):
             "artist_name": artist_name,
             "release_date": release_date,
             "url": url,
-            "song_feature": song_feature,
             "source_platform": source_platform,
             "added_by": added_by,
         }
+        self._id_by_key[canonical_source_key(url)] = song_id
+        self._row_by_id[song_id] = len(self._matrix)
+        self._matrix.append([song_id], song_feature.reshape(1, -1))
 
         print(f"✅ Stored new mock song: {title} by {artist_name} (ID: {song_id})")
 
-        return {
-            "id": song_id,
-            "title": title,
-            "artist_name": artist_name,
-            "release_date": release_date,
-            "url": url,
-            "source_platform": source_platform,
-            "added_by": added_by,
-            "added_at": None,
-        }, True
+        return self._song_dict(self.storage[song_id]), True
 
     def find_similars(
         self,
@@ -95,41 +106,55 @@ class MockVectorRepository(VectorRepository):
         metric: str = "cosine",
         exclude_id: Optional[int] = None,
     ) -> Optional[List[Dict]]:
-        """Mock similarity search using cosine similarity."""
-        if not self.storage:
+        """Mock similarity search: batched distances + top-k selection."""
+        ids, unit, norms = self._matrix.view()
+        if ids.size == 0:
             return None
 
-        similarities = []
-        for song in self.storage.values():
-            # Skip if this is the song to exclude
-            if exclude_id and song["id"] == exclude_id:
-                continue
-
-            stored_features = song["song_feature"]
-            similarity = self._cosine_similarity(features, stored_features)
-
-            similarities.append(
-                {
-                    "id": song["id"],
-                    "title": song["title"],
-                    "artist_name": song["artist_name"],
-                    "url": song["url"],
-                    "source_platform": song["source_platform"],
-                    "distance": 1.0
-                    - float(similarity),  # Convert similarity to distance
-                }
-            )
+        dist = distances(unit, norms, features, metric)
+        if exclude_id:
+            dist[ids == exclude_id] = np.inf
+
+        top = smallest_k(dist, limit)
+        if exclude_id:
+            top = top[ids[top] != exclude_id]
+
+        return [self._similar_dict(int(ids[row]), float(dist[row])) for row in top]
 
-        # Sort by distance (ascending - smaller is more similar)
-        similarities.sort(key=lambda x: x["distance"])
-        return similarities[:limit]
+    def find_similars_with_feedback_batch(
+        self,
+        song_ids: List[int],
+        limit: int = 10,
+        metric: str = "cosine",
+    ) -> Dict[int, List[Dict]]:
+        """Mock batched search: one matrix-matrix product for all seeds."""
+        seeds = [i for i in dict.fromkeys(song_ids) if i in self._row_by_id]
+        if not seeds:
+            return {}
+
+        ids, unit, norms = self._matrix.view()
+        queries = np.stack([self._matrix.vector(self._row_by_id[i]) for i in seeds])
+        dist = distances(unit, norms, queries, metric)
+        top = smallest_k(dist, limit)
+
+        results = {}
+        for q, song_id in enumerate(seeds):
+            candidates = [
+                self._similar_dict(int(ids[row]), float(dist[q, row])) for row in top[q]
+            ]
+            scores = self.get_feedback_scores(song_id, [c["id"] for c in candidates])
+            results[song_id] = [
+                {**song, "feedback_score": scores.get(song["id"], 0)}
+                for song in candidates
+            ]
+        return results
 
     def get_features(self, song_id: int) -> Optional[np.ndarray]:
         """Retrieve feature vector for a given song ID."""
-        song = self.storage.get(song_id)
-        if song:
-            return song["song_feature"]
-        return None
+        row = self._row_by_id.get(song_id)
+        if row is None:
+            return None
+        return self._matrix.vector(row)
 
     def list_all_songs(self) -> List[Dict]:
         """List all stored songs (excluding feature vector)."""
@@ -146,10 +171,43 @@ class MockVectorRepository(VectorRepository):
             for song in self.storage.values()
         ]
 
+    def store_feedback(
+        self, user_id: int, query_song_id: int, suggested_song_id: int, vote: int
+    ) -> None:
+        """Store (or overwrite) a user's vote for a song match."""
+        self._feedback[(user_id, query_song_id, suggested_song_id)] = vote
+
+    def get_feedback_scores(
+        self, query_song_id: int, suggested_song_ids: List[int]
+    ) -> Dict[int, int]:
+        """Sum of votes per suggested song for a query song."""
+        wanted = set(suggested_song_ids)
+        scores: Dict[int, int] = {}
+        for (_, query_id, suggested_id), vote in self._feedback.items():
+            if query_id == query_song_id and suggested_id in wanted:
+                scores[suggested_id] = scores.get(suggested_id, 0) + vote
+        return scores
+
+    def _similar_dict(self, song_id: int, distance: float) -> Dict:
+        song = self.storage[song_id]
+        return {
+            "id": song["id"],
+            "title": song["title"],
+            "artist_name": song["artist_name"],
+            "url": song["url"],
+            "source_platform": song["source_platform"],
+            "distance": distance,
+        }
+
     @staticmethod
-    def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-        """Calculate cosine similarity between two vectors."""
-        denom = np.linalg.norm(a) * np.linalg.norm(b)
-        if denom == 0:
-            return 0.0
-        return np.dot(a, b) / denom
+    def _song_dict(song: Dict) -> Dict:
+        return {
+            "id": song["id"],
+            "title": song["title"],
+            "artist_name": song["artist_name"],
+            "release_date": song["release_date"],
+            "url": song["url"],
+            "source_platform": song["source_platform"],
+            "added_by": song["added_by"],
+            "added_at": None,  # Mock doesn't track timestamps
+        }
@@ -1,49 +1,263 @@
 import numpy as np
 import psycopg2
-from typing import List, Dict, Optional, Tuple
-from .vector_repository import VectorRepository
+from psycopg2.extras import execute_values
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Iterator, Optional, Sequence, Tuple
+from .connection_pool import PGConnectionPool
+from .source_keys import canonical_source_key
+from .vector_codec import (
+    CopyRowDecoder,
+    CopyRowReader,
+    decode_vector,
+    decode_vectors,
+)
+from .vector_math import distances, normalize_rows, smallest_k
+from .vector_repository import VectorRepository, song_fields
+from .vector_snapshot import SnapshotWriter, read_snapshot
+
+
+SONG_COLUMNS = (
+    "id, title, artist_name, release_date, url, source_platform, added_by, added_at"
+)
+# pgvector's upper bound for hnsw.ef_search
+HNSW_MAX_EF_SEARCH = 1000
+# song_feedback_scores and the SONG_FEEDBACK trigger maintaining it (mirrors
+# db/init.sql, for databases created before the aggregate existed)
+FEEDBACK_SCORES_DDL = """
+CREATE TABLE IF NOT EXISTS song_feedback_scores (
+    query_song_id integer NOT NULL REFERENCES songs (id) ON DELETE CASCADE,
+    suggested_song_id integer NOT NULL REFERENCES songs (id) ON DELETE CASCADE,
+    net_score integer NOT NULL DEFAULT 0,
+    upvotes integer NOT NULL DEFAULT 0,
+    downvotes integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (query_song_id, suggested_song_id)
+);
+
+CREATE OR REPLACE FUNCTION song_feedback_scores_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE song_feedback_scores
+        SET net_score = net_score - OLD.vote,
+            upvotes = upvotes - (OLD.vote = 1)::int,
+            downvotes = downvotes - (OLD.vote = -1)::int
+        WHERE query_song_id = OLD.query_song_id
+          AND suggested_song_id = OLD.suggested_song_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO song_feedback_scores (query_song_id, suggested_song_id, net_score, upvotes, downvotes)
+        VALUES (NEW.query_song_id, NEW.suggested_song_id, NEW.vote, (NEW.vote = 1)::int, (NEW.vote = -1)::int)
+        ON CONFLICT (query_song_id, suggested_song_id) DO UPDATE
+        SET net_score = song_feedback_scores.net_score + EXCLUDED.net_score,
+            upvotes = song_feedback_scores.upvotes + EXCLUDED.upvotes,
+            downvotes = song_feedback_scores.downvotes + EXCLUDED.downvotes;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS song_feedback_scores_sync ON song_feedback;
+CREATE TRIGGER song_feedback_scores_sync
+AFTER INSERT OR UPDATE OR DELETE ON song_feedback
+FOR EACH ROW EXECUTE FUNCTION song_feedback_scores_apply();
+"""
+# Bumped after every commit that changes stored vectors (not inserts), so
+# in-process indexes know to reload (mirrors db/init.sql)
+VECTOR_GENERATION_DDL = "CREATE SEQUENCE IF NOT EXISTS song_vector_generation;"
+# Distance matrix elements per block when building neighbour lists (64 MB of
+# float32), so memory stays flat however large the catalogue grows
+NEIGHBOR_BLOCK_ELEMENTS = 1 << 24
 
 
 class PGVectorRepository(VectorRepository):
-    def __init__(self, dsn: str, dim: int):
+    # pgvector distance operator per supported metric
+    METRIC_OPERATORS = {"cosine": "<=>", "l2": "<->", "inner_product": "<#>"}
+    # Operator class an ANN index needs to serve each metric
+    INDEX_OPCLASSES = {
+        "cosine": "vector_cosine_ops",
+        "l2": "vector_l2_ops",
+        "inner_product": "vector_ip_ops",
+    }
+    INDEX_METHODS = ("hnsw", "ivfflat")
+
+    def __init__(
+        self,
+        dsn: str,
+        dim: int,
+        pool_min_size: int = 0,
+        pool_max_size: int = 0,
+        pool_timeout: float = 5.0,
+        pool_health_check_interval: float = 30.0,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        iterative_scan: Optional[str] = "strict_order",
+    ):
         """
         dsn: PostgreSQL connection string (e.g. "postgresql://user:pass@db:5432/mydb")
         dim: dimension of the feature vector
+        pool_min_size / pool_max_size: connection pool bounds. With
+            pool_max_size=0 (default) a new connection is opened per call.
+        pool_timeout: seconds to wait for a free pooled connection
+        pool_health_check_interval: idle seconds after which a pooled
+            connection is pinged before reuse
+        ef_search: default hnsw.ef_search for similarity queries (None = server default)
+        probes: default ivfflat.probes for similarity queries (None = server default)
+        iterative_scan: hnsw.iterative_scan for candidate streams (pgvector
+            >= 0.8), which lets an HNSW scan continue past ef_search rows.
+            None or "off" leaves it unset (streams then end after ef_search rows)
         """
         self.dsn = dsn
         self.dim = dim
+        self.ef_search = ef_search
+        self.probes = probes
+        self.iterative_scan = None if iterative_scan == "off" else iterative_scan
+        self.pool: Optional[PGConnectionPool] = None
+        if pool_max_size > 0:
+            self.pool = PGConnectionPool(
+                dsn,
+                min_size=pool_min_size,
+                max_size=pool_max_size,
+                timeout=pool_timeout,
+                health_check_interval=pool_health_check_interval,
+            )
+            print(
+                f"🏊 Using pooled database connections "
+                f"(min={pool_min_size}, max={pool_max_size})"
+            )
         self._ensure_extension()
 
-    def _connect(self):
-        return psycopg2.connect(self.dsn)
+    @contextmanager
+    def _connection(self) -> Iterator:
+        """
+        Borrow a connection (pooled or one-off) for a single transaction.
+        Commits on success, rolls back on error, then returns/closes it.
+        """
+        conn = self.pool.getconn() if self.pool else psycopg2.connect(self.dsn)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if self.pool:
+                self.pool.putconn(conn)
+            else:
+                conn.close()
+
+    def close(self) -> None:
+        """Close the connection pool, if any."""
+        if self.pool:
+            self.pool.close()
+
+    def pool_stats(self) -> Dict:
+        """Connection pool usage counters."""
+        if not self.pool:
+            return {"pooled": False}
+        return {"pooled": True, **self.pool.stats()}
+
+    @contextmanager
+    def _autocommit_connection(self) -> Iterator:
+        """Borrow a connection in autocommit mode (needed for CONCURRENTLY DDL)."""
+        with self._connection() as conn:
+            conn.autocommit = True
+            try:
+                yield conn
+            finally:
+                conn.autocommit = False
+
+    @staticmethod
+    def scan_ef_search(ef_search: Optional[int], limit: Optional[int]) -> Optional[int]:
+        """
+        hnsw.ef_search for a query returning up to `limit` rows: an HNSW scan
+        yields at most ef_search candidates, so it is raised to the limit
+        (within pgvector's bound). Shared with the async repository.
+        """
+        ef_search = max(ef_search or 0, limit or 0)
+        return min(ef_search, HNSW_MAX_EF_SEARCH) or None
+
+    def _search_settings_sql(
+        self,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> str:
+        """
+        SET LOCAL statements for the ANN search knobs, prepended to the query
+        itself so they cost no extra round-trip. `limit` is the number of
+        rows the query orders by distance (see scan_ef_search); beyond
+        pgvector's ef_search bound the scan is made iterative.
+        """
+        ef_search = self.scan_ef_search(ef_search or self.ef_search, limit)
+        probes = probes or self.probes
+        settings = ""
+        if ef_search:
+            settings += f"SET LOCAL hnsw.ef_search = {int(ef_search)};\n"
+        if limit and limit > HNSW_MAX_EF_SEARCH and self.iterative_scan:
+            settings += f"SET LOCAL hnsw.iterative_scan = {self.iterative_scan};\n"
+        if probes:
+            settings += f"SET LOCAL ivfflat.probes = {int(probes)};\n"
+        return settings
 
     def _ensure_extension(self):
         """Ensure that pgvector extension is available."""
-        with self._connect() as conn, conn.cursor() as cur:
+        with self._connection() as conn, conn.cursor() as cur:
             cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-            conn.commit()
+
+    @staticmethod
+    def _song_row(row) -> Dict:
+        return {
+            "id": row[0],
+            "title": row[1],
+            "artist_name": row[2],
+            "release_date": row[3],
+            "url": row[4],
+            "source_platform": row[5],
+            "added_by": row[6],
+            "added_at": row[7],
+        }
 
     def get_song_by_url(self, url: str) -> Optional[Dict]:
-        """Get a song's metadata by its unique URL."""
-        with self._connect() as conn, conn.cursor() as cur:
+        """
+        Get a song's metadata by URL. Any URL form of the same media matches
+        (canonical source key); the exact URL also matches rows stored before
+        source keys were backfilled.
+        """
+        with self._connection() as conn, conn.cursor() as cur:
             cur.execute(
-                "SELECT id, title, artist_name, release_date, url, source_platform, added_by, added_at FROM songs WHERE url = %s",
-                (url,),
+                f"""
+                SELECT {SONG_COLUMNS} FROM songs
+                WHERE source_key = %s OR url = %s
+                ORDER BY id
+                LIMIT 1;
+                """,
+                (canonical_source_key(url), url),
             )
             existing = cur.fetchone()
 
-            if existing:
-                return {
-                    "id": existing[0],
-                    "title": existing[1],
-                    "artist_name": existing[2],
-                    "release_date": existing[3],
-                    "url": existing[4],
-                    "source_platform": existing[5],
-                    "added_by": existing[6],
-                    "added_at": existing[7],
-                }
-        return None
+        return self._song_row(existing) if existing else None
+
+    def get_song_by_id(self, song_id: int) -> Optional[Dict]:
+        """Get a song's metadata by primary key."""
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {SONG_COLUMNS} FROM songs WHERE id = %s;", (song_id,))
+            row = cur.fetchone()
+
+        return self._song_row(row) if row else None
+
+    def get_songs_by_ids(self, song_ids: List[int]) -> Dict[int, Dict]:
+        """Metadata of the existing songs among `song_ids` (one query), keyed by id."""
+        if not song_ids:
+            return {}
+
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {SONG_COLUMNS} FROM songs WHERE id = ANY(%s);",
+                (list(song_ids),),
+            )
+            rows = cur.fetchall()
+
+        return {row[0]: self._song_row(row) for row in rows}
 
     def store_features(
         self,
@@ -61,78 +275,143 @@ class PGVectorRepository(VectorRepository):
         Returns:
             Tuple[Dict, bool]: (song_data, is_new)
                 - song_data: Dictionary containing the song information
-                - is_new: True if newly inserted, False if URL already existed
+                - is_new: True if newly inserted, False if the URL (or another
+                  URL of the same media) already existed
         """
         if song_feature.shape[0] != self.dim:
             raise ValueError(f"Feature vector must have dimension {self.dim}")
 
-        conn = self._connect()
-        try:
-            with conn.cursor() as cur:
-                # This check remains as a final safety (in case of race condition)
-                # But the service layer will now catch most duplicates.
+        source_key = canonical_source_key(url)
+
+        with self._connection() as conn, conn.cursor() as cur:
+            # A concurrent insert of the same media loses on the unique
+            # url/source_key indexes instead of raising
+            cur.execute(
+                f"""
+                INSERT INTO songs (title, artist_name, release_date, url, source_key, song_feature, source_platform, added_by)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT DO NOTHING
+                RETURNING {SONG_COLUMNS};
+                """,
+                (
+                    title,
+                    artist_name,
+                    release_date,
+                    url,
+                    source_key,
+                    song_feature.tolist(),
+                    source_platform,
+                    added_by,
+                ),
+            )
+            new_song = cur.fetchone()
+
+            if not new_song:
                 cur.execute(
-                    "SELECT id, title, artist_name, release_date, url, source_platform, added_by, added_at FROM songs WHERE url = %s",
-                    (url,),
+                    f"SELECT {SONG_COLUMNS} FROM songs WHERE source_key = %s OR url = %s ORDER BY id LIMIT 1;",
+                    (source_key, url),
                 )
                 existing = cur.fetchone()
+                print(
+                    f"⚠️  Song already exists: {existing[1]} by {existing[2]} (ID: {existing[0]})"
+                )
+                return self._song_row(existing), False
 
-                if existing:
-                    conn.rollback()
-                    print(
-                        f"⚠️  Song already exists: {existing[1]} by {existing[2]} (ID: {existing[0]})"
-                    )
-                    return {
-                        "id": existing[0],
-                        "title": existing[1],
-                        "artist_name": existing[2],
-                        "release_date": existing[3],
-                        "url": existing[4],
-                        "source_platform": existing[5],
-                        "added_by": existing[6],
-                        "added_at": existing[7],
-                    }, False
+            self._update_neighbors(cur, [new_song[0]])
 
-                cur.execute(
-                    """
-                    INSERT INTO songs (title, artist_name, release_date, url, song_feature, source_platform, added_by)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id, title, artist_name, release_date, url, source_platform, added_by, added_at;
-                    """,
-                    (
-                        title,
-                        artist_name,
-                        release_date,
-                        url,
-                        song_feature.tolist(),
-                        source_platform,
-                        added_by,
-                    ),
-                )
+        print(f"✅ Stored new song: {new_song[1]} by {new_song[2]} (ID: {new_song[0]})")
+        return self._song_row(new_song), True
 
-                new_song = cur.fetchone()
-                conn.commit()
+    def get_songs_by_urls(self, urls: List[str]) -> Dict[str, Dict]:
+        """
+        Metadata of the stored songs matching `urls` (one query), keyed by the
+        given URL. Matching follows get_song_by_url.
+        """
+        if not urls:
+            return {}
 
-                print(
-                    f"✅ Stored new song: {new_song[1]} by {new_song[2]} (ID: {new_song[0]})"
-                )
+        keys = {url: canonical_source_key(url) for url in urls}
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT {SONG_COLUMNS}, source_key FROM songs
+                WHERE source_key = ANY(%s) OR url = ANY(%s)
+                ORDER BY id;
+                """,
+                (list(set(keys.values())), list(urls)),
+            )
+            rows = cur.fetchall()
 
-                return {
-                    "id": new_song[0],
-                    "title": new_song[1],
-                    "artist_name": new_song[2],
-                    "release_date": new_song[3],
-                    "url": new_song[4],
-                    "source_platform": new_song[5],
-                    "added_by": new_song[6],
-                    "added_at": new_song[7],
-                }, True
-
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        by_key, by_url = {}, {}
+        for row in rows:
+            by_key.setdefault(row[8], self._song_row(row))
+            by_url.setdefault(row[4], self._song_row(row))
+
+        found = {}
+        for url, key in keys.items():
+            song = by_key.get(key) or by_url.get(url)
+            if song:
+                found[url] = song
+        return found
+
+    def store_features_batch(self, songs: List[Dict]) -> List[Tuple[Dict, bool]]:
+        """
+        Insert many songs with one multi-row INSERT (execute_values).
+        Songs whose media already exists are left untouched and returned
+        with is_new=False.
+        """
+        if not songs:
+            return []
+
+        for song in songs:
+            if song["song_feature"].shape[0] != self.dim:
+                raise ValueError(f"Feature vector must have dimension {self.dim}")
+
+        values = [
+            (
+                song["title"],
+                song["artist_name"],
+                song.get("release_date"),
+                song["url"],
+                canonical_source_key(song["url"]),
+                song["song_feature"].tolist(),
+                song["source_platform"],
+                song.get("added_by"),
+            )
+            for song in songs
+        ]
+
+        with self._connection() as conn, conn.cursor() as cur:
+            inserted_rows = execute_values(
+                cur,
+                f"""
+                INSERT INTO songs (title, artist_name, release_date, url, source_key, song_feature, source_platform, added_by)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+                RETURNING {SONG_COLUMNS};
+                """,
+                values,
+                page_size=max(len(values), 1),
+                fetch=True,
+            )
+            self._update_neighbors(cur, [row[0] for row in inserted_rows])
+
+        inserted = {row[4]: self._song_row(row) for row in inserted_rows}
+        missing = [song["url"] for song in songs if song["url"] not in inserted]
+        existing = self.get_songs_by_urls(missing)
+
+        print(f"✅ Batch stored {len(inserted)} new songs ({len(existing)} existing)")
+
+        results = []
+        for song in songs:
+            url = song["url"]
+            if url in inserted:
+                # A URL repeated within the batch is only new the first time
+                results.append((inserted.pop(url), True))
+                existing[url] = results[-1][0]
+            else:
+                results.append((existing[url], False))
+        return results
 
     def find_similars(
         self,
@@ -140,13 +419,17 @@ class PGVectorRepository(VectorRepository):
         limit: int = 10,
         metric: str = "cosine",
         exclude_id: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
     ) -> Optional[List[Dict]]:
-        """Find similar songs by vector distance."""
+        """
+        Find similar songs by vector distance.
+        ef_search / probes override the repository's ANN search defaults.
+        """
         if features.shape[0] != self.dim:
             raise ValueError(f"Query vector must have dimension {self.dim}")
 
-        operators = {"cosine": "<=>", "l2": "<->", "inner_product": "<#>"}
-        operator = operators.get(metric, "<=>")
+        operator = self.METRIC_OPERATORS.get(metric, "<=>")
 
         where_clause = "WHERE id != %s" if exclude_id else ""
         params = [features.tolist()]
@@ -154,8 +437,13 @@ class PGVectorRepository(VectorRepository):
             params.append(exclude_id)
         params.append(limit)
 
-        with self._connect() as conn, conn.cursor() as cur:
-            query = f"""
+        # One more candidate than returned when the excluded song is among them
+        settings = self._search_settings_sql(
+            ef_search, probes, limit + 1 if exclude_id else limit
+        )
+
+        with self._connection() as conn, conn.cursor() as cur:
+            query = f"""{settings}
                 SELECT id, title, artist_name, url, source_platform,
                        (song_feature {operator} %s::vector) AS distance
                 FROM songs
@@ -181,21 +469,267 @@ class PGVectorRepository(VectorRepository):
             for row in rows
         ]
 
+    def find_similars_with_feedback(
+        self,
+        song_id: int,
+        limit: int = 10,
+        metric: str = "cosine",
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> Optional[List[Dict]]:
+        """
+        Nearest neighbours of a stored song with their feedback sums, in one query.
+        The query vector is read by subquery and feedback is LEFT JOINed per candidate.
+        Returns None if the query song does not exist.
+        """
+        operator = self.METRIC_OPERATORS.get(metric, "<=>")
+        settings = self._search_settings_sql(ef_search, probes, limit)
+
+        with self._connection() as conn, conn.cursor() as cur:
+            query = f"""{settings}
+                WITH query_song AS (
+                    SELECT song_feature FROM songs WHERE id = %(song_id)s
+                ),
+                candidates AS (
+                    SELECT id, title, artist_name, url, source_platform,
+                           (song_feature {operator} (SELECT song_feature FROM query_song)) AS distance
+                    FROM songs
+                    WHERE EXISTS (SELECT 1 FROM query_song)
+                    ORDER BY distance ASC
+                    LIMIT %(limit)s
+                )
+                SELECT c.id, c.title, c.artist_name, c.url, c.source_platform,
+                       c.distance, COALESCE(f.net_score, 0) AS feedback_score
+                FROM candidates c
+                LEFT JOIN SONG_FEEDBACK_SCORES f
+                    ON f.query_song_id = %(song_id)s AND f.suggested_song_id = c.id
+                ORDER BY c.distance ASC;
+            """
+            cur.execute(query, {"song_id": song_id, "limit": limit})
+            rows = cur.fetchall()
+
+        if not rows:
+            return None
+
+        return [
+            {
+                "id": row[0],
+                "title": row[1],
+                "artist_name": row[2],
+                "url": row[3],
+                "source_platform": row[4],
+                "distance": float(row[5]),
+                "feedback_score": int(row[6]),
+            }
+            for row in rows
+        ]
+
+    @contextmanager
+    def open_similar_stream(
+        self, song_id: int, metric: str = "cosine"
+    ) -> Iterator[Callable[[int], Optional[List[Dict]]]]:
+        """
+        Nearest neighbours of a stored song (with feedback sums), fetched
+        incrementally from one server-side cursor: fetch(n) returns the next
+        n candidates in distance order ([] once exhausted). The first fetch
+        returns None if the query song does not exist. Holds a connection
+        until the block exits.
+        """
+        operator = self.METRIC_OPERATORS.get(metric, "<=>")
+        settings = self._search_settings_sql()
+        if self.iterative_scan:
+            settings += f"SET LOCAL hnsw.iterative_scan = {self.iterative_scan};\n"
+
+        with self._connection() as conn:
+            if settings:
+                with conn.cursor() as cur:
+                    cur.execute(settings)
+            with conn.cursor(name="similar_stream") as cur:
+                cur.execute(
+                    f"""
+                    WITH query_song AS (
+                        SELECT song_feature FROM songs WHERE id = %(song_id)s
+                    )
+                    SELECT id, title, artist_name, url, source_platform,
+                           (song_feature {operator} (SELECT song_feature FROM query_song)) AS distance,
+                           COALESCE((
+                               SELECT net_score FROM SONG_FEEDBACK_SCORES
+                               WHERE query_song_id = %(song_id)s AND suggested_song_id = songs.id
+                           ), 0) AS feedback_score
+                    FROM songs
+                    WHERE EXISTS (SELECT 1 FROM query_song)
+                    ORDER BY distance ASC;
+                    """,
+                    {"song_id": song_id},
+                )
+                started = False
+
+                def fetch(n: int) -> Optional[List[Dict]]:
+                    nonlocal started
+                    rows = cur.fetchmany(n)
+                    if not rows and not started:
+                        return None
+                    started = True
+                    return [
+                        {
+                            "id": row[0],
+                            "title": row[1],
+                            "artist_name": row[2],
+                            "url": row[3],
+                            "source_platform": row[4],
+                            "distance": float(row[5]),
+                            "feedback_score": int(row[6]),
+                        }
+                        for row in rows
+                    ]
+
+                yield fetch
+
+    @staticmethod
+    def similar_batch_query(operator: str) -> str:
+        """
+        Neighbours of many seeds in one statement: a LATERAL subquery runs the
+        index-backed ORDER BY distance LIMIT search once per seed, and the
+        feedback sum is joined per (seed, candidate). Shared with the async
+        repository.
+        """
+        return f"""
+            SELECT s.id, c.id, c.title, c.artist_name, c.url, c.source_platform,
+                   c.distance, COALESCE(f.net_score, 0) AS feedback_score
+            FROM songs s
+            CROSS JOIN LATERAL (
+                SELECT t.id, t.title, t.artist_name, t.url, t.source_platform,
+                       (t.song_feature {operator} s.song_feature) AS distance
+                FROM songs t
+                ORDER BY t.song_feature {operator} s.song_feature
+                LIMIT %(limit)s
+            ) c
+            LEFT JOIN SONG_FEEDBACK_SCORES f
+                ON f.query_song_id = s.id AND f.suggested_song_id = c.id
+            WHERE s.id = ANY(%(song_ids)s)
+            ORDER BY s.id, c.distance ASC;
+        """
+
+    @staticmethod
+    def similar_batch_rows(rows) -> Dict[int, List[Dict]]:
+        """Group similar_batch_query rows by seed id."""
+        results: Dict[int, List[Dict]] = {}
+        for row in rows:
+            results.setdefault(row[0], []).append(
+                {
+                    "id": row[1],
+                    "title": row[2],
+                    "artist_name": row[3],
+                    "url": row[4],
+                    "source_platform": row[5],
+                    "distance": float(row[6]),
+                    "feedback_score": int(row[7]),
+                }
+            )
+        return results
+
+    def find_similars_with_feedback_batch(
+        self,
+        song_ids: List[int],
+        limit: int = 10,
+        metric: str = "cosine",
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> Dict[int, List[Dict]]:
+        """
+        Neighbours with feedback sums for many query songs in one round-trip
+        (see similar_batch_query). Unknown ids are absent from the result.
+        """
+        if not song_ids:
+            return {}
+
+        operator = self.METRIC_OPERATORS.get(metric, "<=>")
+        query = self._search_settings_sql(
+            ef_search, probes, limit
+        ) + self.similar_batch_query(operator)
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(query, {"song_ids": list(song_ids), "limit": limit})
+            rows = cur.fetchall()
+
+        return self.similar_batch_rows(rows)
+
     def get_features(self, song_id: int) -> Optional[np.ndarray]:
         """Retrieve the feature vector for a given song ID."""
-        with self._connect() as conn, conn.cursor() as cur:
-            cur.execute("SELECT song_feature FROM songs WHERE id = %s;", (song_id,))
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT vector_send(song_feature) FROM songs WHERE id = %s;",
+                (song_id,),
+            )
             row = cur.fetchone()
-            if row and row[0]:
-                features_string = row[0]
-                cleaned_string = features_string.strip("[]")
-                result = np.fromstring(cleaned_string, sep=",")
-                return result
+        if row and row[0]:
+            return decode_vector(bytes(row[0]))
         return None
 
+    def fetch_vectors(
+        self, after_id: int = 0, song_ids: Optional[List[int]] = None
+    ) -> Tuple[np.ndarray, np.ndarray, List[Dict]]:
+        """
+        Bulk-read songs with id > after_id (only `song_ids`, if given) for
+        in-memory indexing.
+
+        Returns:
+            (ids, vectors, metadata): int64 ids, a float32 (n, dim) matrix in the
+            same order, and the per-song metadata dicts (excluding vector).
+        """
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, title, artist_name, url, source_platform, added_by, added_at,
+                       vector_send(song_feature)
+                FROM songs
+                WHERE id > %(after_id)s
+                  AND (%(song_ids)s::integer[] IS NULL OR id = ANY(%(song_ids)s))
+                ORDER BY id;
+                """,
+                {
+                    "after_id": after_id,
+                    "song_ids": None if song_ids is None else list(song_ids),
+                },
+            )
+            rows = cur.fetchall()
+
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        vectors = decode_vectors([bytes(row[7]) for row in rows], self.dim)
+        metadata = [
+            {
+                "id": row[0],
+                "title": row[1],
+                "artist_name": row[2],
+                "url": row[3],
+                "source_platform": row[4],
+                "added_by": row[5],
+                "added_at": row[6],
+            }
+            for row in rows
+        ]
+        return ids, vectors, metadata
+
+    def vector_generation(self) -> int:
+        """
+        Counter bumped after every committed change to stored vectors (0 if
+        none happened yet). Inserts do not bump it: they only add ids.
+        """
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT pg_sequence_last_value(to_regclass('song_vector_generation'));"
+            )
+            (generation,) = cur.fetchone()
+        return int(generation or 0)
+
+    def _bump_vector_generation(self) -> None:
+        # After the commit: a reader seeing the new value also sees the vectors
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(VECTOR_GENERATION_DDL)
+            cur.execute("SELECT nextval('song_vector_generation');")
+
     def list_all_songs(self) -> List[Dict]:
         """List all songs with their metadata (excluding vector)."""
-        with self._connect() as conn, conn.cursor() as cur:
+        with self._connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
                 SELECT id, title, artist_name, url, source_platform, added_by, added_at
@@ -218,6 +752,72 @@ class PGVectorRepository(VectorRepository):
             for row in rows
         ]
 
+    @staticmethod
+    def song_list_query(
+        columns: Sequence[str],
+        after_id: int,
+        source_platform: Optional[str],
+        added_by: Optional[int],
+        limit: Optional[int] = None,
+    ) -> Tuple[str, List]:
+        """
+        Keyset listing SQL (WHERE id > after_id ORDER BY id walks the primary
+        key, so every page costs the same however deep it is). `columns` must
+        come from song_fields. Shared with the async repository.
+        """
+        conditions, params = ["id > %s"], [after_id]
+        if source_platform is not None:
+            conditions.append("source_platform = %s")
+            params.append(source_platform)
+        if added_by is not None:
+            conditions.append("added_by = %s")
+            params.append(added_by)
+        sql = f"SELECT {', '.join(columns)} FROM songs WHERE {' AND '.join(conditions)} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return sql + ";", params
+
+    def list_songs(
+        self,
+        after_id: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+    ) -> List[Dict]:
+        """One keyset page of songs (see VectorRepository.list_songs)."""
+        columns = song_fields(fields)
+        sql, params = self.song_list_query(
+            columns, after_id, source_platform, added_by, limit
+        )
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    def iter_songs(
+        self,
+        after_id: int = 0,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict]:
+        """
+        Stream matching songs through a server-side (named) cursor, fetching
+        `batch_size` rows per round-trip. Holds one connection until the
+        iterator is exhausted or closed.
+        """
+        columns = song_fields(fields)
+        sql, params = self.song_list_query(columns, after_id, source_platform, added_by)
+        with self._connection() as conn, conn.cursor(name="songs_stream") as cur:
+            cur.itersize = batch_size
+            cur.execute(sql, params)
+            for row in cur:
+                yield dict(zip(columns, row))
+
     def store_feedback(
         self, user_id: int, query_song_id: int, suggested_song_id: int, vote: int
     ) -> None:
@@ -225,7 +825,7 @@ class PGVectorRepository(VectorRepository):
         Store a user's vote for a song match.
         Uses ON CONFLICT to update the vote if it already exists (upsert).
         """
-        with self._connect() as conn, conn.cursor() as cur:
+        with self._connection() as conn, conn.cursor() as cur:
             try:
                 cur.execute(
                     """
@@ -249,22 +849,538 @@ class PGVectorRepository(VectorRepository):
         self, query_song_id: int, suggested_song_ids: List[int]
     ) -> Dict[int, int]:
         """
-        Get the aggregate (sum) vote score for a list of suggested songs
-        in the context of a specific query song.
+        Get the net vote score for a list of suggested songs in the context
+        of a specific query song, read from the song_feedback_scores
+        aggregate (one row per pair however many users voted).
         """
         if not suggested_song_ids:
             return {}
 
-        with self._connect() as conn, conn.cursor() as cur:
+        with self._connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
-                SELECT suggested_song_id, SUM(vote) as total_score
-                FROM SONG_FEEDBACK
-                WHERE query_song_id = %s AND suggested_song_id = ANY(%s)
-                GROUP BY suggested_song_id;
+                SELECT suggested_song_id, net_score
+                FROM SONG_FEEDBACK_SCORES
+                WHERE query_song_id = %s AND suggested_song_id = ANY(%s);
                 """,
                 (query_song_id, suggested_song_ids),
             )
             rows = cur.fetchall()
 
         return {row[0]: int(row[1]) for row in rows}
+
+    def get_feedback_scores_batch(
+        self, pairs: List[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], int]:
+        """Aggregate vote scores of many (query, suggested) pairs in one query."""
+        if not pairs:
+            return {}
+
+        query_ids, suggested_ids = zip(*pairs)
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT query_song_id, suggested_song_id, net_score
+                FROM SONG_FEEDBACK_SCORES
+                WHERE (query_song_id, suggested_song_id) IN (
+                    SELECT * FROM unnest(%s::int[], %s::int[])
+                );
+                """,
+                (list(query_ids), list(suggested_ids)),
+            )
+            rows = cur.fetchall()
+
+        return {(row[0], row[1]): int(row[2]) for row in rows}
+
+    # ============================================
+    # Precomputed neighbour lists
+    # ============================================
+
+    @staticmethod
+    def neighbor_update_query() -> str:
+        """
+        Fold one newly inserted song (%(song_id)s) into song_neighbors: give
+        it its own list and merge it into only the lists it now belongs to
+        (closer than their k-th entry, or not yet full). The new list is
+        exact (a sequential scan, like the affected-list check), so it
+        matches build_neighbors. A no-op while the table is empty. Shared
+        with the async repository.
+        """
+        return """
+            WITH new_song AS (
+                SELECT id, song_feature FROM songs WHERE id = %(song_id)s
+            ),
+            settings AS (
+                SELECT k FROM song_neighbors LIMIT 1
+            ),
+            own_list AS (
+                INSERT INTO song_neighbors (song_id, k, neighbor_ids, distances)
+                SELECT n.id, s.k,
+                       array_agg(c.id ORDER BY c.distance, c.id),
+                       array_agg(c.distance ORDER BY c.distance, c.id)
+                FROM new_song n
+                CROSS JOIN settings s
+                CROSS JOIN LATERAL (
+                    SELECT t.id, (t.song_feature <=> n.song_feature)::real AS distance
+                    FROM songs t
+                    -- Not the bare operator: an HNSW scan would stop after
+                    -- hnsw.ef_search rows and could return fewer than k
+                    ORDER BY distance, t.id
+                    LIMIT s.k
+                ) c
+                GROUP BY n.id, s.k
+                ON CONFLICT (song_id) DO NOTHING
+            ),
+            affected AS (
+                SELECT l.song_id, (t.song_feature <=> n.song_feature)::real AS distance
+                FROM song_neighbors l
+                JOIN songs t ON t.id = l.song_id
+                CROSS JOIN new_song n
+                WHERE l.song_id <> n.id
+                  AND NOT n.id = ANY(l.neighbor_ids)
+                  AND (cardinality(l.neighbor_ids) < l.k
+                       OR (t.song_feature <=> n.song_feature)::real < l.distances[l.k])
+            )
+            UPDATE song_neighbors l
+            SET (neighbor_ids, distances) = (
+                    SELECT array_agg(m.id ORDER BY m.distance, m.id),
+                           array_agg(m.distance ORDER BY m.distance, m.id)
+                    FROM (
+                        SELECT u.id, u.distance
+                        FROM unnest(l.neighbor_ids, l.distances) AS u(id, distance)
+                        UNION ALL
+                        SELECT %(song_id)s, a.distance
+                        ORDER BY distance, id
+                        LIMIT l.k
+                    ) m
+                ),
+                updated_at = NOW()
+            FROM affected a
+            WHERE l.song_id = a.song_id;
+        """
+
+    @staticmethod
+    def neighbor_list_query() -> str:
+        """
+        A song's precomputed list joined with metadata and feedback sums, cut
+        to %(limit)s. No rows if the song has no list or its k is too small.
+        Shared with the async repository.
+        """
+        return """
+            SELECT t.id, t.title, t.artist_name, t.url, t.source_platform,
+                   u.distance, COALESCE(f.net_score, 0) AS feedback_score
+            FROM song_neighbors l
+            CROSS JOIN LATERAL unnest(l.neighbor_ids, l.distances)
+                WITH ORDINALITY AS u(id, distance, position)
+            JOIN songs t ON t.id = u.id
+            LEFT JOIN SONG_FEEDBACK_SCORES f
+                ON f.query_song_id = l.song_id AND f.suggested_song_id = t.id
+            WHERE l.song_id = %(song_id)s
+              AND l.k >= %(limit)s
+              AND u.position <= %(limit)s
+            ORDER BY u.position;
+        """
+
+    @staticmethod
+    def _update_neighbors(cur, song_ids: List[int]):
+        """Maintain song_neighbors for songs just inserted on this cursor."""
+        for song_id in song_ids:
+            cur.execute(
+                PGVectorRepository.neighbor_update_query(), {"song_id": song_id}
+            )
+
+    def find_similars_from_neighbors(
+        self, song_id: int, limit: int = 10
+    ) -> Optional[List[Dict]]:
+        """
+        Cosine neighbours with feedback sums read from the song's precomputed
+        list (one primary-key read, no vector search). Returns None when the
+        song has no list or the lists are shorter than `limit`.
+        """
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                self.neighbor_list_query(), {"song_id": song_id, "limit": limit}
+            )
+            rows = cur.fetchall()
+
+        if not rows:
+            return None
+
+        return [
+            {
+                "id": row[0],
+                "title": row[1],
+                "artist_name": row[2],
+                "url": row[3],
+                "source_platform": row[4],
+                "distance": float(row[5]),
+                "feedback_score": int(row[6]),
+            }
+            for row in rows
+        ]
+
+    def build_neighbors(self, k: int = 50, block_size: Optional[int] = None) -> Dict:
+        """
+        Recompute every song's top-k cosine neighbours (exact, brute force)
+        and replace song_neighbors in one transaction, so readers keep the
+        old lists until it commits.
+
+        Distances are computed in blocks of `block_size` query rows at a time
+        (default: NEIGHBOR_BLOCK_ELEMENTS / catalogue size), each one matmul
+        against the whole normalised catalogue.
+        Returns {"songs": n, "k": k}.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+
+        ids, vectors, _ = self.fetch_vectors()
+        unit, norms = normalize_rows(vectors)
+        block_size = block_size or max(1, NEIGHBOR_BLOCK_ELEMENTS // max(len(ids), 1))
+
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM song_neighbors;")
+            for start in range(0, len(ids), block_size):
+                block = distances(unit, norms, unit[start : start + block_size])
+                nearest = smallest_k(block, k)
+                nearest_distances = np.maximum(
+                    np.take_along_axis(block, nearest, axis=1), 0.0
+                )
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO song_neighbors (song_id, k, neighbor_ids, distances)
+                    VALUES %s;
+                    """,
+                    [
+                        (int(song_id), k, ids[row].tolist(), row_distances.tolist())
+                        for song_id, row, row_distances in zip(
+                            ids[start : start + block_size], nearest, nearest_distances
+                        )
+                    ],
+                    template="(%s, %s, %s::integer[], %s::real[])",
+                    page_size=1000,
+                )
+
+        print(f"🧭 Built neighbour lists for {len(ids)} songs (k={k})")
+        return {"songs": len(ids), "k": k}
+
+    # ============================================
+    # Bulk feature export / import (binary COPY)
+    # ============================================
+
+    def export_vectors(self, path: str, index: bool = False) -> int:
+        """
+        Write every (id, song_feature) to a snapshot file (see
+        vector_snapshot), streamed with COPY ... TO STDOUT (FORMAT binary)
+        from one consistent database snapshot. index=True writes the
+        normalised index snapshot served by MappedIndexRepository.
+        Returns the row count.
+        """
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;")
+            cur.execute("SELECT count(*) FROM songs;")
+            (count,) = cur.fetchone()
+            with SnapshotWriter(path, count, self.dim, index=index) as writer:
+                sink = CopyRowDecoder(self.dim, writer.append)
+                cur.copy_expert(
+                    "COPY (SELECT id, song_feature FROM songs ORDER BY id) TO STDOUT (FORMAT binary)",
+                    sink,
+                )
+                sink.close()
+
+        kind = "index snapshot" if index else "feature snapshot"
+        print(f"📦 Exported {count} song vectors to {kind} {path}")
+        return count
+
+    def import_vectors(self, path: str) -> Dict:
+        """
+        Replace song_feature of the songs listed in a snapshot file, loaded
+        with COPY ... FROM STDIN (FORMAT binary). Ids without a song are
+        skipped. Neighbour lists are cleared when vectors change, as they
+        no longer match (run build_neighbors again), and the vector
+        generation is bumped once the change is committed.
+        """
+        ids, vectors = read_snapshot(path, self.dim)
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"""
+                CREATE TEMP TABLE song_feature_import (
+                    id integer NOT NULL,
+                    song_feature vector({int(self.dim)}) NOT NULL
+                ) ON COMMIT DROP;
+                """
+            )
+            cur.copy_expert(
+                "COPY song_feature_import (id, song_feature) FROM STDIN (FORMAT binary)",
+                CopyRowReader(ids, vectors),
+            )
+            cur.execute(
+                """
+                UPDATE songs s SET song_feature = i.song_feature
+                FROM song_feature_import i
+                WHERE s.id = i.id;
+                """
+            )
+            updated = cur.rowcount
+            if updated:
+                cur.execute("DELETE FROM song_neighbors;")
+
+        if updated:
+            self._bump_vector_generation()
+        print(f"📥 Imported {updated} of {len(ids)} song vectors from {path}")
+        return {"rows": len(ids), "updated": updated, "skipped": len(ids) - updated}
+
+    # ============================================
+    # Schema / ANN index management
+    # ============================================
+
+    @staticmethod
+    def vector_index_name(metric: str, method: str = "hnsw") -> str:
+        return f"idx_songs_feature_{method}_{metric}"
+
+    def migrate_vector_column(self) -> bool:
+        """
+        Type songs.song_feature as vector(dim) so it can be ANN-indexed.
+        Returns True if the column was altered, False if already typed.
+        """
+        target = f"vector({int(self.dim)})"
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT format_type(atttypid, atttypmod)
+                FROM pg_attribute
+                WHERE attrelid = 'songs'::regclass AND attname = 'song_feature';
+                """
+            )
+            (current,) = cur.fetchone()
+            if current == target:
+                return False
+
+            cur.execute(f"ALTER TABLE songs ALTER COLUMN song_feature TYPE {target};")
+
+        print(f"🛠️  Migrated songs.song_feature from {current} to {target}")
+        return True
+
+    def migrate_source_key_column(self) -> bool:
+        """
+        Add songs.source_key and its unique index (databases created before
+        it). Returns True if the column was added.
+        """
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'songs' AND column_name = 'source_key';
+                """
+            )
+            added = cur.fetchone() is None
+            if added:
+                cur.execute("ALTER TABLE songs ADD COLUMN source_key text;")
+
+        with self._autocommit_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_songs_source_key ON songs (source_key);"
+            )
+
+        if added:
+            print("🛠️  Added songs.source_key")
+        return added
+
+    def migrate_neighbors_table(self) -> bool:
+        """
+        Create song_neighbors (databases created before it). Returns True if
+        the table was created; it stays empty until build_neighbors runs.
+        """
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('song_neighbors') IS NULL;")
+            (missing,) = cur.fetchone()
+            if missing:
+                cur.execute(
+                    """
+                    CREATE TABLE song_neighbors (
+                        song_id integer PRIMARY KEY REFERENCES songs (id) ON DELETE CASCADE,
+                        k integer NOT NULL,
+                        neighbor_ids integer[] NOT NULL,
+                        distances real[] NOT NULL,
+                        updated_at timestamp with time zone DEFAULT NOW()
+                    );
+                    """
+                )
+
+        if missing:
+            print("🛠️  Created song_neighbors")
+        return missing
+
+    def migrate_feedback_scores_table(self) -> bool:
+        """
+        Create song_feedback_scores and its maintenance trigger (databases
+        created before them), then fill it from the existing votes.
+        Returns True if the table was created.
+        """
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('song_feedback_scores') IS NULL;")
+            (missing,) = cur.fetchone()
+            cur.execute(FEEDBACK_SCORES_DDL)
+
+        if missing:
+            print("🛠️  Created song_feedback_scores")
+            self.rebuild_feedback_scores()
+        return missing
+
+    def rebuild_feedback_scores(self) -> int:
+        """
+        Recompute song_feedback_scores from the raw votes (e.g. after a bulk
+        load with the trigger disabled). Votes are blocked while it runs, so
+        none is counted twice or lost. Returns the number of pairs.
+        """
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute("LOCK TABLE song_feedback IN SHARE MODE;")
+            cur.execute("DELETE FROM song_feedback_scores;")
+            cur.execute(
+                """
+                INSERT INTO song_feedback_scores (query_song_id, suggested_song_id, net_score, upvotes, downvotes)
+                SELECT query_song_id, suggested_song_id, SUM(vote),
+                       COUNT(*) FILTER (WHERE vote = 1),
+                       COUNT(*) FILTER (WHERE vote = -1)
+                FROM song_feedback
+                GROUP BY query_song_id, suggested_song_id;
+                """
+            )
+            pairs = cur.rowcount
+
+        print(f"🗳️  Rebuilt feedback scores for {pairs} recommendation pairs")
+        return pairs
+
+    def backfill_source_keys(self, batch_size: int = 1000) -> Dict:
+        """
+        Compute source_key for rows without one, in id order.
+        A row whose media already has a (lower id) song keeps NULL and is
+        reported as a duplicate; it still matches by exact URL.
+        Returns {"updated": n, "duplicates": [{"id", "url", "duplicate_of"}]}.
+        """
+        updated, duplicates, last_id = 0, [], 0
+        while True:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT id, url FROM songs
+                    WHERE source_key IS NULL AND id > %s
+                    ORDER BY id
+                    LIMIT %s;
+                    """,
+                    (last_id, batch_size),
+                )
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                # Lowest id wins, within the batch and against stored keys
+                owners: Dict[str, int] = {}
+                for song_id, url in rows:
+                    owners.setdefault(canonical_source_key(url), song_id)
+                cur.execute(
+                    "SELECT source_key, id FROM songs WHERE source_key = ANY(%s);",
+                    (list(owners),),
+                )
+                owners.update(dict(cur.fetchall()))
+
+                assign = []
+                for song_id, url in rows:
+                    key = canonical_source_key(url)
+                    if owners[key] == song_id:
+                        assign.append((song_id, key))
+                    else:
+                        duplicates.append(
+                            {"id": song_id, "url": url, "duplicate_of": owners[key]}
+                        )
+                if assign:
+                    execute_values(
+                        cur,
+                        """
+                        UPDATE songs SET source_key = v.key
+                        FROM (VALUES %s) AS v(id, key)
+                        WHERE songs.id = v.id;
+                        """,
+                        assign,
+                    )
+                updated += len(assign)
+
+        print(f"🔑 Backfilled {updated} source keys ({len(duplicates)} duplicates)")
+        return {"updated": updated, "duplicates": duplicates}
+
+    def ensure_vector_index(
+        self,
+        metric: str = "cosine",
+        method: str = "hnsw",
+        m: int = 16,
+        ef_construction: int = 64,
+        lists: Optional[int] = None,
+        concurrently: bool = False,
+    ) -> str:
+        """
+        Create the ANN index serving `metric` if it does not exist yet.
+
+        method: "hnsw" (m / ef_construction) or "ivfflat" (lists, defaults to
+            rows / 1000 as recommended by pgvector; build it after loading data)
+        Returns the index name.
+        """
+        if metric not in self.INDEX_OPCLASSES:
+            raise ValueError(f"Unsupported metric: {metric}")
+        if method not in self.INDEX_METHODS:
+            raise ValueError(f"Unsupported index method: {method}")
+
+        name = self.vector_index_name(metric, method)
+        opclass = self.INDEX_OPCLASSES[metric]
+
+        with self._autocommit_connection() as conn, conn.cursor() as cur:
+            if method == "hnsw":
+                options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+            else:
+                if lists is None:
+                    cur.execute("SELECT COUNT(*) FROM songs;")
+                    lists = max(1, cur.fetchone()[0] // 1000)
+                options = f"lists = {int(lists)}"
+
+            cur.execute(
+                f"""
+                CREATE INDEX {"CONCURRENTLY " if concurrently else ""}IF NOT EXISTS {name}
+                ON songs USING {method} (song_feature {opclass})
+                WITH ({options});
+                """
+            )
+
+        print(f"📇 Ensured vector index {name}")
+        return name
+
+    def drop_vector_index(self, metric: str = "cosine", method: str = "hnsw") -> None:
+        """Drop the ANN index for `metric` / `method` if present."""
+        name = self.vector_index_name(metric, method)
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(f"DROP INDEX IF EXISTS {name};")
+
+    def list_vector_indexes(self) -> List[Dict]:
+        """List the indexes defined on songs.song_feature."""
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT indexname, indexdef
+                FROM pg_indexes
+                WHERE tablename = 'songs' AND indexdef LIKE '%%song_feature%%'
+                ORDER BY indexname;
+                """
+            )
+            rows = cur.fetchall()
+
+        return [{"name": row[0], "definition": row[1]} for row in rows]
+
+    def reindex_vectors(self, concurrently: bool = True) -> List[str]:
+        """Rebuild every vector index (e.g. after bulk loads). Returns their names."""
+        names = [index["name"] for index in self.list_vector_indexes()]
+        with self._autocommit_connection() as conn, conn.cursor() as cur:
+            for name in names:
+                cur.execute(
+                    f"REINDEX INDEX {'CONCURRENTLY ' if concurrently else ''}{name};"
+                )
+                print(f"🔁 Rebuilt vector index {name}")
+        return names
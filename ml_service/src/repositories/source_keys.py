@@ -0,0 +1,79 @@
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+YOUTUBE_HOSTS = {
+    "youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "youtube-nocookie.com",
+}
+# Path prefixes followed by the video id: /shorts/<id>, /embed/<id>, ...
+YOUTUBE_ID_PATHS = {"shorts", "embed", "live", "v", "e"}
+YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+SPOTIFY_KINDS = {"track", "episode"}
+NUMERIC_ID = re.compile(r"^\d+$")
+# Query parameters that never identify content (dropped from generic URLs)
+TRACKING_PARAMS = {"si", "feature", "fbclid", "gclid", "ref"}
+
+
+def canonical_source_key(url: str) -> str:
+    """
+    Identity of the media behind a URL, computed without any network I/O.
+
+    Known platforms map to "<platform>:<media id>", so every URL form of the
+    same track shares one key:
+
+        https://youtu.be/X, youtube.com/watch?v=X&t=30,
+        music.youtube.com/watch?v=X      -> youtube:X
+        open.spotify.com/intl-de/track/Y -> spotify:track:Y
+        music.apple.com/us/album/a/1?i=Z -> apple_music:Z
+
+    Anything else falls back to "url:<host><path>?<query>" with the host
+    lowercased, "www." and tracking parameters dropped and the query sorted.
+    """
+    url = url.strip()
+    if url.startswith("spotify:"):
+        parts = url.split(":")
+        if len(parts) == 3 and parts[1] in SPOTIFY_KINDS:
+            return f"spotify:{parts[1]}:{parts[2]}"
+
+    parsed = urlsplit(url if "://" in url else f"https://{url}")
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    parts = [part for part in parsed.path.split("/") if part]
+    query = dict(parse_qsl(parsed.query))
+
+    # YouTube
+    video_id = None
+    if host == "youtu.be" and parts:
+        video_id = parts[0]
+    elif host in YOUTUBE_HOSTS:
+        if parts[:1] == ["watch"]:
+            video_id = query.get("v")
+        elif len(parts) >= 2 and parts[0] in YOUTUBE_ID_PATHS:
+            video_id = parts[1]
+    if video_id and YOUTUBE_ID.match(video_id):
+        return f"youtube:{video_id}"
+
+    # Spotify: /track/<id>, optionally behind a locale segment (/intl-de/)
+    if host == "open.spotify.com":
+        if parts and parts[0].startswith("intl-"):
+            parts = parts[1:]
+        if len(parts) >= 2 and parts[0] in SPOTIFY_KINDS:
+            return f"spotify:{parts[0]}:{parts[1]}"
+
+    # Apple Music: album links select the track with ?i=, song links end in its id
+    if host == "music.apple.com":
+        if NUMERIC_ID.match(query.get("i", "")):
+            return f"apple_music:{query['i']}"
+        if "song" in parts and NUMERIC_ID.match(parts[-1]):
+            return f"apple_music:{parts[-1]}"
+
+    kept = sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith("utm_")
+    )
+    path = parsed.path.rstrip("/")
+    return f"url:{host}{path}" + (f"?{urlencode(kept)}" if kept else "")
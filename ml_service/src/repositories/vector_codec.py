@@ -0,0 +1,198 @@
+import struct
+from typing import Callable, Sequence
+
+import numpy as np
+from psycopg.adapt import Dumper, Loader
+from psycopg.pq import Format
+from psycopg.types import TypeInfo
+
+# pgvector's binary representation (vector_send / vector_recv):
+#   uint16 dim, uint16 unused, dim x float32, all big-endian
+VECTOR_HEADER = struct.Struct(">HH")
+VECTOR_ELEMENT = np.dtype(">f4")
+
+
+def encode_vector(vector: np.ndarray) -> bytes:
+    """Binary pgvector value of a 1-D array."""
+    vector = np.asarray(vector).reshape(-1)
+    return (
+        VECTOR_HEADER.pack(vector.shape[0], 0) + vector.astype(VECTOR_ELEMENT).tobytes()
+    )
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    """float32 array from a binary pgvector value."""
+    dim, _ = VECTOR_HEADER.unpack_from(data)
+    return np.frombuffer(
+        data, dtype=VECTOR_ELEMENT, count=dim, offset=VECTOR_HEADER.size
+    ).astype(np.float32)
+
+
+def decode_vectors(values: Sequence[bytes], dim: int) -> np.ndarray:
+    """
+    (n, dim) float32 matrix from n binary pgvector values of one dimension,
+    decoded with a single frombuffer over their concatenation.
+    """
+    if not values:
+        return np.empty((0, dim), dtype=np.float32)
+    row = np.dtype([("header", ">u2", 2), ("values", VECTOR_ELEMENT, dim)])
+    rows = np.frombuffer(b"".join(values), dtype=row)
+    if np.any(rows["header"][:, 0] != dim):
+        raise ValueError(f"Stored vectors must have dimension {dim}")
+    return rows["values"].astype(np.float32)
+
+
+# ============================================
+# COPY ... (FORMAT binary) of (id integer, song_feature vector) rows
+# ============================================
+
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+COPY_HEADER = COPY_SIGNATURE + struct.pack(">ii", 0, 0)  # flags, extension size
+COPY_TRAILER = struct.pack(">h", -1)
+
+
+def copy_row_dtype(dim: int) -> np.dtype:
+    """One binary COPY tuple: field count, then size + value of id and vector."""
+    return np.dtype(
+        [
+            ("fields", ">i2"),
+            ("id_size", ">i4"),
+            ("id", ">i4"),
+            ("vector_size", ">i4"),
+            ("header", ">u2", 2),
+            ("vector", VECTOR_ELEMENT, dim),
+        ]
+    )
+
+
+def encode_copy_rows(ids: np.ndarray, vectors: np.ndarray) -> bytes:
+    """Binary COPY tuples (no file header/trailer) for ids and (n, dim) vectors."""
+    vectors = np.asarray(vectors)
+    dim = vectors.shape[1]
+    rows = np.empty(len(ids), dtype=copy_row_dtype(dim))
+    rows["fields"] = 2
+    rows["id_size"] = 4
+    rows["id"] = ids
+    rows["vector_size"] = VECTOR_HEADER.size + 4 * dim
+    rows["header"] = (dim, 0)
+    rows["vector"] = vectors
+    return rows.tobytes()
+
+
+class CopyRowReader:
+    """
+    File-like source for copy_expert("COPY ... FROM STDIN (FORMAT binary)"),
+    encoding `rows_per_chunk` rows at a time.
+    """
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, rows_per_chunk=8192):
+        self._chunks = self._encode(ids, vectors, rows_per_chunk)
+        self._buffer = bytearray()
+
+    @staticmethod
+    def _encode(ids, vectors, rows_per_chunk):
+        yield COPY_HEADER
+        for start in range(0, len(ids), rows_per_chunk):
+            end = start + rows_per_chunk
+            yield encode_copy_rows(ids[start:end], vectors[start:end])
+        yield COPY_TRAILER
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        size = len(self._buffer) if size < 0 else size
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        return self.read(size)
+
+
+class CopyRowDecoder:
+    """
+    File-like sink for copy_expert("COPY ... TO STDOUT (FORMAT binary)").
+    Postgres sends one message per row, so writes are only buffered; whole
+    rows are decoded in bulk and passed to `on_rows(ids, vectors)`.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        on_rows: Callable[[np.ndarray, np.ndarray], None],
+        buffer_bytes: int = 1 << 20,
+    ):
+        self.dim = dim
+        self.on_rows = on_rows
+        self.buffer_bytes = buffer_bytes
+        self.rows = 0
+        self._row = copy_row_dtype(dim)
+        self._buffer = bytearray()
+        self._header_read = False
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        if len(self._buffer) >= self.buffer_bytes:
+            self._decode()
+        return len(data)
+
+    def close(self) -> None:
+        """Decode what is left and check the stream ended with the trailer."""
+        self._decode()
+        if not self._header_read or bytes(self._buffer) != COPY_TRAILER:
+            raise ValueError("Incomplete binary COPY stream")
+
+    def _decode(self) -> None:
+        if not self._header_read:
+            if len(self._buffer) < len(COPY_HEADER):
+                return
+            if not self._buffer.startswith(COPY_SIGNATURE):
+                raise ValueError("Not a binary COPY stream")
+            (extension,) = struct.unpack_from(">i", self._buffer, 15)
+            del self._buffer[: len(COPY_HEADER) + extension]
+            self._header_read = True
+
+        count = len(self._buffer) // self._row.itemsize
+        if count == 0:
+            return
+        size = count * self._row.itemsize
+        rows = np.frombuffer(bytes(self._buffer[:size]), dtype=self._row)
+        if np.any(rows["fields"] != 2) or np.any(rows["header"][:, 0] != self.dim):
+            raise ValueError(f"Expected (id, vector({self.dim})) rows")
+        del self._buffer[:size]
+        self.rows += count
+        self.on_rows(rows["id"].astype(np.int64), rows["vector"].astype(np.float32))
+
+
+# ============================================
+# psycopg 3 adapters
+# ============================================
+
+
+class VectorBinaryDumper(Dumper):
+    """Send NumPy arrays as binary pgvector parameters (use %b placeholders)."""
+
+    format = Format.BINARY
+
+    def dump(self, obj) -> bytes:
+        return encode_vector(obj)
+
+
+class VectorBinaryLoader(Loader):
+    """Load binary vector columns straight into float32 arrays."""
+
+    format = Format.BINARY
+
+    def load(self, data) -> np.ndarray:
+        return decode_vector(bytes(data))
+
+
+def register_vector_types(context, info: TypeInfo) -> None:
+    """Register the binary vector dumper/loader on a psycopg connection or cursor."""
+    info.register(context)
+    context.adapters.register_loader(info.oid, VectorBinaryLoader)
+    dumper = type("VectorDumper", (VectorBinaryDumper,), {"oid": info.oid})
+    context.adapters.register_dumper(np.ndarray, dumper)
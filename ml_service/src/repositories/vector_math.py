@@ -0,0 +1,188 @@
+import threading
+import numpy as np
+from typing import Optional, Tuple
+
+# Distances follow pgvector's operators so in-memory and SQL results agree:
+#   cosine        <=>  1 - cos(a, b)
+#   l2            <->  ||a - b||
+#   inner_product <#>  -(a . b)
+SUPPORTED_METRICS = ("cosine", "l2", "inner_product")
+
+
+def normalize_rows(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Split vectors into float32 unit rows and their norms."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+    safe = np.where(norms == 0, 1.0, norms).astype(np.float32)
+    return vectors / safe[:, None], norms
+
+
+def distances(
+    unit: np.ndarray,
+    norms: np.ndarray,
+    queries: np.ndarray,
+    metric: str = "cosine",
+) -> np.ndarray:
+    """
+    Distances between stored rows and one query (1-D -> shape (n,)) or
+    many queries (2-D -> shape (q, n)), computed with a single matmul.
+    """
+    single = np.asarray(queries).ndim == 1
+    q_unit, q_norms = normalize_rows(queries)
+
+    cos = q_unit @ unit.T  # (q, n)
+
+    if metric == "cosine":
+        result = 1.0 - cos
+    elif metric == "inner_product":
+        result = -(cos * q_norms[:, None] * norms[None, :])
+    elif metric == "l2":
+        dots = cos * q_norms[:, None] * norms[None, :]
+        squared = q_norms[:, None] ** 2 + norms[None, :] ** 2 - 2.0 * dots
+        result = np.sqrt(np.maximum(squared, 0.0))
+    else:
+        raise ValueError(f"Unsupported metric: {metric}")
+
+    return result[0] if single else result
+
+
+def smallest_k(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k smallest values along the last axis, sorted ascending.
+    Uses argpartition so only the selected k values are fully sorted.
+    """
+    n = values.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(values.shape[:-1] + (0,), dtype=np.int64)
+
+    if k < n:
+        part = np.argpartition(values, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), values.shape).copy()
+
+    order = np.argsort(
+        np.take_along_axis(values, part, axis=-1), axis=-1, kind="stable"
+    )
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class VectorMatrix:
+    """
+    Append-only, id-aligned matrix of unit vectors with capacity doubling.
+
+    Appends write past the current row count before publishing it, so a
+    reader holding a `view()` keeps a consistent snapshot without locking.
+
+    An optional read-only base segment (e.g. memory-mapped from an index
+    snapshot) is served in place as rows 0..len(base)-1; appended rows
+    follow it. Search such a matrix with distances() / ids_at(), which
+    never copy the base.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        capacity: int = 1024,
+        base: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+    ):
+        """
+        base: (ids, unit rows, norms) of the read-only base segment
+        """
+        self.dim = dim
+        if base is None:
+            base = (
+                np.empty(0, dtype=np.int64),
+                np.empty((0, dim), dtype=np.float32),
+                np.empty(0, dtype=np.float32),
+            )
+        self._base = base
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._unit = np.empty((capacity, dim), dtype=np.float32)
+        self._norms = np.empty(capacity, dtype=np.float32)
+        self._size = 0
+        self._write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.base_size + self._size
+
+    @property
+    def base_size(self) -> int:
+        return self._base[0].shape[0]
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (ids, unit rows, norms) of the currently published rows (a copy
+        when there is a base segment).
+        """
+        appended = self._appended()
+        if not self.base_size:
+            return appended
+        return tuple(
+            np.concatenate([base, rows]) for base, rows in zip(self._base, appended)
+        )
+
+    def distances(self, queries: np.ndarray, metric: str = "cosine") -> np.ndarray:
+        """distances() from the query (or queries) to every published row."""
+        _, unit, norms = self._appended()
+        result = distances(unit, norms, queries, metric)
+        if not self.base_size:
+            return result
+        _, base_unit, base_norms = self._base
+        base = distances(base_unit, base_norms, queries, metric)
+        return np.concatenate([base, result], axis=-1)
+
+    def ids_at(self, rows: np.ndarray) -> np.ndarray:
+        """Song ids of the given rows."""
+        rows = np.asarray(rows)
+        base_ids, base_size = self._base[0], self.base_size
+        if not base_size:
+            return self._ids[rows]
+        in_base = rows < base_size
+        ids = np.empty(rows.shape, dtype=np.int64)
+        ids[in_base] = base_ids[rows[in_base]]
+        ids[~in_base] = self._ids[rows[~in_base] - base_size]
+        return ids
+
+    def _appended(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Read the size first: any buffer seen afterwards holds at least that many rows
+        size = self._size
+        ids, unit, norms = self._ids, self._unit, self._norms
+        return ids[:size], unit[:size], norms[:size]
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Append rows (vectors are normalised on the way in)."""
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if ids.size == 0:
+            return
+        unit, norms = normalize_rows(vectors)
+        if unit.shape != (ids.size, self.dim):
+            raise ValueError(f"Vectors must have shape (n, {self.dim})")
+
+        with self._write_lock:
+            start, end = self._size, self._size + ids.size
+            if end > self._ids.shape[0]:
+                self._grow(end)
+            self._ids[start:end] = ids
+            self._unit[start:end] = unit
+            self._norms[start:end] = norms
+            self._size = end  # Publish only once the rows are written
+
+    def vector(self, row: int) -> np.ndarray:
+        """Reconstruct the original (un-normalised) vector of a row."""
+        if row < self.base_size:
+            _, unit, norms = self._base
+            return unit[row].astype(np.float64) * float(norms[row])
+        row -= self.base_size
+        return self._unit[row].astype(np.float64) * float(self._norms[row])
+
+    def _grow(self, needed: int) -> None:
+        capacity = max(needed, 2 * self._ids.shape[0], 1)
+        ids = np.empty(capacity, dtype=np.int64)
+        unit = np.empty((capacity, self.dim), dtype=np.float32)
+        norms = np.empty(capacity, dtype=np.float32)
+        ids[: self._size] = self._ids[: self._size]
+        unit[: self._size] = self._unit[: self._size]
+        norms[: self._size] = self._norms[: self._size]
+        # Readers holding the old buffers keep a valid snapshot
+        self._ids, self._unit, self._norms = ids, unit, norms
@@ -1,6 +1,34 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Iterator, Optional, Sequence, Tuple
+
+# Song fields the listing operations can return (SongResult), in output order
+LIST_FIELDS = (
+    "id",
+    "title",
+    "artist_name",
+    "url",
+    "source_platform",
+    "added_by",
+    "added_at",
+)
+
+
+def song_fields(fields: Optional[Sequence[str]] = None) -> Tuple[str, ...]:
+    """
+    Validated projection for list_songs / iter_songs: the requested fields
+    in LIST_FIELDS order, always including "id" (the keyset cursor).
+    """
+    if not fields:
+        return LIST_FIELDS
+    unknown = set(fields) - set(LIST_FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Unknown song fields: {', '.join(sorted(unknown))}. "
+            f"Available: {', '.join(LIST_FIELDS)}"
+        )
+    return tuple(f for f in LIST_FIELDS if f == "id" or f in fields)
 
 
 class VectorRepository(ABC):
@@ -9,11 +37,20 @@ class VectorRepository(ABC):
     Any implementation must provide these methods.
     """
 
+    # True when similarity searches run in this process (in-memory indexes);
+    # the service then keeps them off the async database repository
+    in_process_search = False
+
     @abstractmethod
     def get_song_by_url(self, url: str) -> Optional[Dict]:
         """Get a song's metadata by its unique URL."""
         pass
 
+    @abstractmethod
+    def get_song_by_id(self, song_id: int) -> Optional[Dict]:
+        """Get a song's metadata by its id (None if it does not exist)."""
+        pass
+
     @abstractmethod
     def store_features(
         self,
@@ -69,3 +106,193 @@ class VectorRepository(ABC):
     ) -> Dict[int, int]:
         """Get the aggregate vote score for a list of suggested songs."""
         pass
+
+    def get_songs_by_urls(self, urls: List[str]) -> Dict[str, Dict]:
+        """
+        Bulk existence lookup: metadata of the songs whose URL is in `urls`,
+        keyed by URL. Backends should override this with a single query.
+        """
+        found = {}
+        for url in urls:
+            song = self.get_song_by_url(url)
+            if song:
+                found[url] = song
+        return found
+
+    def get_songs_by_ids(self, song_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Metadata of the existing songs among `song_ids`, keyed by id.
+        Backends should override this with a single query.
+        """
+        found = {}
+        for song_id in song_ids:
+            song = self.get_song_by_id(song_id)
+            if song:
+                found[song_id] = song
+        return found
+
+    def list_songs(
+        self,
+        after_id: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        One keyset page: up to `limit` songs with id > after_id, in id order,
+        matching the filters and projected to `fields` (see song_fields).
+        The default filters list_all_songs; backends should override it.
+        """
+        columns = song_fields(fields)
+        page = []
+        for song in sorted(self.list_all_songs(), key=lambda song: song["id"]):
+            if len(page) == limit:
+                break
+            if (
+                song["id"] > after_id
+                and source_platform in (None, song["source_platform"])
+                and added_by in (None, song["added_by"])
+            ):
+                page.append({column: song[column] for column in columns})
+        return page
+
+    def iter_songs(
+        self,
+        after_id: int = 0,
+        fields: Optional[Sequence[str]] = None,
+        source_platform: Optional[str] = None,
+        added_by: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict]:
+        """
+        Every matching song after `after_id`, in id order, without holding
+        the catalogue in memory. The default walks list_songs pages.
+        """
+        while True:
+            page = self.list_songs(
+                after_id, batch_size, fields, source_platform, added_by
+            )
+            yield from page
+            if len(page) < batch_size:
+                return
+            after_id = page[-1]["id"]
+
+    def store_features_batch(self, songs: List[Dict]) -> List[Tuple[Dict, bool]]:
+        """
+        Store many songs at once. Each dict holds the store_features keyword
+        arguments. Returns (song_data, is_new) per input, in order.
+        Backends should override this with a batched insert.
+        """
+        return [self.store_features(**song) for song in songs]
+
+    def find_similars_with_feedback(
+        self,
+        song_id: int,
+        limit: int = 10,
+        metric: str = "cosine",
+    ) -> Optional[List[Dict]]:
+        """
+        Nearest neighbours of a stored song, each with its aggregate feedback
+        score ("feedback_score") in the context of that query song.
+
+        Returns None if the query song does not exist. Backends should override
+        this with a single round-trip; the default composes the basic operations.
+        """
+        features = self.get_features(song_id)
+        if features is None:
+            return None
+
+        candidates = self.find_similars(
+            features=features, limit=limit, metric=metric, exclude_id=None
+        )
+        if not candidates:
+            return []
+
+        feedback_scores = self.get_feedback_scores(
+            query_song_id=song_id,
+            suggested_song_ids=[song["id"] for song in candidates],
+        )
+        return [
+            {**song, "feedback_score": feedback_scores.get(song["id"], 0)}
+            for song in candidates
+        ]
+
+    def get_feedback_scores_batch(
+        self, pairs: List[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], int]:
+        """
+        Aggregate vote scores of many (query_song_id, suggested_song_id)
+        pairs; pairs without votes are absent. Backends should override this
+        with a single query.
+        """
+        by_query: Dict[int, List[int]] = {}
+        for query_id, suggested_id in pairs:
+            by_query.setdefault(query_id, []).append(suggested_id)
+        scores = {}
+        for query_id, suggested_ids in by_query.items():
+            for suggested_id, score in self.get_feedback_scores(
+                query_id, suggested_ids
+            ).items():
+                scores[(query_id, suggested_id)] = score
+        return scores
+
+    def find_similars_with_feedback_batch(
+        self,
+        song_ids: List[int],
+        limit: int = 10,
+        metric: str = "cosine",
+    ) -> Dict[int, List[Dict]]:
+        """
+        find_similars_with_feedback for many query songs, keyed by query id.
+        Unknown ids are absent. Backends should override this with one
+        batched search.
+        """
+        results = {}
+        for song_id in song_ids:
+            similar = self.find_similars_with_feedback(song_id, limit, metric)
+            if similar is not None:
+                results[song_id] = similar
+        return results
+
+    @contextmanager
+    def open_similar_stream(
+        self, song_id: int, metric: str = "cosine"
+    ) -> Iterator[Callable[[int], Optional[List[Dict]]]]:
+        """
+        Context manager yielding fetch(n): the next n neighbours of a stored
+        song (find_similars_with_feedback rows) in distance order, [] once
+        exhausted, or None on the first fetch if the song does not exist.
+        Used to widen a candidate pool step by step. The default re-runs
+        the search with a growing limit; backends should keep a cursor.
+        """
+        seen = 0
+
+        def fetch(n: int) -> Optional[List[Dict]]:
+            nonlocal seen
+            similar = self.find_similars_with_feedback(song_id, seen + n, metric)
+            if similar is None:
+                return None
+            chunk = similar[seen : seen + n]
+            seen += len(chunk)
+            return chunk
+
+        yield fetch
+
+    def find_similars_from_neighbors(
+        self, song_id: int, limit: int = 10
+    ) -> Optional[List[Dict]]:
+        """
+        Cosine neighbours read from precomputed lists, shaped like
+        find_similars_with_feedback. None when the backend keeps no list for
+        the song (or none that long); callers then search live.
+        """
+        return None
+
+    def close(self) -> None:
+        """Release any resources (e.g. connection pools) held by the repository."""
+        pass
+
+    def pool_stats(self) -> Dict:
+        """Connection pool statistics. Backends without a pool report none."""
+        return {"pooled": False}
@@ -0,0 +1,118 @@
+import os
+import numpy as np
+from typing import Optional, Tuple
+from .vector_math import normalize_rows
+
+# A feature snapshot is a single .npy file holding a structured array of
+# (id int64, vector float32[dim]) rows sorted by id. It can be opened with
+# np.load(path, mmap_mode="r") and needs no database to read.
+#
+# An index snapshot holds the same rows prepared for search: one record
+# whose ids, unit rows and norms are each a contiguous block, so a
+# read-only memory map of it is searched in place (see VectorMatrix).
+
+
+def snapshot_dtype(dim: int) -> np.dtype:
+    return np.dtype([("id", "<i8"), ("vector", "<f4", (dim,))])
+
+
+def index_snapshot_dtype(count: int, dim: int) -> np.dtype:
+    return np.dtype(
+        [
+            ("ids", "<i8", (count,)),
+            ("unit", "<f4", (count, dim)),
+            ("norms", "<f4", (count,)),
+        ]
+    )
+
+
+class SnapshotWriter:
+    """
+    Writes a (feature or index) snapshot of a known number of rows straight
+    into a memory-mapped temporary file, renamed over `path` only once
+    complete. Rows must be appended in id order.
+    """
+
+    def __init__(self, path: str, count: int, dim: int, index: bool = False):
+        self.path = path
+        self.count = count
+        self.index = index
+        self.written = 0
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        if index:
+            self._rows = np.lib.format.open_memmap(
+                self._tmp_path,
+                mode="w+",
+                dtype=index_snapshot_dtype(count, dim),
+                shape=(1,),
+            )
+        else:
+            self._rows = np.lib.format.open_memmap(
+                self._tmp_path, mode="w+", dtype=snapshot_dtype(dim), shape=(count,)
+            )
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        start, end = self.written, self.written + len(ids)
+        if end > self.count:
+            raise ValueError(f"Snapshot holds {self.count} rows, got more")
+        if self.index:
+            unit, norms = normalize_rows(vectors)
+            self._rows["ids"][0, start:end] = ids
+            self._rows["unit"][0, start:end] = unit
+            self._rows["norms"][0, start:end] = norms
+        else:
+            self._rows["id"][start:end] = ids
+            self._rows["vector"][start:end] = vectors
+        self.written = end
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._rows.flush()
+        del self._rows
+        if exc_type is None and self.written == self.count:
+            os.replace(self._tmp_path, self.path)
+            return
+        os.remove(self._tmp_path)
+        if exc_type is None:
+            raise ValueError(f"Snapshot expected {self.count} rows, got {self.written}")
+
+
+def write_snapshot(
+    path: str, ids: np.ndarray, vectors: np.ndarray, index: bool = False
+) -> None:
+    """Write ids and their (n, dim) vectors as a feature (or index) snapshot."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    with SnapshotWriter(path, len(ids), vectors.shape[1], index=index) as writer:
+        writer.append(ids, vectors)
+
+
+def read_snapshot(
+    path: str, dim: Optional[int] = None, mmap: bool = True
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (ids, vectors) of a snapshot file. With mmap the arrays are read-only
+    views of the file, paged in on access.
+    """
+    rows = np.load(path, mmap_mode="r" if mmap else None)
+    if rows.dtype.names != ("id", "vector"):
+        raise ValueError(f"{path} is not a feature snapshot")
+    if dim is not None and rows.dtype["vector"].shape != (dim,):
+        raise ValueError(f"{path} does not hold vectors of dimension {dim}")
+    return rows["id"], rows["vector"]
+
+
+def open_index_snapshot(
+    path: str, dim: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (ids, unit rows, norms) of an index snapshot as read-only memory maps.
+    Every process mapping the same file shares its pages.
+    """
+    record = np.load(path, mmap_mode="r")
+    if record.dtype.names != ("ids", "unit", "norms") or record.shape != (1,):
+        raise ValueError(f"{path} is not an index snapshot")
+    if record.dtype["unit"].shape[1:] != (dim,):
+        raise ValueError(f"{path} does not hold vectors of dimension {dim}")
+    return record["ids"][0], record["unit"][0], record["norms"][0]
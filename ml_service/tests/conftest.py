@@ -8,6 +8,7 @@ from fastapi.testclient import TestClient
 # Import the main app instance for API testing
 from main import app as fast_app
 from src.repositories.pgvector_repository import PGVectorRepository
+from src.repositories.async_pgvector_repository import AsyncPGVectorRepository
 
 # Configuration should ideally come from environment/config module, but hardcode the test values for safety
 FEATURE_DIMENSION = 27
@@ -75,6 +76,34 @@ def repository(pg_conn):
     yield repo
 
 
+@pytest.fixture(scope="function")
+def pooled_repository(repository):
+    """
+    PGVectorRepository running in pooled-connection mode (max 2 connections).
+    Depends on `repository` so tables are cleared first.
+    """
+    repo = PGVectorRepository(
+        dsn=TEST_DB_DSN,
+        dim=FEATURE_DIMENSION,
+        pool_min_size=1,
+        pool_max_size=2,
+        pool_timeout=0.2,
+    )
+    yield repo
+    repo.close()
+
+
+@pytest.fixture(scope="function")
+def async_repository(repository) -> AsyncPGVectorRepository:
+    """
+    Unopened AsyncPGVectorRepository on the test DB (tables cleared by `repository`).
+    Tests open/close it inside their own event loop.
+    """
+    return AsyncPGVectorRepository(
+        dsn=TEST_DB_DSN, dim=FEATURE_DIMENSION, pool_min_size=1, pool_max_size=2
+    )
+
+
 @pytest.fixture(scope="function")
 def test_user_id(pg_conn, repository) -> int:
     """
@@ -0,0 +1,165 @@
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+from unittest.mock import MagicMock, patch
+
+from src.extractors.analysis_cache import AnalysisCache
+from src.extractors.features import FastFeatureExtractor
+from src.extractors.youtube_extractor import MusicAnalysisService
+
+URL = "https://www.youtube.com/watch?v=cache_test"
+
+
+@pytest.fixture
+def wav_path(tmp_path) -> str:
+    """Three seconds of 16-bit mono audio, like yt_dlp's WAV output."""
+    sr = 44100
+    t = np.arange(sr * 3) / sr
+    y = 0.3 * np.sin(2 * np.pi * 440 * t)
+    path = tmp_path / "download.wav"
+    sf.write(path, y, sr, subtype="PCM_16")
+    return str(path)
+
+
+def test_feature_cache_is_keyed_by_extractor_version(tmp_path):
+    """Vectors are only returned for the extractor version they were made with."""
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    features = np.arange(27, dtype=np.float64)
+
+    cache.put_features(URL, "v1", features)
+
+    np.testing.assert_array_equal(cache.get_features(URL, ["v2", "v1"]), features)
+    assert cache.get_features(URL, ["v2"]) is None
+    # URL fragments do not change the content address
+    assert cache.get_features(URL + "#t=30", ["v1"]) is not None
+
+    stats = cache.stats()
+    assert stats["feature_hits"] == 2 and stats["feature_misses"] == 1
+    assert stats["feature_entries"] == 1
+
+
+def test_audio_cache_transcodes_to_flac(tmp_path, wav_path: str):
+    """16-bit downloads are stored losslessly; resampling is optional."""
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    assert cache.get_audio(URL) is None
+
+    path = cache.put_audio(URL, wav_path)
+    assert cache.get_audio(URL) == path
+    assert sf.info(path).format == "FLAC"
+    np.testing.assert_array_equal(sf.read(path)[0], sf.read(wav_path)[0])
+    assert os.path.getsize(path) < os.path.getsize(wav_path)
+
+    resampled = cache.put_audio(URL + "&r", wav_path, sr=22050)
+    assert sf.info(resampled).samplerate == 22050
+    assert sf.info(resampled).frames == pytest.approx(22050 * 3, abs=1)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Once over the size bound, the oldest-read entries are removed first."""
+    entry = np.zeros(1000)  # ~8 KB per .npy
+    cache = AnalysisCache(str(tmp_path / "cache"), max_bytes=30_000)
+
+    for i in range(3):
+        cache.put_features(f"{URL}{i}", "v1", entry)
+        time.sleep(0.01)
+    cache.get_features(f"{URL}0", ["v1"])  # refresh the first entry
+    cache.put_features(f"{URL}3", "v1", entry)
+
+    assert cache.get_features(f"{URL}1", ["v1"]) is None
+    assert cache.get_features(f"{URL}0", ["v1"]) is not None
+    assert cache.stats()["evictions"] >= 1
+    assert cache.stats()["bytes"] <= 30_000
+
+
+def test_service_reuses_cached_features_and_audio(tmp_path, wav_path: str):
+    """Repeat analyses skip the download; a new extractor reuses cached audio."""
+    cache = AnalysisCache(str(tmp_path / "cache"))
+
+    def download(url, tempdir):
+        return shutil.copy(wav_path, tempdir)
+
+    first = MusicAnalysisService(
+        MagicMock(), feature_extractor=FastFeatureExtractor(), analysis_cache=cache
+    )
+    with patch.object(first, "_download_audio", side_effect=download) as dl:
+        features = first.extract_from_url(URL)
+        again = first.extract_from_url(URL)
+    assert dl.call_count == 1
+    np.testing.assert_array_equal(features, again)
+
+    # Different extractor version: features miss, audio hit, still no download
+    second = MusicAnalysisService(
+        MagicMock(),
+        feature_extractor=FastFeatureExtractor(max_duration=2),
+        analysis_cache=pickle.loads(pickle.dumps(cache)),
+    )
+    with patch.object(second, "_download_audio") as dl:
+        capped = second.extract_from_url(URL)
+    dl.assert_not_called()
+    assert capped.shape == (27,)
+    assert second.analysis_cache.stats()["audio_hits"] == 1
+
+
+def test_resampled_audio_is_not_reused_at_another_rate(tmp_path, wav_path: str):
+    """Audio cached at the fast extractor's rate is downloaded again for librosa."""
+    cache = AnalysisCache(str(tmp_path / "cache"))
+
+    def download(url, tempdir):
+        return shutil.copy(wav_path, tempdir)
+
+    fast = MusicAnalysisService(
+        MagicMock(), feature_extractor=FastFeatureExtractor(), analysis_cache=cache
+    )
+    with patch.object(fast, "_download_audio", side_effect=download):
+        fast.extract_from_url(URL)
+    assert cache.get_audio(URL) is None
+    assert sf.info(cache.get_audio(URL, 22050)).samplerate == 22050
+
+    native = MusicAnalysisService(MagicMock(), analysis_cache=cache)
+    with (
+        patch.object(native, "_download_audio", side_effect=download) as dl,
+        patch.object(native.feature_extractor, "extract", return_value=np.zeros(27)),
+    ):
+        native.extract_from_url(URL)
+    dl.assert_called_once()
+    assert sf.info(cache.get_audio(URL)).samplerate == 44100
+    # The source-rate copy serves every extractor
+    assert cache.get_audio(URL, 22050) == cache.get_audio(URL)
+
+
+def test_pipe_mode_caches_streamed_audio(tmp_path):
+    """The decoded ffmpeg stream is kept as FLAC; repeats hit the feature cache."""
+    import io
+
+    sr = 22050
+    samples = (0.3 * np.sin(2 * np.pi * 440 * np.arange(sr * 3) / sr)).astype("<f4")
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    service = MusicAnalysisService(
+        MagicMock(), download_mode="pipe", analysis_cache=cache
+    )
+
+    ydl = MagicMock()
+    ydl.__enter__.return_value.extract_info.return_value = {"url": "https://cdn"}
+    ffmpeg = MagicMock(stdout=io.BytesIO(samples.tobytes()), stderr=io.BytesIO())
+    ffmpeg.wait.return_value = ffmpeg.poll.return_value = 0
+    with (
+        patch("src.extractors.youtube_extractor.yt_dlp.YoutubeDL", return_value=ydl),
+        patch(
+            "src.extractors.youtube_extractor.subprocess.Popen", return_value=ffmpeg
+        ) as popen,
+    ):
+        features = service.extract_from_url(URL)
+        again = service.extract_from_url(URL)
+
+    assert popen.call_count == 1
+    np.testing.assert_array_equal(features, again)
+    # Resampled by ffmpeg (source rate unknown): not reused at the native rate
+    assert cache.get_audio(URL) is None
+    cached, cached_sr = sf.read(cache.get_audio(URL, sr), dtype="float32")
+    assert cached_sr == sr
+    np.testing.assert_allclose(cached, samples, atol=1e-6)
@@ -1,3 +1,5 @@
+import json
+import time
 import pytest
 import numpy as np
 from unittest.mock import patch, MagicMock
@@ -175,3 +177,159 @@ def test_store_feedback_success(client: TestClient, repository, test_user_id):
     # Verify the feedback is in the database
     scores = repository.get_feedback_scores(song_q_id, [song_s_id])
     assert scores[song_s_id] == 1
+
+
+def test_analyze_background_job_api(
+    client: TestClient, repository, mock_external_deps, test_user_id
+):
+    """Test POST /analyze?background=true returns a job that can be polled."""
+    request_data = {
+        "url": "http://youtube.com/api_test_background",
+        "title": "Background Track",
+        "artist_name": "Background Artist",
+        "source_platform": "youtube",
+        "added_by": test_user_id,
+    }
+
+    response = client.post("/analyze?background=true", json=request_data)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    for _ in range(500):
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["state"] not in ("queued", "running"):
+            break
+        time.sleep(0.01)
+
+    assert status["state"] == "succeeded"
+    assert status["is_new"] is True
+    assert status["song"]["title"] == "Background Track"
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+
+def test_analyze_batch_api(
+    client: TestClient, repository, mock_external_deps, test_user_id
+):
+    """Test POST /analyze/batch stores new songs and reports existing ones."""
+    songs = [
+        {
+            "url": f"http://youtube.com/api_batch_{i}",
+            "title": f"Batch Track {i}",
+            "artist_name": "Batch Artist",
+            "source_platform": "youtube",
+            "added_by": test_user_id,
+        }
+        for i in range(3)
+    ]
+    client.post("/analyze", json=songs[0])
+
+    response = client.post("/analyze/batch", json={"songs": songs})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["status"] for item in data["items"]] == ["exists", "stored", "stored"]
+    assert data["stored"] == 2 and data["existing"] == 1 and data["failed"] == 0
+    assert client.post("/analyze/batch", json={"songs": []}).status_code == 422
+
+
+def test_list_songs_pages_and_streams(client: TestClient, repository, test_user_id):
+    """Test GET /songs keyset pages, NDJSON streaming and field validation."""
+    for i in range(3):
+        repository.store_features(
+            f"Listed {i}",
+            "Artist",
+            f"http://youtube.com/listed_{i}",
+            MOCK_FEATURES,
+            "youtube",
+            added_by=test_user_id,
+        )
+
+    page = client.get("/songs", params={"limit": 2, "fields": "title"})
+    assert page.status_code == 200
+    assert page.json() == [
+        {"id": 1, "title": "Listed 0"},
+        {"id": 2, "title": "Listed 1"},
+    ]
+    next_after = page.headers["x-next-after-id"]
+
+    last = client.get("/songs", params={"limit": 2, "after_id": next_after})
+    assert [song["id"] for song in last.json()] == [3]
+    assert "x-next-after-id" not in last.headers
+
+    full = client.get("/songs")
+    assert [SongResult(**song).id for song in full.json()] == [1, 2, 3]
+
+    stream = client.get("/songs", params={"format": "ndjson", "fields": "url"})
+    assert stream.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in stream.text.splitlines()]
+    assert lines[2] == {"id": 3, "url": "http://youtube.com/listed_2"}
+
+    assert client.get("/songs", params={"fields": "password"}).status_code == 400
+
+
+def test_similar_batch_api(client: TestClient, repository, test_user_id):
+    """Test POST /similar/batch returns per-seed results in input order."""
+    v1 = np.ones(FEATURE_DIMENSION) / np.sqrt(FEATURE_DIMENSION)
+    for i, vector in enumerate([v1, v1 * 0.99, v1 * -0.5]):
+        repository.store_features(
+            f"Batch Seed {i}",
+            "A",
+            f"url_batch_{i}",
+            vector,
+            "youtube",
+            added_by=test_user_id,
+        )
+    expected = client.get("/similar?id=1&limit=2").json()
+
+    response = client.post(
+        "/similar/batch", json={"song_ids": [1, 99999, 2], "limit": 2}
+    )
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [(item["song_id"], item["found"]) for item in items] == [
+        (1, True),
+        (99999, False),
+        (2, True),
+    ]
+    assert items[0]["similar"] == expected
+    assert all(song["id"] != 2 for song in items[2]["similar"])
+    assert client.post("/similar/batch", json={"song_ids": []}).status_code == 422
+
+
+def test_similar_by_vector_and_audio(client: TestClient, repository, test_user_id):
+    """Test /similar/by-vector and /similar/by-audio search without storing."""
+    v1 = np.ones(FEATURE_DIMENSION) / np.sqrt(FEATURE_DIMENSION)
+    song1, _ = repository.store_features(
+        "Query Song", "A", "url1", v1, "youtube", added_by=test_user_id
+    )
+    repository.store_features(
+        "Opposite", "B", "url2", -v1, "youtube", added_by=test_user_id
+    )
+
+    response = client.post(
+        "/similar/by-vector", json={"features": v1.tolist(), "limit": 1}
+    )
+    assert response.status_code == 200
+    assert [song["id"] for song in response.json()] == [song1["id"]]
+    assert (
+        client.post("/similar/by-vector", json={"features": [1.0, 2.0]}).status_code
+        == 422
+    )
+    zero = [0.0] * FEATURE_DIMENSION
+    assert client.post("/similar/by-vector", json={"features": zero}).status_code == 400
+
+    with patch.object(
+        MusicAnalysisService, "extract_from_audio", return_value=-v1
+    ) as extract:
+        response = client.post(
+            "/similar/by-audio?limit=1",
+            content=b"RIFF....WAVE",
+            headers={"content-type": "audio/wav"},
+        )
+    assert response.status_code == 200
+    assert response.json()[0]["title"] == "Opposite"
+    extract.assert_called_once_with(b"RIFF....WAVE")
+
+    assert client.post("/similar/by-audio", content=b"not audio").status_code == 400
+    assert len(repository.list_all_songs()) == 2
@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+import numpy as np
+
+from src.extractors.youtube_extractor import MusicAnalysisService
+from src.repositories.async_pgvector_repository import AsyncPGVectorRepository
+from src.repositories.pgvector_repository import PGVectorRepository
+
+FEATURE_DIMENSION = 27
+
+
+def run(async_repository: AsyncPGVectorRepository, scenario):
+    """Run `scenario(repo)` in a fresh event loop with the pool opened."""
+
+    async def main():
+        await async_repository.open()
+        try:
+            return await scenario(async_repository)
+        finally:
+            await async_repository.close()
+
+    return asyncio.run(main())
+
+
+def test_async_store_and_search(
+    async_repository: AsyncPGVectorRepository, test_user_id: int
+):
+    """Test the async repository stores songs and ranks them like the sync one."""
+    v1 = np.ones(FEATURE_DIMENSION) / np.sqrt(FEATURE_DIMENSION)
+    v2 = v1 + 0.05 * np.linspace(0, 1, FEATURE_DIMENSION)
+
+    async def scenario(repo: AsyncPGVectorRepository):
+        q, is_new = await repo.store_features(
+            "Q", "Q", "url_q", v1, "youtube", added_by=test_user_id
+        )
+        s, _ = await repo.store_features(
+            "S", "S", "url_s", v2, "youtube", added_by=test_user_id
+        )
+        _, is_new_again = await repo.store_features(
+            "Q2", "Q", "url_q", v1, "youtube", added_by=test_user_id
+        )
+        await repo.store_feedback(test_user_id, q["id"], s["id"], -1)
+
+        features = await repo.get_features(q["id"])
+        similars = await repo.find_similars(v1, limit=2, exclude_id=q["id"])
+        with_feedback = await repo.find_similars_with_feedback(q["id"], limit=2)
+        missing = await repo.find_similars_with_feedback(99999)
+        batch = await repo.find_similars_with_feedback_batch([q["id"], 99999], limit=2)
+        return (
+            q,
+            s,
+            is_new,
+            is_new_again,
+            features,
+            similars,
+            with_feedback,
+            missing,
+            batch,
+        )
+
+    q, s, is_new, is_new_again, features, similars, with_feedback, missing, batch = run(
+        async_repository, scenario
+    )
+
+    assert is_new is True and is_new_again is False
+    np.testing.assert_allclose(features, v1, atol=1e-6)
+    assert [r["id"] for r in similars] == [s["id"]]
+    assert [r["id"] for r in with_feedback] == [q["id"], s["id"]]
+    assert with_feedback[1]["feedback_score"] == -1
+    assert missing is None
+    assert batch == {q["id"]: with_feedback}
+
+
+def test_service_async_paths_match_sync(
+    async_repository: AsyncPGVectorRepository,
+    repository: PGVectorRepository,
+    test_user_id: int,
+):
+    """Test the async service read paths return the same results as the sync ones."""
+    rng = np.random.default_rng(3)
+    for i, vector in enumerate(rng.random((6, FEATURE_DIMENSION))):
+        repository.store_features(
+            f"T{i}", "A", f"url_{i}", vector, "youtube", added_by=test_user_id
+        )
+
+    sync_service = MusicAnalysisService(repository)
+    expected = sync_service.find_similar_by_id(1, limit=3)
+
+    async def scenario(repo: AsyncPGVectorRepository):
+        service = MusicAnalysisService(repository, async_repository=repo)
+        await service.store_user_feedback_async(test_user_id, 1, 2, 1)
+        similar = await service.find_similar_by_id_async(1, limit=3)
+        songs = await service.list_all_songs_async()
+        song = await service.get_song_by_id_async(2)
+        missing = await service.get_song_by_id_async(99999)
+        by_ids = await repo.get_songs_by_ids([3, 99999, 1])
+        page = await repo.list_songs(after_id=2, limit=2, fields=["url"])
+        streamed = [song["id"] async for song in repo.iter_songs(batch_size=4)]
+        with pytest.raises(ValueError):
+            await service.find_similar_by_id_async(99999)
+        return similar, songs, song, missing, by_ids, page, streamed
+
+    similar, songs, song, missing, by_ids, page, streamed = run(
+        async_repository, scenario
+    )
+
+    assert [r.id for r in similar] == [r.id for r in expected]
+    assert len(songs) == 6
+    assert song.title == "T1"
+    assert missing is None
+    assert sorted(by_ids) == [1, 3] and by_ids[3]["id"] == 3
+    assert [song["id"] for song in page] == [3, 4] and set(page[0]) == {"id", "url"}
+    assert streamed == [1, 2, 3, 4, 5, 6]
+    assert repository.get_feedback_scores(1, [2]) == {2: 1}
+
+
+def test_async_similarity_queries_return_more_rows_than_default_ef_search(
+    repository: PGVectorRepository,
+):
+    """Test async HNSW-planned searches fill limits above the default ef_search."""
+    vectors = np.random.default_rng(3).random((60, FEATURE_DIMENSION))
+    stored = repository.store_features_batch(
+        [
+            {
+                "title": f"E {i}",
+                "artist_name": "A",
+                "url": f"http://test.com/ef_{i}",
+                "song_feature": vector,
+                "source_platform": "youtube",
+            }
+            for i, vector in enumerate(vectors)
+        ]
+    )
+    seed = stored[0][0]["id"]
+    forced = AsyncPGVectorRepository(
+        dsn=repository.dsn + "?options=-c%20enable_seqscan%3Doff",
+        dim=FEATURE_DIMENSION,
+        pool_min_size=1,
+        pool_max_size=1,
+    )
+
+    async def scenario(repo: AsyncPGVectorRepository):
+        similars = await repo.find_similars(vectors[0], limit=55, exclude_id=seed)
+        with_feedback = await repo.find_similars_with_feedback(seed, limit=55)
+        batch = await repo.find_similars_with_feedback_batch([seed], limit=55)
+        return len(similars), len(with_feedback), len(batch[seed])
+
+    assert run(forced, scenario) == (55, 55, 55)
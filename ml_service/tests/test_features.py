@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from unittest.mock import MagicMock
+
+from src.extractors.features import (
+    FastFeatureExtractor,
+    LibrosaFeatureExtractor,
+    StreamingFeatureExtractor,
+    create_feature_extractor,
+)
+from src.extractors.youtube_extractor import MusicAnalysisService
+from src.models import ExtractionMode
+
+FEATURE_DIMENSION = 27
+
+
+@pytest.fixture(scope="module")
+def audio_path(tmp_path_factory) -> str:
+    """Ten seconds of a pulsed two-tone signal with a little noise, at 44.1 kHz."""
+    sr = 44100
+    t = np.arange(sr * 10) / sr
+    rng = np.random.default_rng(0)
+    y = (
+        0.3 * np.sin(2 * np.pi * 440 * t)
+        + 0.2 * np.sin(2 * np.pi * 660 * t) * (np.sin(2 * np.pi * 2 * t) > 0)
+        + 0.05 * rng.standard_normal(t.size)
+    )
+    path = tmp_path_factory.mktemp("audio") / "tone.wav"
+    sf.write(path, y.astype(np.float32), sr)
+    return str(path)
+
+
+def test_fast_extractor_matches_legacy_at_native_rate(audio_path: str):
+    """Sharing one STFT must not change the features themselves."""
+    legacy = LibrosaFeatureExtractor().extract(audio_path)
+    fast = FastFeatureExtractor(sr=None).extract(audio_path)
+
+    assert fast.shape == (FEATURE_DIMENSION,)
+    np.testing.assert_allclose(fast, legacy, atol=1e-5)
+
+
+def test_fast_extractor_resampled_and_capped(audio_path: str):
+    """Fixed sample rate and duration cap still give a unit 27-dim vector."""
+    full = FastFeatureExtractor().extract(audio_path)
+    capped = FastFeatureExtractor(max_duration=4, segments=2).extract(audio_path)
+
+    for features in (full, capped):
+        assert features.shape == (FEATURE_DIMENSION,)
+        assert np.linalg.norm(features) == pytest.approx(1.0, abs=1e-6)
+    # The signal is stationary, so excerpts describe it almost as well
+    assert float(np.dot(full, capped)) > 0.999
+
+
+def test_extractor_versions_and_factory():
+    """Versions identify parameters; unknown extractor names are rejected."""
+    assert create_feature_extractor("librosa").version == "librosa-v1"
+    assert (
+        FastFeatureExtractor().version != FastFeatureExtractor(max_duration=30).version
+    )
+    with pytest.raises(ValueError):
+        create_feature_extractor("nope")
+
+
+def test_streaming_extractor_matches_full_decode(audio_path: str):
+    """Block-wise running means and online tempo agree with the full pipeline."""
+    legacy = LibrosaFeatureExtractor().extract(audio_path)
+    # Small blocks so many block boundaries are crossed
+    streamed = StreamingFeatureExtractor(sr=None, block_seconds=1.5).extract(audio_path)
+
+    assert streamed.shape == (FEATURE_DIMENSION,)
+    np.testing.assert_allclose(streamed, legacy, atol=1e-4)
+
+    resampled = StreamingFeatureExtractor().extract(audio_path)
+    fast = FastFeatureExtractor().extract(audio_path)
+    np.testing.assert_allclose(resampled, fast, atol=1e-3)
+
+
+def test_service_selects_streaming_by_mode_and_duration(audio_path: str):
+    """AUTO streams above the duration threshold; explicit modes override it."""
+    full, streaming = MagicMock(), MagicMock()
+    service = MusicAnalysisService(
+        MagicMock(),
+        feature_extractor=full,
+        streaming_extractor=streaming,
+        streaming_threshold_seconds=5,
+    )
+
+    service._extract_features(audio_path, ExtractionMode.AUTO)  # 10 s > 5 s
+    service._extract_features(audio_path, ExtractionMode.FULL)
+    service.streaming_threshold_seconds = 60
+    service._extract_features(audio_path, ExtractionMode.AUTO)
+    service._extract_features(audio_path, ExtractionMode.STREAMING)
+
+    assert streaming.extract.call_count == 2
+    assert full.extract.call_count == 2
+
+
+def test_uploaded_audio_matches_file_extraction(audio_path: str):
+    """In-memory decoding must give the vector the extractor gets from a file."""
+    with open(audio_path, "rb") as f:
+        audio = f.read()
+
+    for extractor in (LibrosaFeatureExtractor(), FastFeatureExtractor()):
+        service = MusicAnalysisService(MagicMock(), feature_extractor=extractor)
+        np.testing.assert_allclose(
+            service.extract_from_audio(audio),
+            extractor.extract(audio_path),
+            rtol=1e-3,
+            atol=1e-3,
+        )
+
+    with pytest.raises(ValueError):
+        service.extract_from_audio(b"not audio")
@@ -0,0 +1,145 @@
+import threading
+import time
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.jobs.analysis_queue import AnalysisJobQueue, QueueFullError
+from src.models import JobState, SongData
+
+
+def make_song(url: str) -> SongData:
+    return SongData(url=url, title="T", artist_name="A", source_platform="youtube")
+
+
+def song_dict(song_id: int, url: str) -> dict:
+    return {
+        "id": song_id,
+        "title": "T",
+        "artist_name": "A",
+        "url": url,
+        "source_platform": "youtube",
+        "added_by": None,
+        "added_at": None,
+    }
+
+
+def wait_for(queue: AnalysisJobQueue, job_id: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id).state in (JobState.QUEUED, JobState.RUNNING):
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+@pytest.fixture
+def blocking_queue():
+    """Queue whose task blocks until `release` is set, counting executions."""
+    release = threading.Event()
+    calls = []
+
+    def task(song_data: SongData):
+        calls.append(song_data.url)
+        release.wait(timeout=5)
+        if "fail" in song_data.url:
+            raise ValueError("Download failed")
+        return song_dict(len(calls), song_data.url), True
+
+    queue = AnalysisJobQueue(ThreadPoolExecutor(max_workers=2), task, max_pending=2)
+    yield queue, release, calls
+    release.set()
+    queue.shutdown(wait=True)
+
+
+def test_queue_dedupes_in_flight_urls(blocking_queue):
+    """Test concurrent submissions for the same URL share one job and one download."""
+    queue, release, calls = blocking_queue
+
+    first = queue.submit(make_song("http://yt/a"))
+    second = queue.submit(make_song("http://yt/a"))
+    assert second.id == first.id
+
+    release.set()
+    done = wait_for(queue, first.id)
+
+    assert done.state == JobState.SUCCEEDED
+    assert done.song.url == "http://yt/a"
+    assert done.is_new is True
+    assert calls == ["http://yt/a"]
+
+    # Once finished, a new submission starts a fresh job
+    assert queue.submit(make_song("http://yt/a")).id != first.id
+
+
+def test_queue_reports_failures_and_bounds_pending(blocking_queue):
+    """Test failed jobs expose the error and the queue rejects work beyond max_pending."""
+    queue, release, _ = blocking_queue
+
+    failing = queue.submit(make_song("http://yt/fail"))
+    queue.submit(make_song("http://yt/b"))
+    with pytest.raises(QueueFullError):
+        queue.submit(make_song("http://yt/c"))
+
+    release.set()
+    done = wait_for(queue, failing.id)
+
+    assert done.state == JobState.FAILED
+    assert "Download failed" in done.error
+    assert queue.get("unknown") is None
+
+
+def test_batch_extractions_share_the_queue_bounds(blocking_queue):
+    """Test batch extractions respect max_pending/batch_slots and join in-flight jobs."""
+    from src.extractors.youtube_extractor import MusicAnalysisService
+    from src.repositories.mock_repository import MockVectorRepository
+
+    queue, release, calls = blocking_queue
+    queue.batch_slots = 1
+    job = queue.submit(make_song("http://yt/a"))
+
+    extract_release = threading.Event()
+    extracted = []
+    running = []
+
+    def extract(url, mode):
+        running.append(url)
+        extracted.append((url, len(running)))
+        extract_release.wait(timeout=5)
+        running.remove(url)
+        return np.ones(27)
+
+    service = MusicAnalysisService(MockVectorRepository(dim=27))
+    reports = []
+    batch = threading.Thread(
+        target=lambda: reports.append(
+            service.analyze_batch(
+                [make_song(f"http://yt/{u}") for u in "abc"],
+                executor=queue.batch_executor(),
+                extract_task=extract,
+            )
+        )
+    )
+    batch.start()
+    deadline = time.monotonic() + 5
+    while not extracted:
+        assert time.monotonic() < deadline, "batch did not start"
+        time.sleep(0.01)
+
+    # One analysis job and one batch extraction fill max_pending=2
+    with pytest.raises(QueueFullError):
+        queue.submit(make_song("http://yt/d"))
+
+    release.set()
+    extract_release.set()
+    batch.join(timeout=5)
+    report = reports[0]
+
+    assert calls == ["http://yt/a"]  # "a" was not downloaded a second time
+    assert [url for url, _ in extracted] == ["http://yt/b", "http://yt/c"]
+    assert max(concurrent for _, concurrent in extracted) == 1
+    assert [item.status.value for item in report.items] == [
+        "exists",
+        "stored",
+        "stored",
+    ]
+    assert report.items[0].song.id == wait_for(queue, job.id).song.id
@@ -0,0 +1,274 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from src.repositories.pgvector_repository import PGVectorRepository
+from src.repositories.memory_index_repository import InMemoryIndexRepository
+from src.repositories.mapped_index_repository import MappedIndexRepository
+from src.repositories.vector_snapshot import write_snapshot
+
+FEATURE_DIMENSION = 27
+
+
+@pytest.fixture
+def memory_index(repository: PGVectorRepository) -> InMemoryIndexRepository:
+    """In-memory index over the (freshly truncated) test database."""
+    return InMemoryIndexRepository(repository, refresh_interval=3600)
+
+
+def _random_vectors(n: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.random((n, FEATURE_DIMENSION))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_memory_index_matches_pgvector_ranking(
+    memory_index: InMemoryIndexRepository,
+    repository: PGVectorRepository,
+    test_user_id: int,
+):
+    """Test the in-memory search ranks and scores like the pgvector query."""
+    vectors = _random_vectors(20)
+    for i, vector in enumerate(vectors):
+        memory_index.store_features(
+            f"Song {i}", "A", f"url_{i}", vector, "youtube", added_by=test_user_id
+        )
+
+    query = vectors[3]
+    expected = repository.find_similars(query, limit=5, exclude_id=4)
+    actual = memory_index.find_similars(query, limit=5, exclude_id=4)
+
+    assert [s["id"] for s in actual] == [s["id"] for s in expected]
+    for a, e in zip(actual, expected):
+        assert a["distance"] == pytest.approx(e["distance"], abs=1e-5)
+        assert a["title"] == e["title"]
+
+
+def test_memory_index_incremental_refresh(
+    memory_index: InMemoryIndexRepository,
+    repository: PGVectorRepository,
+    mock_features: np.ndarray,
+    test_user_id: int,
+):
+    """Test rows inserted behind the index's back are picked up by id watermark."""
+    assert memory_index.stats()["songs"] == 0
+
+    # Inserted directly in Postgres, e.g. by another worker
+    song, _ = repository.store_features(
+        "Elsewhere", "E", "url_else", mock_features, "youtube", added_by=test_user_id
+    )
+
+    # Unknown id above the watermark triggers a refresh
+    features = memory_index.get_features(song["id"])
+    np.testing.assert_allclose(features, mock_features, atol=1e-6)
+    stats = memory_index.stats()
+    assert stats["songs"] == 1
+    assert stats["watermark"] == song["id"]
+    assert memory_index.refresh() == 0  # Nothing new, nothing duplicated
+
+
+def test_memory_index_reloads_imported_vectors(
+    memory_index: InMemoryIndexRepository,
+    repository: PGVectorRepository,
+    test_user_id: int,
+    tmp_path,
+):
+    """Test vectors replaced by import_vectors are reloaded on the next refresh."""
+    vectors = _random_vectors(4)
+    ids = [
+        memory_index.store_features(
+            f"Song {i}", "A", f"url_{i}", vector, "youtube", added_by=test_user_id
+        )[0]["id"]
+        for i, vector in enumerate(vectors)
+    ]
+    path = str(tmp_path / "features.npy")
+    write_snapshot(path, np.array(ids[:1]), vectors[3:])
+    repository.import_vectors(path)
+
+    memory_index.refresh()
+    np.testing.assert_allclose(memory_index.get_features(ids[0]), vectors[3], atol=1e-6)
+    assert memory_index.stats()["songs"] == 4
+    results = memory_index.find_similars(vectors[3], limit=2)
+    assert {s["id"] for s in results} == {ids[0], ids[3]}
+
+
+def test_memory_index_rate_limits_refreshes_for_unknown_ids(
+    memory_index: InMemoryIndexRepository, repository: PGVectorRepository
+):
+    """Test lookups of ids that do not exist do not each query Postgres."""
+    with patch.object(
+        repository, "fetch_vectors", wraps=repository.fetch_vectors
+    ) as fetch:
+        for song_id in range(1000, 1020):
+            assert memory_index.get_features(song_id) is None
+    assert fetch.call_count <= 1
+
+
+def test_memory_index_similars_with_feedback(
+    memory_index: InMemoryIndexRepository, test_user_id: int
+):
+    """Test neighbours come from memory and feedback sums from Postgres."""
+    v = _random_vectors(3)
+    q = memory_index.store_features("Q", "Q", "url_q", v[0], "youtube", test_user_id)
+    s = memory_index.store_features("S", "S", "url_s", v[1], "youtube", test_user_id)
+    memory_index.store_feedback(test_user_id, q[0]["id"], s[0]["id"], -1)
+
+    results = memory_index.find_similars_with_feedback(q[0]["id"], limit=3)
+
+    assert results[0]["id"] == q[0]["id"]
+    scores = {r["id"]: r["feedback_score"] for r in results}
+    assert scores[s[0]["id"]] == -1
+    assert memory_index.find_similars_with_feedback(99999) is None
+
+
+def test_memory_index_batch_search_matches_pgvector(
+    memory_index: InMemoryIndexRepository,
+    repository: PGVectorRepository,
+    test_user_id: int,
+):
+    """Test the matrix-matrix batch search ranks like the Postgres LATERAL query."""
+    for i, vector in enumerate(_random_vectors(15, seed=5)):
+        memory_index.store_features(
+            f"Song {i}", "A", f"url_{i}", vector, "youtube", added_by=test_user_id
+        )
+    repository.store_feedback(test_user_id, 2, 5, -1)
+
+    expected = repository.find_similars_with_feedback_batch([2, 9, 99999], limit=4)
+    actual = memory_index.find_similars_with_feedback_batch([2, 9, 99999], limit=4)
+
+    assert set(actual) == set(expected) == {2, 9}
+    for seed in (2, 9):
+        assert [s["id"] for s in actual[seed]] == [s["id"] for s in expected[seed]]
+        for a, e in zip(actual[seed], expected[seed]):
+            assert a["distance"] == pytest.approx(e["distance"], abs=1e-5)
+            assert a["feedback_score"] == e["feedback_score"]
+
+
+def test_memory_index_similar_stream_matches_pgvector(
+    memory_index: InMemoryIndexRepository,
+    repository: PGVectorRepository,
+    test_user_id: int,
+):
+    """Test the in-memory candidate stream pages like the Postgres cursor."""
+    for i, vector in enumerate(_random_vectors(12, seed=9)):
+        memory_index.store_features(
+            f"Song {i}", "A", f"url_{i}", vector, "youtube", added_by=test_user_id
+        )
+    repository.store_feedback(test_user_id, 3, 7, -1)
+
+    with repository.open_similar_stream(3) as fetch:
+        expected = fetch(4) + fetch(20)
+    with memory_index.open_similar_stream(3) as fetch:
+        actual = fetch(4) + fetch(20)
+
+    assert [s["id"] for s in actual] == [s["id"] for s in expected]
+    assert [s["feedback_score"] for s in actual] == [
+        s["feedback_score"] for s in expected
+    ]
+    with memory_index.open_similar_stream(99999) as fetch:
+        assert fetch(3) is None
+
+
+def test_memory_index_warms_up_from_snapshot(
+    repository: PGVectorRepository, test_user_id: int, tmp_path
+):
+    """Test the index takes vectors from a snapshot and fills in the rest from Postgres."""
+    vectors = _random_vectors(12)
+    ids = [
+        repository.store_features(
+            f"Song {i}", "A", f"url_{i}", vector, "youtube", added_by=test_user_id
+        )[0]["id"]
+        for i, vector in enumerate(vectors)
+    ]
+    # Snapshot of the first 8 songs (one of them left out, one since deleted);
+    # song ids[0] carries a vector that only the snapshot has
+    snapshot_ids = np.array(ids[:3] + ids[4:8] + [99999])
+    snapshot_vectors = vectors[[0, 1, 2, 4, 5, 6, 7, 0]].copy()
+    snapshot_vectors[0] = vectors[11]
+    path = str(tmp_path / "features.npy")
+    write_snapshot(path, snapshot_ids, snapshot_vectors)
+
+    memory_index = InMemoryIndexRepository(
+        repository, refresh_interval=3600, snapshot_path=path
+    )
+
+    assert memory_index.stats()["songs"] == 12
+    np.testing.assert_allclose(
+        memory_index.get_features(ids[0]), vectors[11], atol=1e-6
+    )
+    np.testing.assert_allclose(memory_index.get_features(ids[3]), vectors[3], atol=1e-6)
+    np.testing.assert_allclose(memory_index.get_features(ids[9]), vectors[9], atol=1e-6)
+    assert memory_index.get_features(99999) is None
+
+
+def test_mapped_index_serves_snapshot_plus_delta(
+    repository: PGVectorRepository, pg_conn, test_user_id: int, tmp_path
+):
+    """Test the mapped index searches the snapshot in place and the newer rows in memory."""
+    vectors = _random_vectors(15)
+    ids = []
+    path = str(tmp_path / "index.npy")
+    for i, vector in enumerate(vectors):
+        if i == 12:
+            assert repository.export_vectors(path, index=True) == 12
+        song, _ = repository.store_features(
+            f"Song {i}", "A", f"url_{i}", vector, "youtube", added_by=test_user_id
+        )
+        ids.append(song["id"])
+
+    mapped = MappedIndexRepository(repository, snapshot_path=path, refresh_interval=0)
+    assert mapped.stats()["songs"] == 15
+    assert mapped.stats()["mapped_songs"] == 12
+    assert len(mapped._metadata) == 3  # only the delta is held per process
+    np.testing.assert_allclose(mapped.get_features(ids[2]), vectors[2], atol=1e-6)
+
+    expected = repository.find_similars(vectors[13], limit=6, exclude_id=ids[5])
+    actual = mapped.find_similars(vectors[13], limit=6, exclude_id=ids[5])
+    assert [s["id"] for s in actual] == [s["id"] for s in expected]
+    assert [s["title"] for s in actual] == [s["title"] for s in expected]
+
+    # Songs deleted since the snapshot drop out of the results
+    with pg_conn.cursor() as cur:
+        cur.execute("DELETE FROM songs WHERE id = %s;", (ids[0],))
+    similar = mapped.find_similars_with_feedback(ids[1], limit=15)
+    assert ids[0] not in [s["id"] for s in similar]
+    assert len(similar) == 14
+    # ...before the lists are cut, so searches still return `limit` songs
+    nearest = np.argsort(1 - vectors[1:] @ vectors[0])[:4] + 1
+    assert [s["id"] for s in mapped.find_similars(vectors[0], limit=4)] == [
+        ids[i] for i in nearest
+    ]
+    with patch.object(
+        repository, "get_songs_by_ids", wraps=repository.get_songs_by_ids
+    ) as lookup:
+        batch = mapped.find_similars_with_feedback_batch(ids[1:4], limit=4)
+    assert lookup.call_count == 1
+    assert [len(batch[song_id]) for song_id in ids[1:4]] == [4, 4, 4]
+    assert all(ids[0] not in [s["id"] for s in batch[i]] for i in ids[1:4])
+
+
+def test_mapped_index_reloads_when_vectors_change(
+    repository: PGVectorRepository, test_user_id: int, tmp_path
+):
+    """Test the mapped index drops its stale snapshot after import_vectors."""
+    vectors = _random_vectors(5)
+    ids = [
+        repository.store_features(
+            f"Song {i}", "A", f"url_{i}", vector, "youtube", added_by=test_user_id
+        )[0]["id"]
+        for i, vector in enumerate(vectors)
+    ]
+    index_path = str(tmp_path / "index.npy")
+    repository.export_vectors(index_path, index=True)
+    mapped = MappedIndexRepository(
+        repository, snapshot_path=index_path, refresh_interval=0
+    )
+
+    features_path = str(tmp_path / "features.npy")
+    write_snapshot(features_path, np.array(ids[:1]), vectors[4:])
+    repository.import_vectors(features_path)
+
+    np.testing.assert_allclose(mapped.get_features(ids[0]), vectors[4], atol=1e-6)
+    assert mapped.stats()["mapped_songs"] == 0
+    assert mapped.stats()["songs"] == 5
+    np.testing.assert_allclose(mapped.get_features(ids[2]), vectors[2], atol=1e-6)
@@ -0,0 +1,108 @@
+import pytest
+import numpy as np
+
+from src.repositories.mock_repository import MockVectorRepository
+
+FEATURE_DIMENSION = 27
+
+
+@pytest.fixture
+def mock_repository() -> MockVectorRepository:
+    """Array-backed mock repository with a tiny initial capacity to exercise growth."""
+    return MockVectorRepository(dim=FEATURE_DIMENSION, capacity=2)
+
+
+def test_mock_find_similars_ranking(mock_repository: MockVectorRepository):
+    """Test batched cosine search returns the k nearest songs in order."""
+    rng = np.random.default_rng(0)
+    vectors = rng.random((50, FEATURE_DIMENSION))
+    for i, vector in enumerate(vectors):
+        mock_repository.store_features(f"T{i}", "A", f"url_{i}", vector, "youtube")
+
+    query = vectors[10]
+    results = mock_repository.find_similars(query, limit=5, exclude_id=11)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = 1.0 - unit @ (query / np.linalg.norm(query))
+    expected[10] = np.inf  # Row of song id 11
+    expected_ids = [int(i) + 1 for i in np.argsort(expected)[:5]]
+
+    assert [r["id"] for r in results] == expected_ids
+    assert results[0]["distance"] == pytest.approx(np.sort(expected)[0], abs=1e-5)
+    assert all(r["id"] != 11 for r in results)
+
+
+def test_mock_url_lookup_and_duplicates(mock_repository: MockVectorRepository):
+    """Test URL lookups use the index and duplicate URLs are not re-inserted."""
+    features = np.ones(FEATURE_DIMENSION)
+    song, is_new = mock_repository.store_features(
+        "A", "A", "url_a", features, "youtube"
+    )
+    again, is_new_again = mock_repository.store_features(
+        "B", "B", "url_a", features, "youtube"
+    )
+
+    assert is_new is True
+    assert is_new_again is False
+    assert again["id"] == song["id"]
+    assert mock_repository.get_song_by_url("url_a")["title"] == "A"
+    assert mock_repository.get_song_by_url("missing") is None
+    np.testing.assert_allclose(mock_repository.get_features(song["id"]), features)
+
+
+def test_mock_feedback_aggregation(mock_repository: MockVectorRepository):
+    """Test votes are upserted per user and summed per suggested song."""
+    mock_repository.store_feedback(1, 10, 20, 1)
+    mock_repository.store_feedback(2, 10, 20, 1)
+    mock_repository.store_feedback(1, 10, 20, -1)  # User 1 flips the vote
+
+    assert mock_repository.get_feedback_scores(10, [20, 30]) == {20: 0}
+
+
+def test_mock_id_lookups(mock_repository: MockVectorRepository):
+    """Test single and batched id lookups skip unknown ids."""
+    features = np.ones(FEATURE_DIMENSION)
+    a, _ = mock_repository.store_features("A", "A", "url_a", features, "youtube")
+    b, _ = mock_repository.store_features("B", "B", "url_b", features, "youtube")
+
+    assert mock_repository.get_song_by_id(a["id"]) == a
+    assert mock_repository.get_song_by_id(999) is None
+    assert mock_repository.get_songs_by_ids([b["id"], 999, a["id"]]) == {
+        a["id"]: a,
+        b["id"]: b,
+    }
+
+
+def test_mock_list_songs_default_paging(mock_repository: MockVectorRepository):
+    """Test the interface's default list_songs / iter_songs over list_all_songs."""
+    for i in range(5):
+        mock_repository.store_features(
+            f"T{i}", "A", f"url_{i}", np.ones(FEATURE_DIMENSION), "youtube"
+        )
+
+    assert mock_repository.list_songs(after_id=2, limit=2, fields=["title"]) == [
+        {"id": 3, "title": "T2"},
+        {"id": 4, "title": "T3"},
+    ]
+    streamed = mock_repository.iter_songs(fields=["id"], batch_size=2)
+    assert [song["id"] for song in streamed] == [1, 2, 3, 4, 5]
+
+
+def test_mock_batch_search_matches_single(mock_repository: MockVectorRepository):
+    """Test the batched mock search returns each seed's single-search result."""
+    rng = np.random.default_rng(4)
+    for i, vector in enumerate(rng.random((10, FEATURE_DIMENSION))):
+        mock_repository.store_features(f"T{i}", "A", f"url_{i}", vector, "youtube")
+    mock_repository.store_feedback(1, 3, 4, -1)
+
+    batch = mock_repository.find_similars_with_feedback_batch([3, 7, 3, 99], limit=3)
+
+    assert list(batch) == [3, 7]
+    for seed in (3, 7):
+        single = mock_repository.find_similars_with_feedback(seed, limit=3)
+        assert [s["id"] for s in batch[seed]] == [s["id"] for s in single]
+        assert [s["feedback_score"] for s in batch[seed]] == [
+            s["feedback_score"] for s in single
+        ]
+        for b, s in zip(batch[seed], single):
+            assert b["distance"] == pytest.approx(s["distance"], abs=1e-6)
@@ -3,6 +3,7 @@ import numpy as np
 import math
 from src.repositories.pgvector_repository import PGVectorRepository
 from src.repositories.vector_repository import VectorRepository
+from src.repositories.vector_snapshot import read_snapshot, write_snapshot
 
 # Assuming the dimension is 27
 FEATURE_DIMENSION = 27
@@ -141,3 +142,547 @@ def test_feedback_upsert_and_aggregation(
     scores2 = repository.get_feedback_scores(song_q_id, [song_s_id])
     # Expected score: -1
     assert scores2[song_s_id] == -1, "Score should be -1 after User changes to downvote"
+
+
+def test_pooled_repository_reuses_connections(
+    pooled_repository: PGVectorRepository, mock_features: np.ndarray, test_user_id: int
+):
+    """Test that the pooled mode serves many calls from a bounded set of connections."""
+    song, _ = pooled_repository.store_features(
+        "Pooled", "P", "url_pool", mock_features, "youtube", added_by=test_user_id
+    )
+
+    for _ in range(5):
+        assert pooled_repository.get_features(song["id"]) is not None
+
+    stats = pooled_repository.pool_stats()
+    assert stats["pooled"] is True
+    assert stats["borrows"] >= 6
+    assert stats["in_use"] == 0
+    assert stats["idle"] <= stats["max_size"]
+
+
+def test_pool_keeps_connections_across_concurrent_borrows(
+    pooled_repository: PGVectorRepository,
+):
+    """Test connections borrowed together are reused, not reopened, next time."""
+    pool = pooled_repository.pool
+
+    def borrow_all():
+        held = [pool.getconn() for _ in range(pool.max_size)]
+        pids = {conn.get_backend_pid() for conn in held}
+        for conn in held:
+            pool.putconn(conn)
+        return pids
+
+    first = borrow_all()
+    assert borrow_all() == first
+    assert pool.stats()["opened"] == pool.max_size
+    assert pool.stats()["idle"] == pool.max_size
+
+
+def test_pool_closes_connections_returned_after_close(
+    pooled_repository: PGVectorRepository,
+):
+    """Test a connection returned to a closed pool is closed, not leaked."""
+    pool = pooled_repository.pool
+    conn = pool.getconn()
+    pool.close()
+    pool.putconn(conn)
+
+    assert conn.closed
+    assert pool.stats()["idle"] == 0
+
+
+def test_pool_borrow_timeout(pooled_repository: PGVectorRepository):
+    """Test that borrowing from an exhausted pool fails after the timeout."""
+    from src.repositories.connection_pool import PoolTimeoutError
+
+    pool = pooled_repository.pool
+    held = [pool.getconn(), pool.getconn()]
+    try:
+        with pytest.raises(PoolTimeoutError):
+            pool.getconn()
+        assert pool.stats()["timeouts"] == 1
+    finally:
+        for conn in held:
+            pool.putconn(conn)
+
+
+def test_pool_replaces_broken_connections(pooled_repository: PGVectorRepository):
+    """Test that a connection closed behind the pool's back is discarded on reuse."""
+    pool = pooled_repository.pool
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.close()  # Simulate the server dropping the connection
+
+    assert pooled_repository.list_all_songs() == []
+    assert pool.stats()["discarded"] >= 1
+
+
+def test_find_similars_with_feedback_single_query(
+    repository: PGVectorRepository, test_user_id: int
+):
+    """Test neighbours and feedback sums are returned together for a stored song."""
+    v1 = np.ones(FEATURE_DIMENSION) / np.sqrt(FEATURE_DIMENSION)
+    v2 = v1 + 0.05 * np.linspace(0, 1, FEATURE_DIMENSION)
+    v3 = np.linspace(-1, 1, FEATURE_DIMENSION)
+
+    q = repository.store_features("Q", "Q", "url_q", v1, "youtube", test_user_id)[0]
+    s1 = repository.store_features("S1", "S", "url_1", v2, "youtube", test_user_id)[0]
+    s2 = repository.store_features("S2", "S", "url_2", v3, "youtube", test_user_id)[0]
+
+    repository.store_feedback(test_user_id, q["id"], s1["id"], -1)
+
+    results = repository.find_similars_with_feedback(q["id"], limit=3)
+
+    assert [r["id"] for r in results][1:] == [s1["id"], s2["id"]]
+    assert results[0]["distance"] == pytest.approx(0.0, abs=1e-6)
+    scores = {r["id"]: r["feedback_score"] for r in results}
+    assert scores[s1["id"]] == -1
+    assert scores[s2["id"]] == 0
+
+    assert repository.find_similars_with_feedback(99999) is None
+
+
+def test_vector_index_management(repository: PGVectorRepository):
+    """Test the typed column migration and ANN index lifecycle are idempotent."""
+    # init.sql already declares vector(27) with an HNSW cosine index
+    assert repository.migrate_vector_column() is False
+    names = [index["name"] for index in repository.list_vector_indexes()]
+    assert repository.vector_index_name("cosine", "hnsw") in names
+
+    name = repository.ensure_vector_index(metric="l2", method="ivfflat", lists=1)
+    assert name == "idx_songs_feature_ivfflat_l2"
+    assert repository.ensure_vector_index(metric="l2", method="ivfflat") == name
+    assert name in repository.reindex_vectors(concurrently=False)
+
+    repository.drop_vector_index(metric="l2", method="ivfflat")
+    names = [index["name"] for index in repository.list_vector_indexes()]
+    assert name not in names
+
+
+def test_find_similars_with_search_knobs(
+    repository: PGVectorRepository, mock_features: np.ndarray, test_user_id: int
+):
+    """Test ef_search / probes can be set per query without changing results."""
+    song, _ = repository.store_features(
+        "Knobs", "K", "url_knobs", mock_features, "youtube", added_by=test_user_id
+    )
+
+    similars = repository.find_similars(mock_features, limit=1, ef_search=100, probes=5)
+    assert similars[0]["id"] == song["id"]
+
+    results = repository.find_similars_with_feedback(song["id"], ef_search=100)
+    assert results[0]["id"] == song["id"]
+
+
+def test_store_features_batch_and_bulk_lookup(
+    repository: PGVectorRepository, mock_features: np.ndarray, test_user_id: int
+):
+    """Test the multi-row insert skips existing URLs and the bulk URL lookup."""
+    existing, _ = repository.store_features(
+        title="Already There",
+        artist_name="Artist",
+        url="http://test.com/batch_0",
+        song_feature=mock_features,
+        source_platform="youtube",
+        added_by=test_user_id,
+    )
+
+    songs = [
+        {
+            "title": f"Batch {i}",
+            "artist_name": "Artist",
+            "url": f"http://test.com/batch_{i}",
+            "song_feature": mock_features,
+            "source_platform": "youtube",
+            "added_by": test_user_id,
+        }
+        for i in range(3)
+    ]
+    results = repository.store_features_batch(songs)
+
+    assert [is_new for _, is_new in results] == [False, True, True]
+    assert results[0][0]["id"] == existing["id"]
+    assert results[0][0]["title"] == "Already There"
+    assert [song["url"] for song, _ in results] == [s["url"] for s in songs]
+
+    found = repository.get_songs_by_urls(
+        ["http://test.com/batch_1", "http://test.com/batch_2", "http://test.com/none"]
+    )
+    assert set(found) == {"http://test.com/batch_1", "http://test.com/batch_2"}
+    assert found["http://test.com/batch_1"]["id"] == results[1][0]["id"]
+
+
+def test_url_forms_of_same_video_dedupe(
+    repository: PGVectorRepository, mock_features: np.ndarray, test_user_id: int
+):
+    """Test that youtu.be and watch?v= URLs of one video resolve to one song."""
+    original, _ = repository.store_features(
+        title="Short Link",
+        artist_name="Artist",
+        url="https://youtu.be/dQw4w9WgXcQ?si=abc",
+        song_feature=mock_features,
+        source_platform="youtube",
+        added_by=test_user_id,
+    )
+
+    long_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42"
+    assert repository.get_song_by_url(long_url)["id"] == original["id"]
+    assert repository.get_songs_by_urls([long_url])[long_url]["id"] == original["id"]
+
+    again, is_new = repository.store_features(
+        title="Long Link",
+        artist_name="Artist",
+        url=long_url,
+        song_feature=mock_features,
+        source_platform="youtube",
+        added_by=test_user_id,
+    )
+    assert is_new is False
+    assert again["id"] == original["id"]
+
+
+def test_backfill_source_keys(repository: PGVectorRepository, mock_features):
+    """Test backfill keys old rows and reports duplicates of earlier songs."""
+    with repository._connection() as conn, conn.cursor() as cur:
+        for url in (
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://open.spotify.com/track/4uLU6hMCjMI75M1A2tKUQC",
+        ):
+            cur.execute(
+                "INSERT INTO songs (title, artist_name, url, song_feature) VALUES (%s, %s, %s, %s);",
+                ("Old", "Artist", url, mock_features.tolist()),
+            )
+
+    assert repository.migrate_source_key_column() is False
+    result = repository.backfill_source_keys(batch_size=2)
+
+    assert result["updated"] == 2
+    assert [(d["id"], d["duplicate_of"]) for d in result["duplicates"]] == [(2, 1)]
+    with repository._connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT id, source_key FROM songs ORDER BY id;")
+        assert cur.fetchall() == [
+            (1, "youtube:dQw4w9WgXcQ"),
+            (2, None),
+            (3, "spotify:track:4uLU6hMCjMI75M1A2tKUQC"),
+        ]
+
+
+def test_get_songs_by_id(
+    repository: PGVectorRepository, mock_features: np.ndarray, test_user_id: int
+):
+    """Test primary-key lookups, single and batched."""
+    stored = [
+        repository.store_features(
+            f"By Id {i}",
+            "Artist",
+            f"http://test.com/by_id_{i}",
+            mock_features,
+            "youtube",
+            added_by=test_user_id,
+        )[0]
+        for i in range(3)
+    ]
+
+    assert repository.get_song_by_id(stored[1]["id"]) == stored[1]
+    assert repository.get_song_by_id(99999) is None
+    found = repository.get_songs_by_ids([stored[2]["id"], 99999, stored[0]["id"]])
+    assert found == {stored[0]["id"]: stored[0], stored[2]["id"]: stored[2]}
+    assert repository.get_songs_by_ids([]) == {}
+
+
+def test_list_songs_keyset_pages_and_stream(
+    repository: PGVectorRepository, mock_features: np.ndarray, test_user_id: int
+):
+    """Test keyset pages, filters, projection and the server-side cursor stream."""
+    for i in range(5):
+        repository.store_features(
+            f"List {i}",
+            "Artist",
+            f"http://test.com/list_{i}",
+            mock_features,
+            "youtube" if i % 2 == 0 else "spotify",
+            added_by=test_user_id if i < 4 else None,
+        )
+
+    first = repository.list_songs(limit=2, fields=["title"])
+    assert first == [{"id": 1, "title": "List 0"}, {"id": 2, "title": "List 1"}]
+    second = repository.list_songs(after_id=first[-1]["id"], limit=2)
+    assert [song["id"] for song in second] == [3, 4]
+    assert set(second[0]) == {
+        "id",
+        "title",
+        "artist_name",
+        "url",
+        "source_platform",
+        "added_by",
+        "added_at",
+    }
+
+    youtube = repository.list_songs(source_platform="youtube", added_by=test_user_id)
+    assert [song["id"] for song in youtube] == [1, 3]
+
+    streamed = list(repository.iter_songs(after_id=1, fields=["url"], batch_size=2))
+    assert [song["id"] for song in streamed] == [2, 3, 4, 5]
+    assert streamed[0] == {"id": 2, "url": "http://test.com/list_1"}
+
+    with pytest.raises(ValueError):
+        repository.list_songs(fields=["song_feature"])
+
+
+def test_find_similars_with_feedback_batch(
+    repository: PGVectorRepository, test_user_id: int
+):
+    """Test the LATERAL batch search matches per-seed searches, feedback included."""
+    rng = np.random.default_rng(11)
+    for i, vector in enumerate(rng.random((8, FEATURE_DIMENSION))):
+        repository.store_features(
+            f"Seed {i}",
+            "A",
+            f"http://test.com/seed_{i}",
+            vector,
+            "youtube",
+            added_by=test_user_id,
+        )
+    repository.store_feedback(test_user_id, 1, 2, -1)
+    repository.store_feedback(test_user_id, 3, 1, 1)
+
+    batch = repository.find_similars_with_feedback_batch([1, 3, 99999], limit=4)
+
+    assert set(batch) == {1, 3}
+    for seed in (1, 3):
+        single = repository.find_similars_with_feedback(seed, limit=4)
+        assert [s["id"] for s in batch[seed]] == [s["id"] for s in single]
+        assert [s["feedback_score"] for s in batch[seed]] == [
+            s["feedback_score"] for s in single
+        ]
+    assert repository.get_feedback_scores_batch([(1, 2), (3, 1), (3, 2)]) == {
+        (1, 2): -1,
+        (3, 1): 1,
+    }
+
+
+def test_neighbor_lists_build_and_incremental_updates(
+    repository: PGVectorRepository, test_user_id: int
+):
+    """Test built and incrementally maintained lists match an exact search."""
+    rng = np.random.default_rng(5)
+    vectors = rng.random((24, FEATURE_DIMENSION))
+    for i in range(12):
+        repository.store_features(
+            f"N {i}", "A", f"http://test.com/n_{i}", vectors[i], "youtube"
+        )
+    assert repository.find_similars_from_neighbors(1, limit=3) is None
+
+    assert repository.build_neighbors(k=5, block_size=4) == {"songs": 12, "k": 5}
+    repository.store_features(
+        "N 12", "A", "http://test.com/n_12", vectors[12], "youtube"
+    )
+    repository.store_features_batch(
+        [
+            {
+                "title": f"N {i}",
+                "artist_name": "A",
+                "url": f"http://test.com/n_{i}",
+                "song_feature": vectors[i],
+                "source_platform": "youtube",
+            }
+            for i in range(13, 24)
+        ]
+    )
+    repository.store_feedback(test_user_id, 1, 2, -1)
+
+    for song_id in range(1, 25):
+        exact = repository.find_similars_with_feedback(song_id, limit=5)
+        listed = repository.find_similars_from_neighbors(song_id, limit=5)
+        assert [s["id"] for s in listed] == [s["id"] for s in exact]
+        assert [s["distance"] for s in listed] == pytest.approx(
+            [s["distance"] for s in exact], abs=1e-5
+        )
+        assert [s["feedback_score"] for s in listed] == [
+            s["feedback_score"] for s in exact
+        ]
+
+    # Lists shorter than the requested limit cannot serve it
+    assert repository.find_similars_from_neighbors(1, limit=6) is None
+
+
+def test_similarity_queries_return_more_rows_than_default_ef_search(
+    repository: PGVectorRepository,
+):
+    """Test HNSW-planned searches fill limits above the default ef_search (40)."""
+    vectors = np.random.default_rng(3).random((60, FEATURE_DIMENSION))
+    stored = repository.store_features_batch(
+        [
+            {
+                "title": f"E {i}",
+                "artist_name": "A",
+                "url": f"http://test.com/ef_{i}",
+                "song_feature": vector,
+                "source_platform": "youtube",
+            }
+            for i, vector in enumerate(vectors)
+        ]
+    )
+    seeds = [song["id"] for song, _ in stored[:2]]
+    forced = PGVectorRepository(
+        dsn=repository.dsn + "?options=-c%20enable_seqscan%3Doff",
+        dim=FEATURE_DIMENSION,
+    )
+
+    assert len(forced.find_similars(vectors[0], limit=55)) == 55
+    assert len(forced.find_similars(vectors[0], limit=55, exclude_id=seeds[0])) == 55
+    assert len(forced.find_similars_with_feedback(seeds[0], limit=55)) == 55
+    batch = forced.find_similars_with_feedback_batch(seeds, limit=55)
+    assert [len(batch[seed]) for seed in seeds] == [55, 55]
+
+
+def test_new_neighbor_list_is_exact_under_hnsw_plan(
+    repository: PGVectorRepository, pg_conn
+):
+    """Test an insert's own list is full and exact even when HNSW is preferred."""
+    vectors = np.random.default_rng(8).random((41, FEATURE_DIMENSION))
+    repository.store_features_batch(
+        [
+            {
+                "title": f"H {i}",
+                "artist_name": "A",
+                "url": f"http://test.com/h_{i}",
+                "song_feature": vector,
+                "source_platform": "youtube",
+            }
+            for i, vector in enumerate(vectors[:40])
+        ]
+    )
+    repository.build_neighbors(k=20)
+
+    # ef_search below k: an HNSW scan would stop after 10 rows
+    forced = PGVectorRepository(
+        dsn=repository.dsn
+        + "?options=-c%20enable_seqscan%3Doff%20-c%20hnsw.ef_search%3D10",
+        dim=FEATURE_DIMENSION,
+    )
+    song, _ = forced.store_features(
+        "H 40", "A", "http://test.com/h_40", vectors[40], "youtube"
+    )
+
+    def list_of(song_id):
+        with pg_conn.cursor() as cur:
+            cur.execute(
+                "SELECT k, neighbor_ids FROM song_neighbors WHERE song_id = %s;",
+                (song_id,),
+            )
+            return cur.fetchone()
+
+    k, inserted = list_of(song["id"])
+    assert (k, len(inserted)) == (20, 20)
+    repository.build_neighbors(k=20)
+    assert list_of(song["id"]) == (k, inserted)
+
+
+def test_feedback_scores_aggregate_tracks_flips_and_rebuilds(
+    repository: PGVectorRepository, pg_conn, mock_features
+):
+    """Test the trigger-maintained aggregate against a rebuild from raw votes."""
+    cur = pg_conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO users (username, email, user_type)
+        SELECT 'voter' || i, 'voter' || i || '@example.com', 'listener'
+        FROM generate_series(1, 3) AS i
+        RETURNING id;
+        """
+    )
+    voters = [row[0] for row in cur.fetchall()]
+    query, suggested = [
+        repository.store_features(
+            f"Agg {i}", "A", f"http://test.com/agg_{i}", mock_features, "youtube"
+        )[0]["id"]
+        for i in range(2)
+    ]
+
+    for voter in voters:
+        repository.store_feedback(voter, query, suggested, 1)
+    repository.store_feedback(voters[0], query, suggested, -1)  # Flip
+    repository.store_feedback(voters[1], query, suggested, 1)  # Same vote again
+    cur.execute("DELETE FROM song_feedback WHERE user_id = %s;", (voters[2],))
+
+    def aggregate():
+        cur.execute(
+            "SELECT net_score, upvotes, downvotes FROM song_feedback_scores WHERE query_song_id = %s AND suggested_song_id = %s;",
+            (query, suggested),
+        )
+        return cur.fetchone()
+
+    assert aggregate() == (0, 1, 1)
+    assert repository.get_feedback_scores(query, [suggested]) == {suggested: 0}
+    assert repository.get_feedback_scores_batch([(query, suggested)]) == {
+        (query, suggested): 0
+    }
+
+    cur.execute("UPDATE song_feedback_scores SET net_score = 42;")
+    assert repository.rebuild_feedback_scores() == 1
+    assert aggregate() == (0, 1, 1)
+
+
+def test_similar_stream_continues_one_cursor(
+    repository: PGVectorRepository, test_user_id: int
+):
+    """Test the candidate stream pages through neighbours in distance order."""
+    rng = np.random.default_rng(8)
+    repository.store_features_batch(
+        [
+            {
+                "title": f"Stream {i}",
+                "artist_name": "A",
+                "url": f"http://test.com/stream_{i}",
+                "song_feature": vector,
+                "source_platform": "youtube",
+            }
+            for i, vector in enumerate(rng.random((60, FEATURE_DIMENSION)))
+        ]
+    )
+    repository.store_feedback(test_user_id, 1, 2, -1)
+
+    with repository.open_similar_stream(1) as fetch:
+        first, second, rest = fetch(5), fetch(10), fetch(100)
+    streamed = first + second + rest
+    assert [len(first), len(second), len(rest)] == [5, 10, 45]
+    distances = [song["distance"] for song in streamed]
+    assert distances == sorted(distances) and streamed[0]["id"] == 1
+    assert {song["id"]: song["feedback_score"] for song in streamed}[2] == -1
+
+    with repository.open_similar_stream(99999) as fetch:
+        assert fetch(5) is None
+
+
+def test_export_and_import_vectors(
+    repository: PGVectorRepository, test_user_id: int, tmp_path
+):
+    """Test the binary COPY export writes a snapshot the import path reads back."""
+    vectors = np.random.default_rng(3).random((30, FEATURE_DIMENSION))
+    songs = [
+        {
+            "title": f"Song {i}",
+            "artist_name": "Artist",
+            "url": f"http://test.com/export_{i}",
+            "song_feature": vector,
+            "source_platform": "youtube",
+            "added_by": test_user_id,
+        }
+        for i, vector in enumerate(vectors)
+    ]
+    ids = [song["id"] for song, _ in repository.store_features_batch(songs)]
+    path = str(tmp_path / "features.npy")
+
+    assert repository.export_vectors(path) == 30
+    snapshot_ids, snapshot_vectors = read_snapshot(path, FEATURE_DIMENSION)
+    assert snapshot_ids.tolist() == ids
+    np.testing.assert_allclose(snapshot_vectors, vectors, rtol=1e-6)
+
+    write_snapshot(path, np.array([ids[0], 99999]), np.stack([vectors[1], vectors[2]]))
+    assert repository.import_vectors(path) == {"rows": 2, "updated": 1, "skipped": 1}
+    np.testing.assert_allclose(repository.get_features(ids[0]), vectors[1], rtol=1e-6)
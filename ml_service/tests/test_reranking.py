@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from src.extractors.reranking import (
+    DistanceReranker,
+    FeedbackPenaltyReranker,
+    create_reranker,
+    top_k,
+)
+
+
+def test_top_k_matches_a_stable_descending_sort():
+    rng = np.random.default_rng(3)
+    # Few distinct values, so ties straddle the cut
+    scores = rng.integers(0, 4, size=200).astype(np.float64)
+    for k in (0, 1, 7, 50, 199, 200, 250):
+        expected = np.argsort(-scores, kind="stable")[:k]
+        np.testing.assert_array_equal(top_k(scores, k), expected)
+
+
+def test_feedback_penalty_scores():
+    reranker = FeedbackPenaltyReranker()
+    scores = reranker.scores(
+        np.array([0.0, 0.005, 0.001, 0.2]), np.array([-10.0, 100.0, 0.0, 0.0])
+    )
+    assert scores == pytest.approx(
+        [10.0 - 10.0 * np.tanh(1.0), 5.0, 9.0, 0.0], abs=1e-9
+    )
+    assert DistanceReranker().scores(np.array([0.001]), np.array([-50.0])) == (
+        pytest.approx([9.0])
+    )
+
+
+def test_unknown_reranker():
+    with pytest.raises(ValueError):
+        create_reranker("learned")
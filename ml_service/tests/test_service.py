@@ -1,8 +1,11 @@
+import asyncio
 import pytest
 import numpy as np
+from contextlib import contextmanager
 from unittest.mock import MagicMock, patch
 import math
 
+from src.extractors.features import FastFeatureExtractor
 from src.extractors.youtube_extractor import MusicAnalysisService
 from src.models import SongData, SongResult
 
@@ -111,20 +114,18 @@ def test_find_similar_by_id_score_re_ranking(
     mock_service: MusicAnalysisService, mock_repo: MagicMock
 ):
     """
-    Test the 70% Audio / 30% Feedback scoring and re-ranking logic.
-    Scores: Score = (7.0 * Sim) + (3.0 * tanh(Votes * 0.2))
+    Test the feedback-penalty scoring and re-ranking logic.
+    Score = 10 * (1 - 100 * distance), minus 10 * tanh(0.1 * |votes|) for
+    net downvotes, floored at 0.
     """
     query_song_id = 1
 
     # 1. Setup mock data
-    mock_repo.get_features.return_value = mock_features
-
-    # Candidate A: Perfect Audio (dist=0.0, sim=1.0). Bad Feedback (votes=-10)
-    # Candidate B: Poor Audio (dist=0.5, sim=0.5). Perfect Feedback (votes=+100)
+    # Candidate A: Perfect Audio (dist=0.0). Bad Feedback (votes=-10)
+    # Candidate B: Poor Audio (dist=0.005). Perfect Feedback (votes=+100)
     candidate_a_id, candidate_b_id = 10, 20
 
     mock_raw_similars = [
-        # Note: distance is stored in repo, similarity = 1 - distance
         {
             "id": candidate_a_id,
             "title": "A - Perfect Audio",
@@ -132,7 +133,8 @@ def test_find_similar_by_id_score_re_ranking(
             "url": "urlA",
             "source_platform": "y",
             "distance": 0.0,
-        },  # Sim 1.0
+            "feedback_score": -10,  # Total Votes -10
+        },
         {
             "id": candidate_b_id,
             "title": "B - Poor Audio",
@@ -140,31 +142,35 @@ def test_find_similar_by_id_score_re_ranking(
             "url": "urlB",
             "source_platform": "y",
             "distance": 0.005,
-        },  # Sim 0.5
+            "feedback_score": 100,  # Total Votes +100
+        },
     ]
 
-    mock_feedback_scores = {
-        candidate_a_id: -10,  # Total Votes -10
-        candidate_b_id: 100,  # Total Votes +100
-    }
-
-    mock_repo.find_similars.return_value = mock_raw_similars
-    mock_repo.get_feedback_scores.return_value = mock_feedback_scores
+    mock_repo.find_similars_with_feedback.return_value = mock_raw_similars
 
     results = mock_service.find_similar_by_id(query_song_id, limit=2, exclude_self=True)
 
-    # Calculation based on internal service logic:
-    # Score A: (7.0 * 1.0) + (3.0 * tanh(-10 * 0.2)) ≈ 7.0 + (3.0 * -0.379) = 4.1079
-    # Score B: (7.0 * 0.5) + (3.0 * tanh(100 * 0.2)) ≈ 3.5 + (3.0 * 1.0) = 6.5
+    # Score A: 10 * (1 - 0) - 10 * tanh(0.1 * 10) ≈ 10 - 7.616 = 2.384
+    # Score B: 10 * (1 - 100 * 0.005) = 5.0 (upvotes add no bonus)
 
-    # Expected ranking by final score: B (6.5) > A (4.1079)
+    # Expected ranking by final score: B (5.0) > A (2.384)
 
     assert results[0].id == candidate_b_id
     assert results[1].id == candidate_a_id
 
     # Use approx for float comparisons
-    assert results[0].score == pytest.approx(6.5, abs=0.1)
-    assert results[1].score == pytest.approx(4.1079, abs=0.1)
+    assert results[0].score == pytest.approx(5.0, abs=0.01)
+    assert results[1].score == pytest.approx(2.384, abs=0.01)
+
+
+def test_find_similar_by_id_not_found(
+    mock_service: MusicAnalysisService, mock_repo: MagicMock
+):
+    """Test that a missing query song raises ValueError (mapped to 404 by the API)."""
+    mock_repo.find_similars_with_feedback.return_value = None
+
+    with pytest.raises(ValueError, match="not found"):
+        mock_service.find_similar_by_id(12345)
 
 
 def test_store_user_feedback(mock_service: MusicAnalysisService, mock_repo: MagicMock):
@@ -173,3 +179,303 @@ def test_store_user_feedback(mock_service: MusicAnalysisService, mock_repo: Magi
     mock_service.store_user_feedback(101, 1, 5, 1)
 
     mock_repo.store_feedback.assert_called_once_with(101, 1, 5, 1)
+
+
+def test_analyze_batch_reports_each_song():
+    """Test batch analysis skips existing/duplicate URLs and isolates failures."""
+    from src.repositories.mock_repository import MockVectorRepository
+
+    repo = MockVectorRepository(dim=FEATURE_DIMENSION)
+    service = MusicAnalysisService(repo)
+    repo.store_features(
+        title="Old",
+        artist_name="A",
+        url="http://test.com/old",
+        song_feature=mock_features,
+        source_platform="youtube",
+    )
+
+    def fake_extract(url, mode):
+        if url.endswith("broken"):
+            raise RuntimeError("download failed")
+        return mock_features
+
+    urls = ["old", "new_1", "broken", "new_2", "new_1"]
+    songs = [
+        SongData(
+            url=f"http://test.com/{u}",
+            title=u,
+            artist_name="A",
+            source_platform="youtube",
+        )
+        for u in urls
+    ]
+    progress = []
+
+    with patch.object(service, "extract_from_url", side_effect=fake_extract) as ex:
+        report = service.analyze_batch(
+            songs, insert_batch_size=1, on_progress=lambda d, t: progress.append(d)
+        )
+
+    # Existing and repeated URLs are never downloaded
+    assert ex.call_count == 3
+    assert [item.status.value for item in report.items] == [
+        "exists",
+        "stored",
+        "failed",
+        "stored",
+        "duplicate",
+    ]
+    assert report.items[2].error == "download failed"
+    assert report.items[4].song.id == report.items[1].song.id
+    assert (report.stored, report.existing, report.failed) == (2, 1, 1)
+    assert progress == [1, 2, 3]
+    assert repo.get_song_by_url("http://test.com/new_2") is not None
+
+
+def test_analyze_batch_stores_while_submitting():
+    """Test results are stored as they finish, with a bounded number in flight."""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.repositories.mock_repository import MockVectorRepository
+
+    repo = MockVectorRepository(dim=FEATURE_DIMENSION)
+    service = MusicAnalysisService(repo)
+    songs = [
+        SongData(
+            url=f"http://test.com/bounded_{i}",
+            title=str(i),
+            artist_name="A",
+            source_platform="youtube",
+        )
+        for i in range(6)
+    ]
+    submitted = []
+    stored_at_submit = []
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            submitted.append(args[0])
+            stored_at_submit.append(len(repo.list_all_songs()))
+            return super().submit(fn, *args)
+
+    with CountingExecutor(max_workers=2) as executor:
+        report = service.analyze_batch(
+            songs,
+            executor=executor,
+            extract_task=lambda url, mode: mock_features,
+            insert_batch_size=1,
+            max_in_flight=2,
+        )
+
+    assert report.stored == 6
+    assert len(submitted) == 6
+    # The last songs are only submitted once earlier ones were stored
+    assert stored_at_submit[:2] == [0, 0]
+    assert stored_at_submit[-1] >= 4
+
+
+class _FakeFFmpeg:
+    """
+    Stands in for subprocess.Popen running ffmpeg: each call is a process
+    with the next PCM chunk on stdout, writing `stderr` to its error file.
+    """
+
+    def __init__(self, *pcm: bytes, returncode: int = 0, stderr: bytes = b""):
+        self.chunks = list(pcm)
+        self.returncode = returncode
+        self.error = stderr
+
+    def __call__(self, command, stdout=None, stderr=None):
+        import io
+
+        stderr.write(self.error)
+        self.stdout = io.BytesIO(self.chunks.pop(0))
+        return self
+
+    def wait(self):
+        return self.returncode
+
+    def poll(self):
+        return self.returncode
+
+
+def test_pipe_mode_streams_ffmpeg_pcm(mock_repo: MagicMock):
+    """Pipe mode feeds ffmpeg's float32 output to the streaming extractor."""
+    sr = 22050
+    t = np.arange(sr * 3) / sr
+    samples = (0.3 * np.sin(2 * np.pi * 440 * t)).astype("<f4")
+    service = MusicAnalysisService(mock_repo, download_mode="pipe")
+
+    ydl = MagicMock()
+    ydl.__enter__.return_value.extract_info.return_value = {
+        "url": "https://cdn.example/audio.m4a",
+        "http_headers": {"User-Agent": "test"},
+    }
+    with (
+        patch("src.extractors.youtube_extractor.yt_dlp.YoutubeDL", return_value=ydl),
+        patch(
+            "src.extractors.youtube_extractor.subprocess.Popen",
+            side_effect=_FakeFFmpeg(samples.tobytes()),
+        ) as popen,
+        patch.object(service, "_download_audio") as download,
+    ):
+        features = service.extract_from_url("http://test.com/pipe")
+
+    download.assert_not_called()
+    command = popen.call_args.args[0]
+    assert command[command.index("-ar") + 1] == str(sr)
+    assert "https://cdn.example/audio.m4a" in command
+    expected = service.streaming_extractor.extract_waveform(samples, sr)
+    np.testing.assert_allclose(features, expected, atol=1e-6)
+
+    with (
+        patch("src.extractors.youtube_extractor.yt_dlp.YoutubeDL", return_value=ydl),
+        patch(
+            "src.extractors.youtube_extractor.subprocess.Popen",
+            side_effect=_FakeFFmpeg(b"", returncode=1, stderr=b"403 Forbidden"),
+        ),
+        pytest.raises(RuntimeError, match="403 Forbidden"),
+    ):
+        service.extract_from_url("http://test.com/pipe")
+
+
+def test_pipe_mode_reads_capped_excerpts(mock_repo: MagicMock):
+    """A duration-capped extractor decodes only its excerpts in pipe mode."""
+    sr = 22050
+    t = np.arange(sr * 2) / sr
+    first = (0.3 * np.sin(2 * np.pi * 440 * t)).astype("<f4")
+    second = (0.3 * np.sin(2 * np.pi * 660 * t)).astype("<f4")
+    extractor = FastFeatureExtractor(max_duration=4, segments=2)
+    service = MusicAnalysisService(
+        mock_repo, feature_extractor=extractor, download_mode="pipe"
+    )
+
+    ydl = MagicMock()
+    ydl.__enter__.return_value.extract_info.return_value = {
+        "url": "https://cdn.example/audio.m4a",
+        "duration": 100,
+    }
+    with (
+        patch("src.extractors.youtube_extractor.yt_dlp.YoutubeDL", return_value=ydl),
+        patch(
+            "src.extractors.youtube_extractor.subprocess.Popen",
+            side_effect=_FakeFFmpeg(first.tobytes(), second.tobytes()),
+        ) as popen,
+    ):
+        features = service.extract_from_url("http://test.com/pipe")
+
+    seeks = [
+        (command[command.index("-ss") + 1], command[command.index("-t") + 1])
+        for command in (call.args[0] for call in popen.call_args_list)
+    ]
+    assert seeks == [("0.000", "2.000"), ("98.000", "2.000")]
+    expected = extractor.extract_waveform(np.concatenate([first, second]), sr)
+    np.testing.assert_allclose(features, expected, atol=1e-6)
+
+
+def test_file_mode_removes_download_directory(mock_service: MusicAnalysisService):
+    """The whole temporary download directory is removed after extraction."""
+    import os
+
+    created = []
+
+    def fake_download(url, tempdir):
+        path = os.path.join(tempdir, "audio.wav")
+        open(path, "wb").close()
+        created.append(tempdir)
+        return path
+
+    with (
+        patch.object(mock_service, "_download_audio", side_effect=fake_download),
+        patch.object(mock_service, "_extract_features", return_value=mock_features),
+    ):
+        mock_service.extract_from_url("http://test.com/file")
+
+    assert created and not os.path.exists(created[0])
+
+
+def test_find_similar_by_id_reads_neighbor_lists(mock_repo: MagicMock):
+    """Test the neighbors source, and its live fallback for songs without a list."""
+    service = MusicAnalysisService(mock_repo, similar_source="neighbors")
+    candidate = {
+        "id": 2,
+        "title": "Listed",
+        "artist_name": "A",
+        "url": "http://test.com/2",
+        "source_platform": "youtube",
+        "distance": 0.001,
+        "feedback_score": 0,
+    }
+    mock_repo.find_similars_from_neighbors.return_value = [candidate]
+
+    assert [s.id for s in service.find_similar_by_id(1, limit=1)] == [2]
+    mock_repo.find_similars_from_neighbors.assert_called_once_with(1, 6)
+    mock_repo.find_similars_with_feedback.assert_not_called()
+
+    mock_repo.find_similars_from_neighbors.return_value = None
+    mock_repo.find_similars_with_feedback.return_value = [candidate]
+    assert [s.id for s in service.find_similar_by_id(1, limit=1)] == [2]
+    mock_repo.find_similars_with_feedback.assert_called_once()
+
+    with pytest.raises(ValueError):
+        MusicAnalysisService(mock_repo, similar_source="graph")
+
+
+def test_find_similar_adaptive_widens_until_enough_pass(mock_repo: MagicMock):
+    """Test adaptive over-fetch reads further from one stream only as needed."""
+    # Songs 2-7 are heavily downvoted, songs 8+ are clean
+    stream = [
+        {
+            "id": i,
+            "title": f"S{i}",
+            "artist_name": "A",
+            "url": f"http://test.com/{i}",
+            "source_platform": "youtube",
+            "distance": 0.0001 * i,
+            "feedback_score": -50 if 2 <= i <= 7 else 0,
+        }
+        for i in range(1, 100)
+    ]
+    fetched = []
+
+    @contextmanager
+    def open_similar_stream(song_id, metric="cosine"):
+        def fetch(n):
+            start = sum(fetched)
+            fetched.append(n)
+            return stream[start : start + n]
+
+        yield fetch
+
+    mock_repo.open_similar_stream.side_effect = open_similar_stream
+    service = MusicAnalysisService(mock_repo)
+
+    results = service.find_similar_by_id(1, limit=4, min_score=5.0)
+
+    assert [song.id for song in results] == [8, 9, 10, 11]
+    assert fetched == [9, 18]  # limit + 5, then doubled
+    mock_repo.find_similars_with_feedback.assert_not_called()
+
+    # A floor nothing reaches drains the stream up to the budget or the cap
+    assert service.find_similar_by_id(1, limit=4, min_score=10.0) == []
+
+
+def test_async_similarity_keeps_to_in_process_index(mock_repo: MagicMock):
+    """Test DB_ASYNC does not bypass an in-memory index for similarity reads."""
+    mock_repo.in_process_search = True
+    mock_repo.dim = FEATURE_DIMENSION
+    mock_repo.find_similars_with_feedback.return_value = []
+    mock_repo.find_similars.return_value = []
+    async_repo = MagicMock()
+    service = MusicAnalysisService(mock_repo, async_repository=async_repo)
+
+    async def scenario():
+        await service.find_similar_by_id_async(1, limit=3)
+        await service.find_similar_by_vector_async(mock_features, limit=3)
+
+    asyncio.run(scenario())
+
+    mock_repo.find_similars_with_feedback.assert_called_once()
+    mock_repo.find_similars.assert_called_once()
+    async_repo.find_similars_with_feedback.assert_not_called()
+    async_repo.find_similars.assert_not_called()
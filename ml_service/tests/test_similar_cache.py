@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+
+from src.extractors.similar_cache import (
+    MemorySimilarCacheBackend,
+    RedisSimilarCacheBackend,
+    SimilarResultCache,
+    create_similar_cache,
+)
+from src.extractors.youtube_extractor import MusicAnalysisService
+from src.models import SongData
+
+FEATURE_DIMENSION = 27
+
+
+class FakeRedis:
+    """The redis-py subset used by RedisSimilarCacheBackend (no expiry)."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value, px=None):
+        self.data[name] = value.encode() if isinstance(value, str) else value
+        self.expiry[name] = px
+
+    def mget(self, names):
+        return [self.data.get(name) for name in names]
+
+    def incr(self, name):
+        self.data[name] = str(int(self.data.get(name, 0)) + 1).encode()
+        return int(self.data[name])
+
+
+def _candidate(song_id: int, distance: float):
+    return {
+        "id": song_id,
+        "title": f"Song {song_id}",
+        "artist_name": "Artist",
+        "url": f"http://test.com/{song_id}",
+        "source_platform": "youtube",
+        "distance": distance,
+        "feedback_score": 0,
+    }
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "memory":
+        return SimilarResultCache(MemorySimilarCacheBackend(), ttl=60)
+    return SimilarResultCache(RedisSimilarCacheBackend(FakeRedis()), ttl=60)
+
+
+def test_memory_backend_lru_and_ttl():
+    now = [0.0]
+    backend = MemorySimilarCacheBackend(max_entries=2, clock=lambda: now[0])
+    backend.set("a", [{"id": 1}], ttl=10)
+    backend.set("b", [{"id": 2}], ttl=10)
+    backend.get("a")  # "b" is now least recently used
+    backend.set("c", [{"id": 3}], ttl=10)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == [{"id": 1}]
+
+    now[0] = 11.0
+    assert backend.get("a") is None
+    assert backend.evictions() == 2
+    assert backend.size() == 1
+
+
+def test_invalidation_makes_entries_unreachable(cache: SimilarResultCache):
+    key, value = cache.lookup(1, 10, True)
+    assert value is None
+    cache.store(key, [{"id": 2}])
+    assert cache.lookup(1, 10, True) == (key, [{"id": 2}])
+    assert cache.lookup(1, 5, True)[1] is None
+
+    other_key, _ = cache.lookup(3, 10, True)
+    cache.store(other_key, [{"id": 4}])
+    cache.invalidate_song(1)
+    assert cache.lookup(1, 10, True)[1] is None
+    assert cache.lookup(3, 10, True)[1] == [{"id": 4}]
+
+    cache.invalidate_all()
+    assert cache.lookup(3, 10, True)[1] is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["invalidations"]) == (2, 2)
+
+
+def test_redis_backend_sets_ttl():
+    client = FakeRedis()
+    cache = SimilarResultCache(RedisSimilarCacheBackend(client), ttl=1.5)
+    key, _ = cache.lookup(1, 10, True)
+    cache.store(key, [])
+    assert client.expiry["jetswitch:" + key] == 1500
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_similar_cache("memcached")
+
+
+def test_service_serves_and_invalidates_cached_results(cache: SimilarResultCache):
+    repo = MagicMock()
+    repo.find_similars_with_feedback.return_value = [
+        _candidate(2, 0.001),
+        _candidate(3, 0.002),
+    ]
+    service = MusicAnalysisService(repo, similar_cache=cache)
+
+    first = service.find_similar_by_id(1, limit=2)
+    assert service.find_similar_by_id(1, limit=2) == first
+    assert repo.find_similars_with_feedback.call_count == 1
+
+    # Feedback on the query song recomputes its results
+    service.store_user_feedback(7, 1, 3, -1)
+    service.find_similar_by_id(1, limit=2)
+    assert repo.find_similars_with_feedback.call_count == 2
+
+    # Inserting a song recomputes everything
+    repo.get_song_by_url.return_value = None
+    repo.store_features.return_value = (
+        {**_candidate(9, 0.0), "added_by": 1, "added_at": None},
+        True,
+    )
+    service.extract_from_url = MagicMock(return_value=np.zeros(FEATURE_DIMENSION))
+    service.analyze_and_store(
+        SongData(
+            url="http://test.com/9",
+            title="Song 9",
+            artist_name="Artist",
+            source_platform="youtube",
+        )
+    )
+    service.find_similar_by_id(1, limit=2)
+    assert repo.find_similars_with_feedback.call_count == 3
+
+
+def test_batch_search_only_misses_the_cache(cache: SimilarResultCache):
+    repo = MagicMock()
+    repo.find_similars_with_feedback.return_value = [_candidate(2, 0.001)]
+    repo.find_similars_with_feedback_batch.return_value = {
+        4: [_candidate(5, 0.001)],
+    }
+    service = MusicAnalysisService(repo, similar_cache=cache)
+    cached = service.find_similar_by_id(1, limit=1)
+
+    result = service.find_similar_batch([1, 4, 6], limit=1)
+
+    repo.find_similars_with_feedback_batch.assert_called_once_with(
+        [4, 6], limit=6, metric="cosine"
+    )
+    assert [(item.song_id, item.found) for item in result.items] == [
+        (1, True),
+        (4, True),
+        (6, False),
+    ]
+    assert result.items[0].similar == cached
+    assert service.find_similar_by_id(4, limit=1) == result.items[1].similar
+    assert repo.find_similars_with_feedback.call_count == 1
@@ -0,0 +1,44 @@
+import pytest
+from src.repositories.source_keys import canonical_source_key
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://youtu.be/dQw4w9WgXcQ",
+        "https://youtu.be/dQw4w9WgXcQ?si=tracking",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s",
+        "https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+        "https://music.youtube.com/watch?v=dQw4w9WgXcQ&list=RDAMVM",
+        "https://youtube.com/shorts/dQw4w9WgXcQ",
+        "youtube.com/embed/dQw4w9WgXcQ",
+    ],
+)
+def test_youtube_url_forms(url):
+    assert canonical_source_key(url) == "youtube:dQw4w9WgXcQ"
+
+
+def test_streaming_platform_ids():
+    track = "spotify:track:4uLU6hMCjMI75M1A2tKUQC"
+    assert canonical_source_key(track) == track
+    assert (
+        canonical_source_key(
+            "https://open.spotify.com/intl-de/track/4uLU6hMCjMI75M1A2tKUQC?si=x"
+        )
+        == track
+    )
+    assert (
+        canonical_source_key("https://music.apple.com/us/album/album/1440?i=1441")
+        == "apple_music:1441"
+    )
+    assert (
+        canonical_source_key("https://music.apple.com/us/song/name/1441")
+        == "apple_music:1441"
+    )
+
+
+def test_generic_url_normalisation():
+    key = canonical_source_key("https://WWW.Example.com/a/track/?b=2&utm_source=x&a=1")
+    assert key == "url:example.com/a/track?a=1&b=2"
+    # Paths stay case sensitive: they may identify different files
+    assert canonical_source_key("https://example.com/A/track?a=1&b=2") != key